@@ -37,6 +37,8 @@ params.maf_centers = "ALL"
 maf_center_list = params.maf_centers?.split(",").toList()
 // whether to sync staging table with prod table at the start of the run
 params.sync_staging_table_with_production = false
+// directory the BPC retraction check keeps the retractions it reported in between runs
+params.retraction_state_dir = "${workDir}/bpc_retraction_state"
 // Validate input parameters
 WorkflowMain.initialise(workflow, params, log)
 
@@ -161,6 +163,8 @@ workflow  {
   ch_center = Channel.value(params.center)
   ch_is_prod = Channel.value(is_prod)
   ch_is_staging = Channel.value(is_staging)
+  retraction_state = file("${params.retraction_state_dir}/bpc_retraction_state.npz")
+  ch_retraction_state = Channel.value(retraction_state.exists() ? retraction_state : [])
 
   // if (params.force) {
   //   reset_processing(center_map_synid)]
@@ -193,7 +197,7 @@ workflow  {
     }
     if (is_prod) {
       find_maf_artifacts(create_consortium_release.out, ch_release)
-      check_for_retractions(create_consortium_release.out)
+      check_for_retractions(create_consortium_release.out, ch_retraction_state)
     }
   } else if (params.process_type == "consortium_release_step_only") {
     create_consortium_release("default", ch_release, ch_is_prod, ch_seq_date, ch_is_staging)
@@ -203,7 +207,7 @@ workflow  {
     }
     if (is_prod) {
       find_maf_artifacts(create_consortium_release.out, ch_release)
-      check_for_retractions(create_consortium_release.out)
+      check_for_retractions(create_consortium_release.out, ch_retraction_state)
     }
   } else if (params.process_type == "public_release_step_only") {
     create_public_release(ch_release, ch_seq_date, ch_is_prod, ch_is_staging)
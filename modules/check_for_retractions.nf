@@ -1,15 +1,22 @@
 process check_for_retractions {
     container "$params.main_release_utils_docker"
     secret 'SYNAPSE_AUTH_TOKEN'
+    // the state outlives the container so only new retractions are reported
+    publishDir "$params.retraction_state_dir", mode: 'copy', overwrite: true, pattern: 'bpc_retraction_state.npz'
 
     input:
     val previous
+    path previous_state, stageAs: 'previous_bpc_retraction_state.npz'
 
     output:
     stdout
+    path 'bpc_retraction_state.npz'
 
     script:
+    // there is no previous state on the first run
+    def restore_state = previous_state ? "cp $previous_state bpc_retraction_state.npz" : ""
     """
-    python3 /release_utils/check_bpc_retraction.py
+    $restore_state
+    python3 /release_utils/check_bpc_retraction.py --state_path bpc_retraction_state.npz
     """
 }
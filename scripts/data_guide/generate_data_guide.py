@@ -7,9 +7,12 @@ import sys
 import subprocess
 
 from jinja2 import Template
-import pandas as pd
 from synapseclient import Synapse, File
 
+from database_mapping import DatabaseMapping
+from release_resolver import ReleaseResolver
+from release_stats import DEFAULT_STATS_PATH, extract_release_stats
+
 # Login to Synapse
 syn = Synapse()
 syn.login()
@@ -18,54 +21,35 @@ syn.login()
 release = sys.argv[1]
 project_id = sys.argv[2]
 
-# Function to get the release folder Synapse ID
-def get_release_folder_synid(database_synid_mappingid: str, release: str) -> str:
-    """
-    Given a Synapse ID mapping database and a release name, returns the Synapse ID of the release folder.
-
-    Args:
-        database_synid_mappingid: The Synapse ID of the database mapping Synapse IDs to database names
-        release: The name of the release to retrieve the Synapse ID for
-
-    Returns:
-        The Synapse ID of the release folder
-
-    Raises:
-        ValueError: If the given release name is not found in the database
-    """
-
-    mapping_df = syn.tableQuery(f"SELECT * FROM {database_synid_mappingid}").asDataFrame()
-    release_folder_id = mapping_df[mapping_df["Database"] == "releaseFolder"]["Id"].values[0]
-
-    release_df = syn.tableQuery(
-        f"""
-        SELECT DISTINCT(name) AS releases FROM {release_folder_id}
-        WHERE name NOT LIKE 'Release%' AND name <> 'case_lists'
-        """
-    ).asDataFrame()
-
-    if release == "TEST.consortium":
-        release = "TESTING"
-    elif release == "TEST.public":
-        release = "TESTpublic"
-
-    if release not in release_df["releases"].values:
-        all_releases = ", ".join(release_df["releases"])
-        raise ValueError(f"Must choose correct release: {all_releases}")
-
-    result = syn.tableQuery(
-        f"SELECT id FROM {release_folder_id} WHERE name = '{release}'",
-        includeRowIdAndRowVersion=False
-    ).asDataFrame()
+# Get the release folder Synapse ID, which is passed to the template
+# so that the Quarto render doesn't resolve it again
+project_ent = syn.get(project_id)
+# the database mapping of the project is queried once for every lookup
+database_mapping = DatabaseMapping(
+    {project_id: project_ent.annotations["dbMapping"][0]}
+)
+release_folder_synid = ReleaseResolver(syn).from_database_mapping(
+    database_mapping, project_id, release
+)
+print(release_folder_synid)
 
-    return result["id"].values[0]
+# Extract the release statistics the template reads. They are reused
+# while the release is unchanged so text-only re-renders are quick
+extract_release_stats(
+    syn, release_folder_synid, database_mapping, project_id, DEFAULT_STATS_PATH
+)
 
 # Load template from file
 with open("data_guide.qmd.j2") as f:
     template = Template(f.read())
 
 # Substitute parameters
-filled_qmd = template.render(release=release, project_id=project_id)
+filled_qmd = template.render(
+    release=release,
+    project_id=project_id,
+    release_folder_synid=release_folder_synid,
+    stats_path=DEFAULT_STATS_PATH,
+)
 
 # Save output
 with open("data_guide.qmd", "w") as f:
@@ -76,11 +60,6 @@ subprocess.run([
     "quarto", "render", "data_guide.qmd"
 ], check=True)
 
-# Get the release folder Synapse ID
-project_ent = syn.get(project_id)
-database_synid_mappingid = project_ent.annotations["dbMapping"][0]
-release_folder_synid = get_release_folder_synid(database_synid_mappingid, release)
-print(release_folder_synid)
 # Upload the generated PDF back to Synapse
 pdf_file = File("data_guide.pdf", parent=release_folder_synid)
 syn.store(pdf_file, executed="https://github.com/Sage-Bionetworks-Workflows/nf-genie")
@@ -0,0 +1,267 @@
+"""
+Extracts every number and table the data guide shows for a release into one
+JSON bundle, so rendering the data guide doesn't download release files or
+query Synapse.
+
+The bundle is keyed by the etags of the release folder, of the release files
+the statistics are computed from, of the center table and of the OncoTree
+link, so re-rendering the data guide after a text-only change reuses the
+bundle and the statistics are only computed again once one of them changes.
+
+Usage:
+    from release_stats import extract_release_stats
+
+    stats = extract_release_stats(syn, release_folder_synid, mapping, database)
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from synapseclient import Entity, Synapse
+
+# the script is run from its own directory in the docker image, which has the
+# modules of scripts/shared copied in, and imported from the repository root by the tests
+try:
+    from database_mapping import DatabaseMapping
+except ImportError:
+    from scripts.shared.database_mapping import DatabaseMapping
+
+# Location of the release statistics bundle read by the data guide
+DEFAULT_STATS_PATH = "release_stats.json"
+
+# Table of the center abbreviations and names
+CENTER_TABLE_SYNID = "syn16982837"
+
+ALLOWED_COVERAGE = ["hotspot_regions", "coding_exons", "introns", "promoters"]
+
+ALLOWED_ALTERATIONS = [
+    "snv",
+    "small_indels",
+    "gene_level_cna",
+    "intragenic_cna",
+    "structural_variants",
+]
+
+ALLOWED_SPECIMEN_TYPES = ["FFPE", "fresh_frozen"]
+
+# Assay information columns whose values are counted per pipeline
+PIPELINE_COUNT_COLUMNS = [
+    "library_selection",
+    "library_strategy",
+    "platform",
+    "specimen_tumor_cellularity",
+]
+
+
+def get_file_mapping(syn: Synapse, release_folder_synid: str) -> Dict[str, str]:
+    """Maps filenames to their Synapse IDs, renaming BED file."""
+    children = syn.getChildren(release_folder_synid)
+    file_mapping = {}
+
+    for child in children:
+        name = child["name"]
+        if name == "genie_combined.bed":
+            name = "genomic_information.txt"
+        file_mapping[name] = child["id"]
+
+    return file_mapping
+
+
+def get_oncotree_link_entity(
+    syn: Synapse, database_mapping: DatabaseMapping, database: str
+) -> Entity:
+    """Fetches the entity of the OncoTree link used for the latest release."""
+    synid = database_mapping.get_synid("oncotreeLink", database)
+    return syn.get(synid, downloadFile=False)
+
+
+def get_centers(syn: Synapse, processed_centers: List[str]) -> pd.DataFrame:
+    """Gets the names of the centers with assays in the release."""
+    center_filter = "', '".join(processed_centers)
+    query = (
+        f'SELECT "Center Abbreviation", "Center" '
+        f"FROM {CENTER_TABLE_SYNID} "
+        f"WHERE \"Center Abbreviation\" IN ('{center_filter}')"
+    )
+    return syn.tableQuery(query, includeRowIdAndRowVersion=False).asDataFrame()
+
+
+def get_list_assay_info_table(
+    allowed_values: List[str], assayinfodf: pd.DataFrame, col: str
+) -> pd.DataFrame:
+    """Creates a matrix of X-marks for allowed values by SEQ_PIPELINE_ID."""
+    assayinfodf = assayinfodf.copy()
+    mask = assayinfodf[col].notna()
+    seq_assays = assayinfodf.loc[mask, "SEQ_PIPELINE_ID"].unique()
+
+    table = pd.DataFrame("", index=seq_assays, columns=allowed_values)
+
+    for panel in seq_assays:
+        str_value = assayinfodf.loc[
+            assayinfodf["SEQ_PIPELINE_ID"] == panel, col
+        ].values[0]
+        values = str_value.split(";")
+        for val in values:
+            if val in allowed_values:
+                table.at[panel, val] = "X"
+
+    return table
+
+
+def _to_json_value(value: Any) -> Any:
+    """Converts numpy scalars to the python values json can store."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def table_to_json(df: pd.DataFrame) -> Dict[str, list]:
+    """Converts a table to json, storing missing values as null."""
+    df = df.astype(object).where(df.notna(), None)
+    return {
+        "index": [_to_json_value(value) for value in df.index],
+        "columns": list(df.columns),
+        "data": [[_to_json_value(value) for value in row] for row in df.values],
+    }
+
+
+def table_from_json(table: Dict[str, list]) -> pd.DataFrame:
+    """Converts a table stored with table_to_json back to a dataframe."""
+    return pd.DataFrame(table["data"], index=table["index"], columns=table["columns"])
+
+
+def value_counts_to_json(values: pd.Series, sort: bool) -> List[list]:
+    """Counts the values of a column as [value, count] pairs."""
+    counts = values.value_counts(sort=sort)
+    return [[_to_json_value(value), int(count)] for value, count in counts.items()]
+
+
+def compute_assay_stats(assayinfodf: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Computes the assay statistics and tables shown in the data guide.
+
+    Args:
+        assayinfodf (pd.DataFrame): the assay_information.txt file of the release
+
+    Returns:
+        Dict[str, Any]: the assay statistics and tables
+    """
+    # Drop duplicates by SEQ_PIPELINE_ID, keeping the first occurrence
+    pipelinedf = assayinfodf.drop_duplicates(subset="SEQ_PIPELINE_ID")
+
+    columns = [
+        "SEQ_ASSAY_ID",
+        "calling_strategy",
+        "number_of_genes",
+        "target_capture_kit",
+    ]
+    gene_number_info = assayinfodf[columns].copy()
+    gene_number_info["number_of_genes"] = pd.to_numeric(
+        gene_number_info["number_of_genes"], errors="coerce"
+    ).astype("Int64")
+    gene_number_info = gene_number_info.sort_values(by="SEQ_ASSAY_ID")
+    gene_number_info.columns = [
+        "Sequencing Assay",
+        "Calling Strategy",
+        "Number of genes",
+        "Target Capture Kit",
+    ]
+
+    return {
+        "processed_centers": [
+            _to_json_value(center) for center in assayinfodf["CENTER"].unique()
+        ],
+        # countplots order the centers by count and the other values
+        # in the order they first appear
+        "pipelines_per_center": value_counts_to_json(pipelinedf["CENTER"], sort=True),
+        "pipeline_counts": {
+            col: value_counts_to_json(pipelinedf[col], sort=False)
+            for col in PIPELINE_COUNT_COLUMNS
+        },
+        "coverage_per_panel": table_to_json(
+            get_list_assay_info_table(ALLOWED_COVERAGE, pipelinedf, "coverage")
+        ),
+        "alterations_per_panel": table_to_json(
+            get_list_assay_info_table(
+                ALLOWED_ALTERATIONS, pipelinedf, "alteration_types"
+            )
+        ),
+        "specimen_per_panel": table_to_json(
+            get_list_assay_info_table(
+                ALLOWED_SPECIMEN_TYPES, pipelinedf, "preservation_technique"
+            )
+        ),
+        "gene_number_info": table_to_json(gene_number_info.reset_index(drop=True)),
+    }
+
+
+def load_release_stats(stats_path: str = DEFAULT_STATS_PATH) -> Optional[Dict]:
+    """
+    Loads a release statistics bundle.
+
+    Args:
+        stats_path (str, optional): path of the bundle. Defaults to DEFAULT_STATS_PATH.
+
+    Returns:
+        Optional[Dict]: the bundle or None if it doesn't exist
+    """
+    if not os.path.exists(stats_path):
+        return None
+    with open(stats_path, "r") as stats_file:
+        return json.load(stats_file)
+
+
+def extract_release_stats(
+    syn: Synapse,
+    release_folder_synid: str,
+    database_mapping: DatabaseMapping,
+    database: str,
+    stats_path: str = DEFAULT_STATS_PATH,
+) -> Dict[str, Any]:
+    """
+    Extracts the statistics of a release into a bundle, reusing the existing
+    bundle when the release folder, release files, center table and OncoTree
+    link are unchanged.
+
+    Args:
+        syn (Synapse): synapse client connection
+        release_folder_synid (str): synapse id of the release folder
+        database_mapping (DatabaseMapping): the database mapping tables
+        database (str): the database of the release in the database mapping
+        stats_path (str, optional): path of the bundle. Defaults to DEFAULT_STATS_PATH.
+
+    Returns:
+        Dict[str, Any]: the release statistics
+    """
+    release_files_mapping = get_file_mapping(syn, release_folder_synid)
+    # follow the link to get the etag of the file itself
+    assay_ent = syn.get(
+        release_files_mapping["assay_information.txt"],
+        followLink=True,
+        downloadFile=False,
+    )
+    oncotree_link_ent = get_oncotree_link_entity(syn, database_mapping, database)
+    key = {
+        "release_folder_synid": release_folder_synid,
+        "release_folder_etag": syn.get(release_folder_synid, downloadFile=False).etag,
+        "database_synid_mappingid": database_mapping.mapping_synids[database],
+        "assay_information_etag": assay_ent.etag,
+        "center_table_etag": syn.get(CENTER_TABLE_SYNID, downloadFile=False).etag,
+        "oncotree_link_etag": oncotree_link_ent.etag,
+    }
+    bundle = load_release_stats(stats_path)
+    if bundle is not None and bundle["key"] == key:
+        print(f"Reusing release statistics in {stats_path}")
+        return bundle["stats"]
+
+    assayinfo_entity = syn.get(assay_ent.id, version=assay_ent.versionNumber)
+    assayinfodf = pd.read_csv(assayinfo_entity.path, sep="\t")
+    stats = compute_assay_stats(assayinfodf)
+    stats["centers"] = table_to_json(get_centers(syn, stats["processed_centers"]))
+    stats["oncotree_link"] = oncotree_link_ent["externalURL"]
+
+    temp_stats_path = f"{stats_path}.tmp"
+    with open(temp_stats_path, "w") as stats_file:
+        json.dump({"key": key, "stats": stats}, stats_file)
+    os.replace(temp_stats_path, stats_path)
+    return stats
@@ -8,77 +8,490 @@ that they are the same.
 python compare_patch.py --original_synid syn55146141 --new_synid syn62069187
 """
 import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import zlib
 
 import synapseclient
 import synapseutils as synu
 
+# Default number of entity metadata requests sent to Synapse at the same time
+DEFAULT_MAX_WORKERS = 8
 
-def _get_file_dict(syn: synapseclient.Synapse, synid: str):
+# Natural key of each GENIE release file that can be diffed row by row.
+# Files where any of the key columns are missing are keyed on the whole row.
+GENIE_FILE_KEYS = {
+    "data_mutations_extended.txt": [
+        "Tumor_Sample_Barcode",
+        "Chromosome",
+        "Start_Position",
+        "End_Position",
+        "Reference_Allele",
+        "Tumor_Seq_Allele2",
+    ],
+    "data_cna_hg19.seg": ["ID", "chrom", "loc.start", "loc.end"],
+    "data_CNA.txt": ["Hugo_Symbol"],
+    "data_sv.txt": [
+        "Sample_Id",
+        "Site1_Hugo_Symbol",
+        "Site2_Hugo_Symbol",
+        "Site1_Position",
+        "Site2_Position",
+    ],
+    "data_gene_matrix.txt": ["SAMPLE_ID"],
+    "data_clinical.txt": ["SAMPLE_ID"],
+    "data_clinical_sample.txt": ["SAMPLE_ID"],
+    "data_clinical_patient.txt": ["PATIENT_ID"],
+    "assay_information.txt": ["SEQ_ASSAY_ID"],
+    "genomic_information.txt": [
+        "SEQ_ASSAY_ID",
+        "Chromosome",
+        "Start_Position",
+        "End_Position",
+    ],
+}
+
+# Default size of the on-disk buckets a file is split into when diffing it
+# row by row. Only one bucket per file is held in memory at a time.
+DEFAULT_BUCKET_SIZE_MB = 32
+
+# Default number of differing rows included in a row diff
+DEFAULT_MAX_SAMPLE_ROWS = 20
+
+
+def _get_file_metadata(syn: synapseclient.Synapse, synid: str) -> Dict[str, Any]:
+    """
+    Gets the metadata used to compare a file without downloading it.
+
+    Args:
+        syn (synapseclient.Synapse): A Synapse client object.
+        synid (str): The Synapse ID of the file.
+
+    Returns:
+        Dict[str, Any]: The Synapse ID, md5 and size of the file.
+    """
+    entity = syn.get(synid, downloadFile=False)
+    # the file handle comes back with the entity, so md5 and fileSize
+    # don't need another request. Links and tables do not have them.
+    return {
+        "id": entity.id,
+        "md5": getattr(entity, "md5", None),
+        "size": getattr(entity, "fileSize", None),
+    }
+
+
+def _get_file_dict(
+    syn: synapseclient.Synapse, synid: str, max_workers: int = DEFAULT_MAX_WORKERS
+) -> Dict[str, Dict[str, Any]]:
     """
     This function generates a dictionary of files from a Synapse ID.
+    The metadata of the files is fetched concurrently, with at most
+    max_workers requests in flight at a time.
 
     Args:
         syn (synapseclient.Synapse): A Synapse client object.
         synid (str): The Synapse ID of the files to retrieve.
+        max_workers (int, optional): The maximum number of requests sent at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
 
     Returns:
-        dict[str, str]: A dictionary mapping Synapse IDs to file names.
+        Dict[str, Dict[str, Any]]: A dictionary mapping file names to their Synapse ID, md5 and size.
     """
     all_files = synu.walk(syn, synid)
-    file_list = {}
+    file_synids = {}
     for _, _, files in all_files:
-        files = {name: syn.get(synid, downloadFile=False) for name, synid in files}
-        file_list.update(files)
-    return file_list
+        file_synids.update({name: file_synid for name, file_synid in files})
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        metadata = executor.map(
+            lambda file_synid: _get_file_metadata(syn, file_synid),
+            file_synids.values(),
+        )
+        return dict(zip(file_synids.keys(), metadata))
+
+
+def compare_file_dicts(
+    original_file_list: Dict[str, Dict[str, Any]],
+    new_file_list: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Compares the files of two releases by name and md5.
+
+    Args:
+        original_file_list (Dict[str, Dict[str, Any]]): The files of the original release.
+        new_file_list (Dict[str, Dict[str, Any]]): The files of the new release.
+
+    Returns:
+        Dict[str, Any]: The number of files in each release along with the
+            added, removed and changed file names.
+    """
+    return {
+        "original_file_count": len(original_file_list),
+        "new_file_count": len(new_file_list),
+        "added": sorted(set(new_file_list) - set(original_file_list)),
+        "removed": sorted(set(original_file_list) - set(new_file_list)),
+        "changed": sorted(
+            filename
+            for filename in set(original_file_list) & set(new_file_list)
+            if original_file_list[filename]["md5"] != new_file_list[filename]["md5"]
+        ),
+    }
+
+
+def _read_tsv_header(filepath: str) -> List[str]:
+    """
+    Gets the column names of a tsv, skipping any leading `#` comment lines.
+
+    Args:
+        filepath (str): The path to the file.
+
+    Returns:
+        List[str]: The column names
+    """
+    with open(filepath, "r", newline="") as in_file:
+        header = in_file.readline()
+        while header.startswith("#"):
+            header = in_file.readline()
+    return header.rstrip("\r\n").split("\t")
+
+
+def _partition_rows(
+    filepath: str,
+    columns: List[str],
+    key_columns: List[str],
+    bucket_paths: List[str],
+) -> int:
+    """
+    Streams a tsv into bucket files by the hash of each row's key so that
+    rows with the same key in two files land in the same bucket. Only the
+    given columns are written out, in the given order.
+
+    Args:
+        filepath (str): The path to the file to partition.
+        columns (List[str]): The columns to compare, in order.
+        key_columns (List[str]): The columns making up the key of a row.
+        bucket_paths (List[str]): The paths of the bucket files to write.
+
+    Returns:
+        int: The number of rows in the file
+    """
+    key_idx = [columns.index(column) for column in key_columns]
+    row_count = 0
+    with open(filepath, "r", newline="") as in_file, ExitStack() as stack:
+        bucket_files = [
+            stack.enter_context(open(bucket_path, "w", newline=""))
+            for bucket_path in bucket_paths
+        ]
+        header = in_file.readline()
+        while header.startswith("#"):
+            header = in_file.readline()
+        header = header.rstrip("\r\n").split("\t")
+        column_idx = [header.index(column) for column in columns]
+        for line in in_file:
+            values = line.rstrip("\r\n").split("\t")
+            values += [""] * (len(header) - len(values))
+            row = [values[idx] for idx in column_idx]
+            key = "\t".join(row[idx] for idx in key_idx)
+            bucket = zlib.crc32(key.encode("utf-8")) % len(bucket_files)
+            bucket_files[bucket].write("\t".join(row) + "\n")
+            row_count += 1
+    return row_count
+
+
+def _read_bucket(
+    bucket_path: str, key_idx: List[int]
+) -> Dict[Tuple[str, ...], Counter]:
+    """
+    Reads a bucket file into a mapping of each key to the count of each of its rows.
+
+    Args:
+        bucket_path (str): The path of the bucket file.
+        key_idx (List[int]): The indices of the key columns.
+
+    Returns:
+        Dict[Tuple[str, ...], Counter]: The rows of each key
+    """
+    rows = {}
+    with open(bucket_path, "r", newline="") as bucket_file:
+        for line in bucket_file:
+            values = tuple(line.rstrip("\n").split("\t"))
+            key = tuple(values[idx] for idx in key_idx)
+            rows.setdefault(key, Counter())[values] += 1
+    return rows
 
 
-def compare_releases(original_synid: str, new_synid: str):
+def diff_release_file(
+    original_path: str,
+    new_path: str,
+    key_columns: Optional[List[str]] = None,
+    bucket_size_mb: int = DEFAULT_BUCKET_SIZE_MB,
+    max_sample_rows: int = DEFAULT_MAX_SAMPLE_ROWS,
+) -> Dict[str, Any]:
+    """
+    Diffs two versions of a tsv row by row on its natural key. Both files are
+    hash partitioned on the key into on-disk buckets sized by bucket_size_mb
+    and compared one bucket at a time, so memory use is bounded by the bucket
+    size rather than the size of the files. Only the columns in common are
+    compared.
+
+    NOTE: synapse_compare.partitioned_compare partitions files the same way.
+    It isn't reused here because the synapse_compare package isn't installed
+    in the patch_release image, and because release files are diffed as raw
+    tab separated lines (no csv quoting or NA handling) so that the sample
+    rows show the values exactly as released. Keep the bucketing of the two
+    (crc32 of the tab joined key, bucket count from the larger file size) in step.
+
+    Args:
+        original_path (str): The path to the original file.
+        new_path (str): The path to the new file.
+        key_columns (List[str], optional): The columns making up the key of a row.
+            Defaults to None, which keys on every column in common.
+        bucket_size_mb (int, optional): The approximate size of each bucket.
+            Defaults to DEFAULT_BUCKET_SIZE_MB.
+        max_sample_rows (int, optional): The maximum number of differing rows to return.
+            Defaults to DEFAULT_MAX_SAMPLE_ROWS.
+
+    Returns:
+        Dict[str, Any]: The column and row differences along with a sample of differing rows
+    """
+    original_header = _read_tsv_header(original_path)
+    new_header = _read_tsv_header(new_path)
+    new_columns = set(new_header)
+    columns = [column for column in original_header if column in new_columns]
+    if key_columns is None or not set(key_columns).issubset(columns):
+        key_columns = columns
+    key_idx = [columns.index(column) for column in key_columns]
+
+    file_size = max(os.path.getsize(original_path), os.path.getsize(new_path))
+    bucket_count = int(max(1, -(-file_size // (bucket_size_mb * 1024 * 1024))))
+
+    diff = {
+        "key": key_columns,
+        "columns": columns,
+        "added_columns": [column for column in new_header if column not in columns],
+        "removed_columns": [
+            column for column in original_header if column not in new_columns
+        ],
+        "original_rows": 0,
+        "new_rows": 0,
+        "rows_only_in_original": 0,
+        "rows_only_in_new": 0,
+        "changed_rows": 0,
+        "sample_rows": [],
+    }
+
+    def _add_sample(sample: Dict[str, Any]) -> None:
+        if len(diff["sample_rows"]) < max_sample_rows:
+            diff["sample_rows"].append(sample)
+
+    with tempfile.TemporaryDirectory() as bucket_dir:
+        original_buckets = [
+            os.path.join(bucket_dir, f"original_{bucket}.tsv")
+            for bucket in range(bucket_count)
+        ]
+        new_buckets = [
+            os.path.join(bucket_dir, f"new_{bucket}.tsv")
+            for bucket in range(bucket_count)
+        ]
+        diff["original_rows"] = _partition_rows(
+            original_path, columns, key_columns, original_buckets
+        )
+        diff["new_rows"] = _partition_rows(new_path, columns, key_columns, new_buckets)
+
+        for original_bucket, new_bucket in zip(original_buckets, new_buckets):
+            original_rows = _read_bucket(original_bucket, key_idx)
+            new_rows = _read_bucket(new_bucket, key_idx)
+            for key in original_rows.keys() | new_rows.keys():
+                original_counts = original_rows.get(key, Counter())
+                new_counts = new_rows.get(key, Counter())
+                removed = list((original_counts - new_counts).elements())
+                added = list((new_counts - original_counts).elements())
+                # rows of the same key on both sides are changed rows
+                for original_row, new_row in zip(removed, added):
+                    diff["changed_rows"] += 1
+                    _add_sample(
+                        {
+                            "type": "changed",
+                            "key": list(key),
+                            "changed_columns": [
+                                column
+                                for column, original_value, new_value in zip(
+                                    columns, original_row, new_row
+                                )
+                                if original_value != new_value
+                            ],
+                            "original": list(original_row),
+                            "new": list(new_row),
+                        }
+                    )
+                for original_row in removed[len(added) :]:
+                    diff["rows_only_in_original"] += 1
+                    _add_sample(
+                        {"type": "removed", "key": list(key), "original": list(original_row)}
+                    )
+                for new_row in added[len(removed) :]:
+                    diff["rows_only_in_new"] += 1
+                    _add_sample({"type": "added", "key": list(key), "new": list(new_row)})
+    return diff
+
+
+def diff_changed_files(
+    syn: synapseclient.Synapse,
+    original_file_list: Dict[str, Dict[str, Any]],
+    new_file_list: Dict[str, Dict[str, Any]],
+    changed: List[str],
+    bucket_size_mb: int = DEFAULT_BUCKET_SIZE_MB,
+    max_sample_rows: int = DEFAULT_MAX_SAMPLE_ROWS,
+) -> Dict[str, Any]:
+    """
+    Downloads both versions of each changed GENIE release file and diffs
+    them row by row on the file's natural key.
+
+    Args:
+        syn (synapseclient.Synapse): A Synapse client object.
+        original_file_list (Dict[str, Dict[str, Any]]): The files of the original release.
+        new_file_list (Dict[str, Dict[str, Any]]): The files of the new release.
+        changed (List[str]): The names of the files with different md5s.
+        bucket_size_mb (int, optional): The approximate size of each bucket.
+            Defaults to DEFAULT_BUCKET_SIZE_MB.
+        max_sample_rows (int, optional): The maximum number of differing rows to return per file.
+            Defaults to DEFAULT_MAX_SAMPLE_ROWS.
+
+    Returns:
+        Dict[str, Any]: A mapping of each changed file name to its row diff. Files
+            that are not tabular GENIE files are mapped to None.
+    """
+    row_diffs = {}
+    for filename in changed:
+        if filename not in GENIE_FILE_KEYS:
+            row_diffs[filename] = None
+            continue
+        original_ent = syn.get(original_file_list[filename]["id"])
+        new_ent = syn.get(new_file_list[filename]["id"])
+        row_diffs[filename] = diff_release_file(
+            original_ent.path,
+            new_ent.path,
+            key_columns=GENIE_FILE_KEYS[filename],
+            bucket_size_mb=bucket_size_mb,
+            max_sample_rows=max_sample_rows,
+        )
+    return row_diffs
+
+
+def compare_releases(
+    original_synid: str,
+    new_synid: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    row_diff: bool = False,
+    bucket_size_mb: int = DEFAULT_BUCKET_SIZE_MB,
+    max_sample_rows: int = DEFAULT_MAX_SAMPLE_ROWS,
+) -> Dict[str, Any]:
     """
     This function compares two folders that should have identifical files
-    with each file's MD5s
+    with each file's MD5s. The file metadata of both folders is fetched
+    at the same time.
 
     Args:
         original_synid (str): The Synapse ID of the original release.
         new_synid (str): The Synapse ID of the new release.
+        max_workers (int, optional): The maximum number of requests sent at the same time
+            per release. Defaults to DEFAULT_MAX_WORKERS.
+        row_diff (bool, optional): Whether to diff the changed files row by row.
+            Defaults to False.
+        bucket_size_mb (int, optional): The approximate size of each bucket used in
+            the row diff. Defaults to DEFAULT_BUCKET_SIZE_MB.
+        max_sample_rows (int, optional): The maximum number of differing rows
+            reported per file in the row diff. Defaults to DEFAULT_MAX_SAMPLE_ROWS.
 
     Returns:
-        tuple: A tuple containing the original release entity, the new release entity,
-        and a list of retracted entities.
+        Dict[str, Any]: The Synapse IDs of the two releases, the number of files in each
+            along with the added, removed and changed file names. Includes the row
+            diff of each changed file if row_diff is True.
     """
 
     # Log in to Synapse
     syn = synapseclient.login()
 
-    # Get the entities for the original and new releases
-    # original_ent = syn.get(original_synid)
-    # original_files = synu.walk(original_synid)
-    original_file_list = _get_file_dict(syn, original_synid)
-    # new_ent = syn.get(new_synid)
-    # new_files = synu.walk(new_synid)
-    new_file_list = _get_file_dict(syn, new_synid)
-
-    # Check that the two folders have the same number of files
-    print("Number of files in old folder: ", len(original_file_list))
-    print("Number of files in new folder: ", len(new_file_list))
-    for filename in new_file_list.keys():
-        if original_file_list.get(filename) is None:
-            print("File not found in old folder: ", filename)
-
-    for filename in original_file_list.keys():
-        if new_file_list.get(filename) is None:
-            print("File not found in new folder: ", filename)
-        else:
-            if original_file_list[filename].md5 != new_file_list[filename].md5:
-                print("Files are different: ", filename)
+    # Get the files of the original and new releases
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        original_future = executor.submit(
+            _get_file_dict, syn, original_synid, max_workers
+        )
+        new_future = executor.submit(_get_file_dict, syn, new_synid, max_workers)
+        original_file_list = original_future.result()
+        new_file_list = new_future.result()
+
+    comparison = {
+        "original_synid": original_synid,
+        "new_synid": new_synid,
+        **compare_file_dicts(original_file_list, new_file_list),
+    }
+    if row_diff:
+        comparison["row_diffs"] = diff_changed_files(
+            syn,
+            original_file_list,
+            new_file_list,
+            changed=comparison["changed"],
+            bucket_size_mb=bucket_size_mb,
+            max_sample_rows=max_sample_rows,
+        )
+    return comparison
+
 
 def main():
     parser = argparse.ArgumentParser(description='Compare two Synapse releases.')
     parser.add_argument('--original_synid', type=str, help='The Synapse ID of the original release')
     parser.add_argument('--new_synid', type=str, help='The Synapse ID of the new release')
+    parser.add_argument(
+        '--max_workers',
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help='The maximum number of requests sent to Synapse at the same time per release',
+    )
+    parser.add_argument(
+        '--row_diff',
+        action='store_true',
+        help='Diff each changed GENIE file row by row on its natural key',
+    )
+    parser.add_argument(
+        '--bucket_size_mb',
+        type=int,
+        default=DEFAULT_BUCKET_SIZE_MB,
+        help='Approximate size of the on-disk buckets used by the row diff',
+    )
+    parser.add_argument(
+        '--max_sample_rows',
+        type=int,
+        default=DEFAULT_MAX_SAMPLE_ROWS,
+        help='Maximum number of differing rows reported per file by the row diff',
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Path to write the comparison json to. Printed to stdout if not specified',
+    )
 
     args = parser.parse_args()
 
-    compare_releases(args.original_synid, args.new_synid)
+    comparison = compare_releases(
+        args.original_synid,
+        args.new_synid,
+        max_workers=args.max_workers,
+        row_diff=args.row_diff,
+        bucket_size_mb=args.bucket_size_mb,
+        max_sample_rows=args.max_sample_rows,
+    )
+    comparison_json = json.dumps(comparison, indent=2)
+    if args.output is None:
+        print(comparison_json)
+    else:
+        with open(args.output, "w") as output_file:
+            output_file.write(comparison_json)
 
 if __name__ == "__main__":
     main()
@@ -7,16 +7,432 @@ the specific public release. Due to the GENIE retraction policy,
 it is best to retract data on the 3rd consortium release of the
 subsequent release series.
 """
+
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import operator
 import os
 import shutil
 import tempfile
+import threading
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+)
 
+import numpy as np
 import pandas as pd
 import synapseclient
+from synapseclient.core.utils import md5_for_file
+import synapseutils as synu
 
 from genie import create_case_lists, dashboard_table_updater, process_functions
 
+# modules of scripts/shared copied in, and imported from the repository root by the tests
+try:
+    from file_handles import get_data_file_handle
+except ImportError:
+    from scripts.shared.file_handles import get_data_file_handle
+
+logger = logging.getLogger(__name__)
+
+# Default number of files downloaded, patched and uploaded at the same time
+DEFAULT_MAX_WORKERS = 8
+
+
+class PatchResult(NamedTuple):
+    """The outcome of storing a single file into the new release.
+
+    status is one of:
+        linked: identical to the source, the source file handle is reused
+        copied: identical to the source, the source file handle is copied server side
+        rewritten: the contents changed so the file is uploaded
+
+    entity is fetched without downloading it when the result is restored
+    from a PatchCheckpoint.
+    """
+
+    path: str
+    status: str
+    entity: synapseclient.Entity
+
+
+class RetractionIndex:
+    """The samples, patients and SEQ_ASSAY_IDs kept in a patch release.
+
+    This is built once from the clinical sample file and shared by every
+    patch step. The kept values are stored both as hashed sets, for row by
+    row membership while streaming files, and as hashed indexes, for bulk
+    membership of numpy/arrow arrays without rehashing the kept values
+    on every call.
+    """
+
+    def __init__(
+        self,
+        keep_samples: Iterable[str],
+        keep_patients: Iterable[str],
+        keep_seq_assay_ids: Iterable[str],
+    ) -> None:
+        """
+        Args:
+            keep_samples (Iterable[str]): The SAMPLE_IDs to keep.
+            keep_patients (Iterable[str]): The PATIENT_IDs to keep.
+            keep_seq_assay_ids (Iterable[str]): The SEQ_ASSAY_IDs to keep.
+        """
+        self._sample_index = pd.Index(keep_samples, dtype=object).unique()
+        self._patient_index = pd.Index(keep_patients, dtype=object).unique()
+        self._seq_assay_id_index = pd.Index(keep_seq_assay_ids, dtype=object).unique()
+        self.keep_samples = frozenset(self._sample_index)
+        self.keep_patients = frozenset(self._patient_index)
+        self.keep_seq_assay_ids = frozenset(self._seq_assay_id_index)
+
+    @classmethod
+    def from_sample_df(
+        cls,
+        sampledf: pd.DataFrame,
+        retracted_samples: Iterable[str],
+        remove_centers: Optional[List[str]] = None,
+        remove_seq_assay_ids: Optional[List[str]] = None,
+    ) -> "RetractionIndex":
+        """
+        Builds the index from the clinical sample file in one pass. Samples are
+        retracted if they are in the retracted samples, belong to a removed
+        center or were sequenced with a removed SEQ_ASSAY_ID.
+
+        Args:
+            sampledf (pd.DataFrame): The clinical sample data with SAMPLE_ID,
+                PATIENT_ID and SEQ_ASSAY_ID columns.
+            retracted_samples (Iterable[str]): The SAMPLE_IDs to retract.
+            remove_centers (List[str], optional): The centers to retract. Defaults to None.
+            remove_seq_assay_ids (List[str], optional): The SEQ_ASSAY_IDs to retract.
+                Defaults to None.
+
+        Returns:
+            RetractionIndex: The kept samples, patients and SEQ_ASSAY_IDs
+        """
+        centers = sampledf["PATIENT_ID"].str.split("-").str[1]
+        to_remove_samples = (
+            sampledf["SAMPLE_ID"].isin(set(retracted_samples))
+            | centers.isin(set(remove_centers or []))
+            | sampledf["SEQ_ASSAY_ID"].isin(set(remove_seq_assay_ids or []))
+        )
+        final_sampledf = sampledf[~to_remove_samples]
+        return cls(
+            keep_samples=final_sampledf["SAMPLE_ID"],
+            keep_patients=final_sampledf["PATIENT_ID"],
+            keep_seq_assay_ids=final_sampledf["SEQ_ASSAY_ID"],
+        )
+
+    def fingerprint(self) -> str:
+        """
+        Returns:
+            str: md5 of the kept values, used to tell whether two runs retract the same data
+        """
+        fingerprint = hashlib.md5()
+        for keep_values in (
+            self.keep_samples,
+            self.keep_patients,
+            self.keep_seq_assay_ids,
+        ):
+            fingerprint.update("\n".join(sorted(keep_values)).encode("utf-8"))
+            fingerprint.update(b"\0")
+        return fingerprint.hexdigest()
+
+    @staticmethod
+    def _isin(index: pd.Index, values: Iterable[str]) -> np.ndarray:
+        """Bulk membership of the values in the hashed index"""
+        return index.get_indexer(np.asarray(values, dtype=object)) != -1
+
+    def is_kept_sample(self, values: Iterable[str]) -> np.ndarray:
+        """
+        Args:
+            values (Iterable[str]): SAMPLE_IDs, e.g: a numpy or arrow array.
+
+        Returns:
+            np.ndarray: Boolean mask of the values that are kept
+        """
+        return self._isin(self._sample_index, values)
+
+    def is_kept_patient(self, values: Iterable[str]) -> np.ndarray:
+        """
+        Args:
+            values (Iterable[str]): PATIENT_IDs, e.g: a numpy or arrow array.
+
+        Returns:
+            np.ndarray: Boolean mask of the values that are kept
+        """
+        return self._isin(self._patient_index, values)
+
+    def is_kept_seq_assay_id(self, values: Iterable[str]) -> np.ndarray:
+        """
+        Args:
+            values (Iterable[str]): SEQ_ASSAY_IDs, e.g: a numpy or arrow array.
+
+        Returns:
+            np.ndarray: Boolean mask of the values that are kept
+        """
+        return self._isin(self._seq_assay_id_index, values)
+
+
+class PatchCheckpoint:
+    """A local manifest of the files stored and the steps completed by a patch
+    release run.
+
+    Every file is recorded under its step as soon as it is stored, along with
+    its path, md5, status and stored Synapse ID, and each step records its
+    inputs once all of its files are stored. When a failed run is restarted
+    with the same checkpoint directory, steps whose inputs are unchanged and
+    whose outputs are still on disk are skipped, and within the steps that
+    are rerun, files whose patched contents are unchanged aren't stored again,
+    so no extra versions are created for them.
+
+    The store and patch functions, and run_checkpointed_step, take the same
+    arguments, described here once and referred to from their docstrings:
+    checkpoint, the checkpoint of the run, which stores every file if None;
+    step, the name the files are recorded under in the checkpoint; and
+    owner_id, the Synapse user ID of the user running the patch, whose file
+    handles are reused without being copied, which is looked up if None.
+    """
+
+    def __init__(
+        self,
+        syn: synapseclient.Synapse,
+        manifest_path: str,
+        run_inputs: Dict[str, Any],
+    ) -> None:
+        """
+        Args:
+            syn (synapseclient.Synapse): The Synapse client object, used to get
+                the stored entities of the files recorded in the manifest.
+            manifest_path (str): The path to the json manifest.
+            run_inputs (Dict[str, Any]): The inputs of the whole run. An existing
+                manifest is discarded if these differ from the ones it was created with.
+        """
+        self.syn = syn
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self._manifest = {"run_inputs": run_inputs, "steps": {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest["run_inputs"] == run_inputs:
+                self._manifest = manifest
+            else:
+                logger.info("Run inputs changed, ignoring existing checkpoint")
+
+    def _write(self) -> None:
+        """Writes the manifest to disk. Must be called with the lock held."""
+        temp_manifest_path = f"{self.manifest_path}.tmp"
+        with open(temp_manifest_path, "w") as manifest_file:
+            json.dump(self._manifest, manifest_file, indent=2)
+        os.replace(temp_manifest_path, self.manifest_path)
+
+    @staticmethod
+    def _is_on_disk(output: Dict[str, Any]) -> bool:
+        """Whether a recorded file is still on disk with the same contents.
+        Files reused without being written out locally are always on disk."""
+        if output["md5"] is None:
+            return True
+        return (
+            os.path.exists(output["path"])
+            and md5_for_file(output["path"]).hexdigest() == output["md5"]
+        )
+
+    def _restore(self, output: Dict[str, Any]) -> PatchResult:
+        """Restores the result of a recorded file along with its stored entity"""
+        return PatchResult(
+            path=output["path"],
+            status=output["status"],
+            entity=self.syn.get(output["entity_id"], downloadFile=False),
+        )
+
+    def get_completed(
+        self, step: str, inputs: Dict[str, Any]
+    ) -> Optional[List[PatchResult]]:
+        """
+        Gets the results of a step if it was completed with the same inputs
+        and all of its outputs are still on disk.
+
+        Args:
+            step (str): The name of the step.
+            inputs (Dict[str, Any]): The inputs of the step.
+
+        Returns:
+            Optional[List[PatchResult]]: The results of the step or None if it has to be run
+        """
+        record = self._manifest["steps"].get(step)
+        if record is None or record["inputs"] != inputs or "outputs" not in record:
+            return None
+        if not all(self._is_on_disk(output) for output in record["outputs"]):
+            return None
+        return [self._restore(output) for output in record["outputs"]]
+
+    def start(self, step: str, inputs: Dict[str, Any]) -> None:
+        """
+        Records that a step is being run. The files a previous run stored for
+        the step are kept if the step has the same inputs and forgotten otherwise.
+
+        Args:
+            step (str): The name of the step.
+            inputs (Dict[str, Any]): The inputs of the step.
+        """
+        with self._lock:
+            record = self._manifest["steps"].get(step)
+            files = record["files"] if record and record["inputs"] == inputs else {}
+            self._manifest["steps"][step] = {"inputs": inputs, "files": files}
+            self._write()
+
+    def get_stored(self, step: str, path: str) -> Optional[PatchResult]:
+        """
+        Gets the result of a file of a step if a previous run already stored
+        it with the same contents.
+
+        Args:
+            step (str): The name of the step.
+            path (str): The path to the file to be stored.
+
+        Returns:
+            Optional[PatchResult]: The result of the file or None if it has to be stored
+        """
+        with self._lock:
+            record = self._manifest["steps"].get(step, {})
+            output = record.get("files", {}).get(os.path.basename(path))
+        if output is None or output["path"] != path or not self._is_on_disk(output):
+            return None
+        return self._restore(output)
+
+    @staticmethod
+    def _output(result: PatchResult) -> Dict[str, Any]:
+        """The record of a stored file"""
+        return {
+            "path": result.path,
+            # files reused without being written out locally have no md5
+            "md5": (
+                md5_for_file(result.path).hexdigest()
+                if os.path.exists(result.path)
+                else None
+            ),
+            "status": result.status,
+            "entity_id": result.entity.id,
+        }
+
+    def record_stored(self, step: str, result: PatchResult) -> None:
+        """
+        Records a stored file of a step and writes the manifest to disk.
+
+        Args:
+            step (str): The name of the step.
+            result (PatchResult): The result of storing the file.
+        """
+        output = self._output(result)
+        with self._lock:
+            record = self._manifest["steps"].setdefault(step, {"inputs": None})
+            record.setdefault("files", {})[os.path.basename(result.path)] = output
+            self._write()
+
+    def complete(
+        self, step: str, inputs: Dict[str, Any], results: List[PatchResult]
+    ) -> None:
+        """
+        Records a completed step and writes the manifest to disk.
+
+        Args:
+            step (str): The name of the step.
+            inputs (Dict[str, Any]): The inputs of the step.
+            results (List[PatchResult]): The results of the step.
+        """
+        outputs = [self._output(result) for result in results]
+        with self._lock:
+            record = self._manifest["steps"].get(step, {})
+            self._manifest["steps"][step] = {
+                "inputs": inputs,
+                "files": record.get("files", {}),
+                "outputs": outputs,
+            }
+            self._write()
+
+
+def run_checkpointed_step(
+    checkpoint: Optional[PatchCheckpoint],
+    step: str,
+    inputs: Dict[str, Any],
+    task: Callable[[], Any],
+) -> List[PatchResult]:
+    """
+    Runs a patch step unless the checkpoint shows it was already completed.
+
+    Args:
+        checkpoint, step: See PatchCheckpoint. The step is always run if
+            there is no checkpoint.
+        inputs (Dict[str, Any]): The inputs of the step.
+        task (Callable[[], Any]): The step, returning a PatchResult or a list of them.
+
+    Returns:
+        List[PatchResult]: The results of the step
+    """
+    if checkpoint is not None:
+        completed = checkpoint.get_completed(step, inputs)
+        if completed is not None:
+            logger.info(f"Skipping completed step: {step}")
+            return completed
+        checkpoint.start(step, inputs)
+    results = task()
+    if isinstance(results, PatchResult):
+        results = [results]
+    if checkpoint is not None:
+        checkpoint.complete(step, inputs, results)
+    return results
+
+
+def _store_checkpointed_file(
+    checkpoint: Optional[PatchCheckpoint],
+    step: Optional[str],
+    new_path: str,
+    store: Callable[[], PatchResult],
+) -> PatchResult:
+    """
+    Stores a file of a patch step unless the checkpoint shows that a previous
+    run already stored it with the same contents.
+
+    Args:
+        checkpoint, step: See PatchCheckpoint.
+        new_path (str): The path to the file to be stored.
+        store (Callable[[], PatchResult]): Stores the file.
+
+    Returns:
+        PatchResult: The result of storing the file
+    """
+    if checkpoint is not None:
+        stored = checkpoint.get_stored(step, new_path)
+        if stored is not None:
+            logger.info(f"Skipping stored file: {os.path.basename(new_path)}")
+            return stored
+    result = store()
+    if checkpoint is not None:
+        checkpoint.record_stored(step, result)
+    return result
+
+
+def _entity_inputs(entity: synapseclient.Entity) -> Dict[str, Any]:
+    """The id, version and md5 of a source entity, used as step inputs"""
+    return {
+        "id": entity.id,
+        "versionNumber": entity.versionNumber,
+        "md5": getattr(entity, "md5", None),
+    }
+
 
 # Run time functions
 def revise_meta_file(meta_file_path: str, old_version: str, new_version: str) -> None:
@@ -38,23 +454,156 @@ def revise_meta_file(meta_file_path: str, old_version: str, new_version: str) ->
         meta.write(meta_text)
 
 
-def _filter_tsv(filepath: str, keep_values: pd.Series, column: str) -> pd.DataFrame:
+def _copy_comment_header(in_file: TextIO, out_file: TextIO) -> str:
     """
-    Patches a tsv in Synapse by filtering out rows based on the provided keep values.
+    Copies the leading `#` comment lines of a tsv over verbatim and
+    returns the column header line that follows them.
 
     Args:
-        syn (synapseclient.Synapse): The Synapse client object.
-        synid (str): The Synapse ID of the entity to be patched.
-        keep_values (pd.Series): The values to keep in the dataframe.
+        in_file (TextIO): The open file to read from.
+        out_file (TextIO): The open file to write to.
+
+    Returns:
+        str: The column header line
+    """
+    header = in_file.readline()
+    while header.startswith("#"):
+        out_file.write(header)
+        header = in_file.readline()
+    return header
+
+
+def _get_tsv_header(filepath: str) -> List[str]:
+    """
+    Gets the column names of a tsv, skipping any leading `#` comment lines.
+
+    Args:
+        filepath (str): The path to the file.
+
+    Returns:
+        List[str]: The column names
+    """
+    with open(filepath, "r", newline="") as in_file:
+        header = in_file.readline()
+        while header.startswith("#"):
+            header = in_file.readline()
+    return header.rstrip("\r\n").split("\t")
+
+
+def _filter_tsv(
+    filepath: str, new_path: str, keep_values: AbstractSet[str], column: str
+) -> str:
+    """
+    Streams a tsv line by line, writing out only the rows whose value in
+    `column` is in the provided keep values. Leading `#` comment headers
+    are copied over verbatim and kept rows are written out exactly as they
+    appear in the original file, so memory use stays flat regardless of
+    the size of the file.
+
+    Args:
+        filepath (str): The path to the file to be filtered.
+        new_path (str): The path to write the filtered file to.
+        keep_values (AbstractSet[str]): The values to keep in the file.
         column (str): The column name to filter on.
 
+    Raises:
+        ValueError: If the column to filter on is not in the header.
+
+    Returns:
+        str: The file path to the filtered file
+    """
+    with open(filepath, "r", newline="") as in_file, open(
+        new_path, "w", newline=""
+    ) as out_file:
+        header = _copy_comment_header(in_file, out_file)
+        out_file.write(header)
+        header_cols = header.rstrip("\r\n").split("\t")
+        if column not in header_cols:
+            raise ValueError(f"{column} not found in the header of {filepath}")
+        col_idx = header_cols.index(column)
+        for line in in_file:
+            values = line.rstrip("\r\n").split("\t", col_idx + 1)
+            if len(values) > col_idx and values[col_idx] in keep_values:
+                out_file.write(line)
+    return new_path
+
+
+def _filter_tsv_columns(filepath: str, new_path: str, keep_idx: List[int]) -> str:
+    """
+    Streams a tsv line by line, writing out only the columns at the provided
+    indices. Leading `#` comment headers are copied over verbatim and the
+    values are sliced as strings, so only one row is held in memory at a time
+    and there is no float/int round-trip of the values. Blank lines are
+    skipped.
+
+    Args:
+        filepath (str): The path to the file to be filtered.
+        new_path (str): The path to write the filtered file to.
+        keep_idx (List[int]): The indices of the columns to keep, in order.
+
+    Returns:
+        str: The file path to the filtered file
+    """
+    get_values = operator.itemgetter(*keep_idx)
+    with open(filepath, "r", newline="") as in_file, open(
+        new_path, "w", newline=""
+    ) as out_file:
+        lines = itertools.chain([_copy_comment_header(in_file, out_file)], in_file)
+        for line in lines:
+            row = line.rstrip("\r\n")
+            # blank lines have no columns to keep, pd.read_csv skipped them too
+            if not row:
+                continue
+            line_ending = line[len(row) :]
+            values = get_values(row.split("\t"))
+            # itemgetter returns a single value rather than a tuple for one index
+            if len(keep_idx) == 1:
+                values = (values,)
+            out_file.write("\t".join(values) + line_ending)
+    return new_path
+
+
+def _run_concurrently(
+    tasks: List[Callable[[], Any]], max_workers: int = DEFAULT_MAX_WORKERS
+) -> List[Any]:
+    """
+    Runs independent tasks in a bounded thread pool. Synapse downloads and
+    uploads are dominated by network I/O so threads let them overlap.
+
+    Args:
+        tasks (List[Callable[[], Any]]): The tasks to run, taking no arguments.
+        max_workers (int, optional): The maximum number of tasks run at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        List[Any]: The result of each task, in the same order as the tasks
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def download_entities(
+    syn: synapseclient.Synapse,
+    synids: List[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[str, synapseclient.Entity]:
+    """
+    Downloads Synapse entities concurrently so that they are in the cache
+    by the time each patch step gets them.
+
+    Args:
+        syn (synapseclient.Synapse): The Synapse client object.
+        synids (List[str]): The Synapse IDs of the entities to download.
+        max_workers (int, optional): The maximum number of downloads run at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
+
     Returns:
-        pd.DataFrame: The patched dataframe.
+        Dict[str, synapseclient.Entity]: A mapping of Synapse ID to downloaded entity.
     """
-    df = pd.read_csv(filepath, sep="\t", comment="#")
-    # if not segdf.ID.isin(keep_samples).all():
-    df = df[df[column].isin(keep_values)]
-    return df
+    tasks = [functools.partial(syn.get, synid, followLink=True) for synid in synids]
+    entities = _run_concurrently(tasks, max_workers=max_workers)
+    return dict(zip(synids, entities))
 
 
 # TODO remove new_release parameter soon
@@ -77,14 +626,169 @@ def store_file(
     return new_ent
 
 
+def store_unchanged_file(
+    syn: synapseclient.Synapse,
+    new_path: str,
+    source_ent: synapseclient.File,
+    new_release_synid: str,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> PatchResult:
+    """
+    Stores a file that is identical to its source into Synapse without
+    uploading it again. The source file handle is reused if it was created
+    by the current user, otherwise it is copied server side.
+
+    Args:
+        syn (synapseclient.Synapse): The Synapse client object.
+        new_path (str): The path to the file to be stored, used for its name.
+        source_ent (synapseclient.File): The source entity the file is identical to.
+        new_release_synid (str): The Synapse ID of the release folder where the file will be stored.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Raises:
+        ValueError: If the source file handle could not be copied.
+
+    Returns:
+        PatchResult: The new entity along with whether it was linked or copied
+    """
+    return _store_checkpointed_file(
+        checkpoint,
+        step,
+        new_path,
+        functools.partial(
+            _store_unchanged_file,
+            syn,
+            new_path,
+            source_ent,
+            new_release_synid,
+            owner_id,
+        ),
+    )
+
+
+def _store_unchanged_file(
+    syn: synapseclient.Synapse,
+    new_path: str,
+    source_ent: synapseclient.File,
+    new_release_synid: str,
+    owner_id: Optional[str] = None,
+) -> PatchResult:
+    """Stores a file that is identical to its source, see store_unchanged_file"""
+    if owner_id is None:
+        owner_id = syn.getUserProfile().ownerId
+    file_handle = get_data_file_handle(syn, source_ent)
+    if file_handle["createdBy"] == owner_id:
+        data_file_handle_id = file_handle["id"]
+        status = "linked"
+    else:
+        copy_result = synu.copyFileHandles(
+            syn,
+            [file_handle],
+            ["FileEntity"],
+            [source_ent.id],
+            [file_handle["contentType"]],
+            [file_handle["fileName"]],
+        )[0]
+        if copy_result.get("failureCode") is not None:
+            raise ValueError(
+                f"{copy_result['failureCode']} dataFileHandleId: "
+                f"{copy_result['originalFileHandleId']}"
+            )
+        data_file_handle_id = copy_result["newFileHandle"]["id"]
+        status = "copied"
+    new_ent = synapseclient.File(
+        dataFileHandleId=data_file_handle_id,
+        name=os.path.basename(new_path),
+        parentId=new_release_synid,
+    )
+    new_ent = syn.store(new_ent)
+    return PatchResult(path=new_path, status=status, entity=new_ent)
+
+
+def store_patched_file(
+    syn: synapseclient.Synapse,
+    new_path: str,
+    source_ent: Optional[synapseclient.File],
+    new_release_synid: str,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> PatchResult:
+    """
+    Stores a patched file into Synapse, only uploading it if its md5 differs
+    from the md5 of the source entity.
+
+    Args:
+        syn (synapseclient.Synapse): The Synapse client object.
+        new_path (str): The path to the file to be stored.
+        source_ent (synapseclient.File, optional): The entity the file was patched from.
+            The file is always uploaded if there is no source entity.
+        new_release_synid (str): The Synapse ID of the release folder where the file will be stored.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        PatchResult: The new entity along with whether it was linked, copied or rewritten
+    """
+    return _store_checkpointed_file(
+        checkpoint,
+        step,
+        new_path,
+        functools.partial(
+            _store_patched_file, syn, new_path, source_ent, new_release_synid, owner_id
+        ),
+    )
+
+
+def _store_patched_file(
+    syn: synapseclient.Synapse,
+    new_path: str,
+    source_ent: Optional[synapseclient.File],
+    new_release_synid: str,
+    owner_id: Optional[str] = None,
+) -> PatchResult:
+    """Stores a patched file, see store_patched_file"""
+    if source_ent is not None and md5_for_file(new_path).hexdigest() == source_ent.md5:
+        return store_unchanged_file(
+            syn, new_path, source_ent, new_release_synid, owner_id=owner_id
+        )
+    new_ent = store_file(syn, new_path, new_release_synid)
+    return PatchResult(path=new_path, status="rewritten", entity=new_ent)
+
+
+def report_patch_stats(results: List[PatchResult]) -> Dict[str, int]:
+    """
+    Logs whether each file in the new release was linked, copied or
+    rewritten along with the total for each.
+
+    Args:
+        results (List[PatchResult]): The results of storing each file.
+
+    Returns:
+        Dict[str, int]: The number of files per status
+    """
+    counts = {"linked": 0, "copied": 0, "rewritten": 0}
+    for result in results:
+        logger.info(f"{os.path.basename(result.path)}: {result.status}")
+        counts[result.status] += 1
+    logger.info(
+        ", ".join(f"{count} {status}" for status, count in counts.items())
+    )
+    return counts
+
+
 def patch_file(
     syn: synapseclient.Synapse,
     synid: str,
     tempdir: str,
     new_release_synid: str,
-    keep_values: pd.Series,
+    keep_values: AbstractSet[str],
     column: str,
-) -> str:
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> PatchResult:
     """
     Patches a file in Synapse by filtering out rows based on the provided keep values.
 
@@ -93,27 +797,33 @@ def patch_file(
         synid (str): The Synapse ID of the entity to be patched.
         tempdir (str): The temporary directory to store the patched file.
         new_release_synid (str): The Synapse ID of the release folder where the patched file will be stored.
-        keep_values (pd.Series): The values to keep in the dataframe.
+        keep_values (AbstractSet[str]): The values to keep in the file, e.g: one of the
+            kept sets of the RetractionIndex.
         column (str): The column name to filter on.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
 
     Returns:
-        str: The file path to the patched file
+        PatchResult: The file path to the patched file and how it was stored
     """
     entity = syn.get(synid, followLink=True)
-    df = _filter_tsv(filepath=entity.path, keep_values=keep_values, column=column)
-    # Specific filtering for the data gene matrix file because the string NA must
-    # replace the blank values
-    if entity.name == "data_gene_matrix.txt":
-        df[df.isnull()] = "NA"
-    # df = pd.read_csv(entity.path, sep="\t", comment="#")
-    # df = df[df[column].isin(keep_values)]
-    dftext = process_functions.removePandasDfFloat(df)
     new_path = os.path.join(tempdir, os.path.basename(entity.path))
-    with open(new_path, "w") as o_file:
-        o_file.write(dftext)
-    store_file(syn, new_path, new_release_synid)
-    # TODO: return a named tuple if needed (YAGNI for now)
-    return new_path
+    # Rows are copied over verbatim so blank values in files like the
+    # data gene matrix keep their original NA strings
+    _filter_tsv(
+        filepath=entity.path,
+        new_path=new_path,
+        keep_values=keep_values,
+        column=column,
+    )
+    return store_patched_file(
+        syn,
+        new_path,
+        entity,
+        new_release_synid,
+        owner_id=owner_id,
+        checkpoint=checkpoint,
+        step=step,
+    )
 
 
 def patch_cna_file(
@@ -121,30 +831,54 @@ def patch_cna_file(
     cna_synid: str,
     tempdir: str,
     new_release_synid: str,
-    keep_samples: pd.Series,
-) -> None:
+    keep_samples: AbstractSet[str],
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> PatchResult:
     """
     Patches the CNA file in Synapse by filtering out columns based on the provided keep samples.
+    If no sample columns are removed, the original file is reused instead of being uploaded.
 
     Args:
         syn (synapseclient.Synapse): The Synapse client object.
         cna_synid (str): The Synapse ID of the CNA file to be patched.
         tempdir (str): The temporary directory to store the patched file.
         new_release_synid (str): The Synapse ID of the release folder where the patched file will be stored.
-        keep_samples (pd.Series): The samples to keep in the CNA file.
+        keep_samples (AbstractSet[str]): The samples to keep in the CNA file.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        PatchResult: The file path to the patched file and how it was stored
     """
     cna_ent = syn.get(cna_synid, followLink=True)
-    cnadf = pd.read_csv(cna_ent.path, sep="\t", comment="#")
-    cna_cols = ["Hugo_Symbol"]
-    cna_cols.extend(keep_samples.tolist())
-    cna_cols_idx = cnadf.columns.isin(cna_cols)
-    if not cna_cols_idx.all():
-        cnadf = cnadf[cnadf.columns[cna_cols_idx]]
-        cnatext = process_functions.removePandasDfFloat(cnadf)
-        cna_path = os.path.join(tempdir, os.path.basename(cna_ent.path))
-        with open(cna_path, "w") as cna_file:
-            cna_file.write(cnatext)
-        store_file(syn, cna_path, new_release_synid)
+    header_cols = _get_tsv_header(cna_ent.path)
+    cna_cols_idx = [
+        idx
+        for idx, col in enumerate(header_cols)
+        if col == "Hugo_Symbol" or col in keep_samples
+    ]
+    cna_path = os.path.join(tempdir, os.path.basename(cna_ent.path))
+    if len(cna_cols_idx) == len(header_cols):
+        return store_unchanged_file(
+            syn,
+            cna_path,
+            cna_ent,
+            new_release_synid,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step=step,
+        )
+    _filter_tsv_columns(filepath=cna_ent.path, new_path=cna_path, keep_idx=cna_cols_idx)
+    return store_patched_file(
+        syn,
+        cna_path,
+        cna_ent,
+        new_release_synid,
+        owner_id=owner_id,
+        checkpoint=checkpoint,
+        step=step,
+    )
 
 
 def patch_case_list_files(
@@ -153,12 +887,18 @@ def patch_case_list_files(
     tempdir: str,
     clinical_path: str,
     assay_path: str,
-) -> None:
+    source_case_list_synid: str = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> List[PatchResult]:
     """
     Creates a folder for case lists in Synapse and populates it with case list files.
     The reason why case list files cannot be copied because samples and patients are retracted
     so `create_case_lists.main` must be called to regenerated case lists from the new
-    sample list.
+    sample list. Regenerated case lists identical to the ones in the source case list folder
+    are reused instead of being uploaded.
 
     Args:
         syn (synapseclient.Synapse): The Synapse client object.
@@ -166,6 +906,14 @@ def patch_case_list_files(
         tempdir (str): The temporary directory to store the case list files.
         clinical_path (str): The path to the clinical data.
         assay_path (str): The path to the assay data.
+        source_case_list_synid (str, optional): The Synapse ID of the case list folder
+            of the release being patched. Defaults to None.
+        max_workers (int, optional): The maximum number of case list files uploaded at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        List[PatchResult]: The file path of each case list file and how it was stored
     """
     case_list_path = os.path.join(tempdir, "case_lists")
     if not os.path.exists(case_list_path):
@@ -176,9 +924,113 @@ def patch_case_list_files(
     case_list_folder_synid = syn.store(
         synapseclient.Folder("case_lists", parentId=new_release_synid)
     ).id
-    for case_filename in case_list_files:
-        case_path = os.path.join(case_list_path, case_filename)
-        store_file(syn, case_path, case_list_folder_synid)
+    source_case_lists = {}
+    if source_case_list_synid is not None:
+        source_case_lists = {
+            case_list["name"]: case_list["id"]
+            for case_list in syn.getChildren(source_case_list_synid)
+        }
+
+    def _store_case_list_file(case_filename: str) -> PatchResult:
+        source_synid = source_case_lists.get(case_filename)
+        source_ent = (
+            syn.get(source_synid, downloadFile=False)
+            if source_synid is not None
+            else None
+        )
+        return store_patched_file(
+            syn,
+            os.path.join(case_list_path, case_filename),
+            source_ent,
+            case_list_folder_synid,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step=step,
+        )
+
+    tasks = [
+        functools.partial(_store_case_list_file, case_filename)
+        for case_filename in sorted(case_list_files)
+    ]
+    return _run_concurrently(tasks, max_workers=max_workers)
+
+
+def _patch_gene_panel_file(
+    syn: synapseclient.Synapse,
+    synid: str,
+    tempdir: str,
+    new_release_synid: str,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> PatchResult:
+    """
+    Copies a cBioPortal gene panel file into the new release folder.
+
+    Args:
+        syn (synapseclient.Synapse): The Synapse client object.
+        synid (str): The Synapse ID of the gene panel file.
+        tempdir (str): The temporary directory to store the file.
+        new_release_synid (str): The Synapse ID of the new release folder.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        PatchResult: The file path to the gene panel file and how it was stored
+    """
+    gene_panel_ent = syn.get(synid, followLink=True)
+    new_panel_path = os.path.join(tempdir, os.path.basename(gene_panel_ent.path))
+    shutil.copyfile(gene_panel_ent.path, new_panel_path)
+    return store_patched_file(
+        syn,
+        new_panel_path,
+        gene_panel_ent,
+        new_release_synid,
+        owner_id=owner_id,
+        checkpoint=checkpoint,
+        step=step,
+    )
+
+
+def _patch_meta_file(
+    syn: synapseclient.Synapse,
+    synid: str,
+    tempdir: str,
+    new_release_synid: str,
+    old_release: str,
+    new_release: str,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> PatchResult:
+    """
+    Copies a cBioPortal meta file into the new release folder, revising
+    the release version in it.
+
+    Args:
+        syn (synapseclient.Synapse): The Synapse client object.
+        synid (str): The Synapse ID of the meta file.
+        tempdir (str): The temporary directory to store the file.
+        new_release_synid (str): The Synapse ID of the new release folder.
+        old_release (str): The version name of the orignal consortium release linking to the public release.
+        new_release (str): The version name of the new consortium release linking to the patch release.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        PatchResult: The file path to the meta file and how it was stored
+    """
+    meta_ent = syn.get(synid, followLink=True)
+    new_meta_path = os.path.join(tempdir, os.path.basename(meta_ent.path))
+    shutil.copyfile(meta_ent.path, new_meta_path)
+    revise_meta_file(new_meta_path, old_release, new_release)
+    return store_patched_file(
+        syn,
+        new_meta_path,
+        meta_ent,
+        new_release_synid,
+        owner_id=owner_id,
+        checkpoint=checkpoint,
+        step=step,
+    )
 
 
 def patch_gene_panel_and_meta_files(
@@ -186,10 +1038,14 @@ def patch_gene_panel_and_meta_files(
     file_mapping: dict,
     tempdir: str,
     new_release_synid: str,
-    keep_seq_assay_id: pd.Series,
+    keep_seq_assay_id: AbstractSet[str],
     old_release: str,
     new_release: str,
-) -> None:
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> List[PatchResult]:
     """
     Creates cBioPortal gene panel and meta files.
 
@@ -198,27 +1054,146 @@ def patch_gene_panel_and_meta_files(
         file_mapping (dict): A dictionary mapping file names to their Synapse IDs.
         tempdir (str): The temporary directory to store the files.
         new_release_synid (str): The Synapse ID of the new release folder.
-        keep_seq_assay_id (pd.Series): The series of SEQ_ASSAY_IDs to keep.
+        keep_seq_assay_id (AbstractSet[str]): The SEQ_ASSAY_IDs to keep.
         old_release (str): The version name of the orignal consortium release linking to the public release.
         new_release (str): The version name of the new consortium release linking to the patch release.
+        max_workers (int, optional): The maximum number of files patched at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        List[PatchResult]: The file path of each gene panel and meta file and how it was stored
     """
+    tasks = []
     for name in file_mapping:
         if name.startswith("data_gene_panel"):
             seq_name = name.replace("data_gene_panel_", "").replace(".txt", "")
             if seq_name not in keep_seq_assay_id:
                 continue
-            gene_panel_ent = syn.get(file_mapping[name], followLink=True)
-            new_panel_path = os.path.join(
-                tempdir, os.path.basename(gene_panel_ent.path)
+            tasks.append(
+                functools.partial(
+                    _patch_gene_panel_file,
+                    syn=syn,
+                    synid=file_mapping[name],
+                    tempdir=tempdir,
+                    new_release_synid=new_release_synid,
+                    owner_id=owner_id,
+                    checkpoint=checkpoint,
+                    step=step,
+                )
             )
-            shutil.copyfile(gene_panel_ent.path, new_panel_path)
-            store_file(syn, new_panel_path, new_release_synid)
         elif name.startswith("meta") or "_meta_" in name:
-            meta_ent = syn.get(file_mapping[name], followLink=True)
-            new_meta_path = os.path.join(tempdir, os.path.basename(meta_ent.path))
-            shutil.copyfile(meta_ent.path, new_meta_path)
-            revise_meta_file(new_meta_path, old_release, new_release)
-            store_file(syn, new_meta_path, new_release_synid)
+            tasks.append(
+                functools.partial(
+                    _patch_meta_file,
+                    syn=syn,
+                    synid=file_mapping[name],
+                    tempdir=tempdir,
+                    new_release_synid=new_release_synid,
+                    old_release=old_release,
+                    new_release=new_release,
+                    owner_id=owner_id,
+                    checkpoint=checkpoint,
+                    step=step,
+                )
+            )
+    return _run_concurrently(tasks, max_workers=max_workers)
+
+
+def patch_clinical_files(
+    syn: synapseclient.Synapse,
+    sampledf: pd.DataFrame,
+    sample_ent: synapseclient.File,
+    patient_ent: synapseclient.File,
+    clin_ent: synapseclient.File,
+    mapping: pd.DataFrame,
+    retraction_index: RetractionIndex,
+    tempdir: str,
+    new_release_synid: str,
+    owner_id: Optional[str] = None,
+    checkpoint: Optional[PatchCheckpoint] = None,
+    step: Optional[str] = None,
+) -> List[PatchResult]:
+    """
+    Patches the merged clinical, clinical sample and clinical patient files
+    by removing the retracted samples and patients.
+
+    Args:
+        syn (synapseclient.Synapse): The Synapse client object.
+        sampledf (pd.DataFrame): The clinical sample data of the release being patched.
+        sample_ent (synapseclient.File): The clinical sample file entity.
+        patient_ent (synapseclient.File): The clinical patient file entity.
+        clin_ent (synapseclient.File): The merged clinical file entity.
+        mapping (pd.DataFrame): The sample and patient column to cBioPortal mappings.
+        retraction_index (RetractionIndex): The samples and patients to keep.
+        tempdir (str): The temporary directory to store the patched files.
+        new_release_synid (str): The Synapse ID of the release folder where the patched files will be stored.
+        owner_id, checkpoint, step (optional): See PatchCheckpoint. Default to None.
+
+    Returns:
+        List[PatchResult]: The file path of the merged clinical, sample and patient files and how they were stored
+    """
+    final_sampledf = sampledf[retraction_index.is_kept_sample(sampledf["SAMPLE_ID"])]
+
+    patientdf = pd.read_csv(patient_ent.path, sep="\t", comment="#")
+    patientdf = patientdf[retraction_index.is_kept_patient(patientdf["PATIENT_ID"])]
+
+    clinicaldf = final_sampledf.merge(patientdf, on="PATIENT_ID", how="outer")
+
+    full_clin_df = pd.read_csv(clin_ent.path, sep="\t", comment="#")
+    clinical_path = os.path.join(tempdir, os.path.basename(clin_ent.path))
+    # GEN-646: Make sure to subset the clinical dataframe or else
+    # There will be issues downstream. The dashboard code along with
+    # public release code rely on the merged clinical file.
+    full_clin_df = full_clin_df[
+        retraction_index.is_kept_sample(full_clin_df["SAMPLE_ID"])
+    ]
+    full_clin_df.to_csv(clinical_path, sep="\t", index=False)
+    full_clinical_result = store_patched_file(
+        syn,
+        clinical_path,
+        clin_ent,
+        new_release_synid,
+        owner_id=owner_id,
+        checkpoint=checkpoint,
+        step=step,
+    )
+    # Revoke access to general GENIE consortium on data_clinical.txt file
+    # Because it has more data than the consortium should see.
+    syn.setPermissions(full_clinical_result.entity, principalId=3326313, accessType=[])
+
+    sample_path = os.path.join(tempdir, os.path.basename(sample_ent.path))
+    patient_path = os.path.join(tempdir, os.path.basename(patient_ent.path))
+
+    process_functions.addClinicalHeaders(
+        clinicaldf,
+        mapping,
+        patientdf.columns,
+        sampledf.columns,
+        sample_path,
+        patient_path,
+    )
+    return [
+        full_clinical_result,
+        store_patched_file(
+            syn=syn,
+            new_path=sample_path,
+            source_ent=sample_ent,
+            new_release_synid=new_release_synid,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step=step,
+        ),
+        store_patched_file(
+            syn=syn,
+            new_path=patient_path,
+            source_ent=patient_ent,
+            new_release_synid=new_release_synid,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step=step,
+        ),
+    ]
 
 
 def patch_release_workflow(
@@ -226,6 +1201,10 @@ def patch_release_workflow(
     new_release_synid: str,
     retracted_sample_synid: str,
     production: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    remove_centers: Optional[List[str]] = None,
+    remove_seq_assay_ids: Optional[List[str]] = None,
+    checkpoint_dir: Optional[str] = None,
 ):
     """
     Patches a release by removing retracted samples from the clinical, sample, and patient files.
@@ -238,12 +1217,17 @@ def patch_release_workflow(
         new_release_synid (str): The Synapse ID of the new release.
         retracted_sample_synid (str): The Synapse ID of the file containing the retracted samples.
         production (bool, optional): Whether the patch release is for production. Defaults to False.
+        max_workers (int, optional): The maximum number of files downloaded, patched or uploaded
+            at the same time. Defaults to DEFAULT_MAX_WORKERS.
+        remove_centers (List[str], optional): Centers to retract entirely. Defaults to None.
+        remove_seq_assay_ids (List[str], optional): SEQ_ASSAY_IDs to retract entirely.
+            Defaults to None.
+        checkpoint_dir (str, optional): Local directory to keep the patched files and a
+            checkpoint manifest in. Rerunning with the same directory skips the steps and
+            files that were already stored. Defaults to None, which uses a temporary directory.
     """
 
     syn = synapseclient.login()
-    # TODO: Add ability to provide list of centers / seq assay ids to remove
-    # remove_centers = []
-    # remove_seqassays = []
     old_release = syn.get(release_synid).name
     new_release = syn.get(new_release_synid).name
 
@@ -267,154 +1251,220 @@ def patch_release_workflow(
     seg_synid = file_mapping.get("data_cna_hg19.seg")
     assay_info_synid = file_mapping["assay_information.txt"]
 
+    # Prefetch every release file used in the patch at once so that the
+    # steps below read from the cache instead of downloading one at a time
+    prefetch_synids = [
+        sample_synid,
+        patient_synid,
+        file_mapping.get("data_clinical.txt"),
+        cna_synid,
+        fusion_synid,
+        gene_synid,
+        maf_synid,
+        genomic_info_synid,
+        seg_synid,
+        assay_info_synid,
+    ]
+    prefetch_synids.extend(
+        synid
+        for name, synid in file_mapping.items()
+        if name.startswith(("data_gene_panel", "meta")) or "_meta_" in name
+    )
+    prefetch_synids = [synid for synid in prefetch_synids if synid is not None]
+    release_entities = download_entities(syn, prefetch_synids, max_workers=max_workers)
+
     # Sample and patient column to cBioPortal mappings
     mapping_table = syn.tableQuery("SELECT * FROM syn9621600")
     mapping = mapping_table.asDataFrame()
 
     # Create temporary directory to download files
-    tempdir_o = tempfile.TemporaryDirectory()
-    tempdir = tempdir_o.name
-    # Create clinical file
+    if checkpoint_dir is None:
+        tempdir_o = tempfile.TemporaryDirectory()
+        tempdir = tempdir_o.name
+    else:
+        tempdir_o = None
+        tempdir = os.path.abspath(checkpoint_dir)
+        os.makedirs(tempdir, exist_ok=True)
 
     # Obtain samples retracted
-    sample_ent = syn.get(sample_synid, followLink=True)
+    sample_ent = release_entities[sample_synid]
     sampledf = pd.read_csv(sample_ent.path, sep="\t", comment="#")
-    centers = [patient.split("-")[1] for patient in sampledf.PATIENT_ID]
-    sampledf["CENTER"] = centers
-    # Retract samples from retract samples list
-    # TODO: Add code here to support redaction for entire center or seq assays
-    to_remove_samples = sampledf["SAMPLE_ID"].isin(retracted_samplesdf.SAMPLE_ID)
-    final_sampledf = sampledf[~to_remove_samples]
-
-    del final_sampledf["CENTER"]
-
-    keep_samples = final_sampledf["SAMPLE_ID"].drop_duplicates()
-    keep_patients = final_sampledf["PATIENT_ID"].drop_duplicates()
-    keep_seq_assay_id = final_sampledf["SEQ_ASSAY_ID"].drop_duplicates()
-
-    patient_ent = syn.get(patient_synid, followLink=True)
-    patientdf = pd.read_csv(patient_ent.path, sep="\t", comment="#")
-    patientdf = patientdf[patientdf["PATIENT_ID"].isin(keep_patients)]
-
-    clinicaldf = final_sampledf.merge(patientdf, on="PATIENT_ID", how="outer")
-
-    clin_ent = syn.get(file_mapping.get("data_clinical.txt"), followLink=True)
-    full_clin_df = pd.read_csv(clin_ent.path, sep="\t", comment="#")
-    clinical_path = os.path.join(tempdir, os.path.basename(clin_ent.path))
-    # GEN-646: Make sure to subset the clinical dataframe or else
-    # There will be issues downstream. The dashboard code along with
-    # public release code rely on the merged clinical file.
-    full_clin_df = full_clin_df[full_clin_df["SAMPLE_ID"].isin(keep_samples)]
-    full_clin_df.to_csv(clinical_path, sep="\t", index=False)
-    full_clinical_entity = store_file(syn, clinical_path, new_release_synid)
-    # Revoke access to general GENIE consortium on data_clinical.txt file
-    # Because it has more data than the consortium should see.
-    syn.setPermissions(full_clinical_entity, principalId=3326313, accessType=[])
-
-    sample_path = os.path.join(tempdir, os.path.basename(sample_ent.path))
-    patient_path = os.path.join(tempdir, os.path.basename(patient_ent.path))
-
-    process_functions.addClinicalHeaders(
-        clinicaldf,
-        mapping,
-        patientdf.columns,
-        sampledf.columns,
-        sample_path,
-        patient_path,
-    )
-    store_file(syn=syn, new_path=sample_path, new_release_synid=new_release_synid)
-    store_file(syn=syn, new_path=patient_path, new_release_synid=new_release_synid)
-
-    # Patch CNA file
-    patch_cna_file(
-        syn=syn,
-        cna_synid=cna_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_samples=keep_samples,
+    # Retract samples from retract samples list along with any retracted
+    # centers or seq assays
+    retraction_index = RetractionIndex.from_sample_df(
+        sampledf,
+        retracted_samples=retracted_samplesdf.SAMPLE_ID,
+        remove_centers=remove_centers,
+        remove_seq_assay_ids=remove_seq_assay_ids,
     )
+    keep_samples = retraction_index.keep_samples
+    keep_seq_assay_id = retraction_index.keep_seq_assay_ids
 
-    # Patch Fusion file
-    patch_file(
-        syn=syn,
-        synid=fusion_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_values=keep_samples,
-        column="Sample_Id",
-    )
-
-    # Patch SEG file
-    patch_file(
-        syn=syn,
-        synid=seg_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_values=keep_samples,
-        column="ID",
-    )
-
-    # Patch gene matrix file
-    patch_file(
-        syn=syn,
-        synid=gene_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_values=keep_samples,
-        column="SAMPLE_ID",
-    )
+    # The user's own file handles are reused rather than copied
+    owner_id = syn.getUserProfile().ownerId
 
-    # Patch maf file
-    patch_file(
-        syn=syn,
-        synid=maf_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_values=keep_samples,
-        column="Tumor_Sample_Barcode",
-    )
+    checkpoint = None
+    if checkpoint_dir is not None:
+        checkpoint = PatchCheckpoint(
+            syn,
+            manifest_path=os.path.join(tempdir, "checkpoint.json"),
+            run_inputs={
+                "release_synid": release_synid,
+                "new_release_synid": new_release_synid,
+                "retracted_sample_synid": retracted_sample_synid,
+                "retraction_index": retraction_index.fingerprint(),
+            },
+        )
 
-    # Patch genomic information file
-    patch_file(
-        syn=syn,
-        synid=genomic_info_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_values=keep_seq_assay_id,
-        column="SEQ_ASSAY_ID",
+    # Create clinical file
+    clin_ent = release_entities[file_mapping["data_clinical.txt"]]
+    patient_ent = release_entities[patient_synid]
+    clinical_path = os.path.join(tempdir, os.path.basename(clin_ent.path))
+    patch_results = run_checkpointed_step(
+        checkpoint,
+        step="clinical",
+        inputs={
+            "data_clinical.txt": _entity_inputs(clin_ent),
+            "data_clinical_sample.txt": _entity_inputs(sample_ent),
+            "data_clinical_patient.txt": _entity_inputs(patient_ent),
+        },
+        task=functools.partial(
+            patch_clinical_files,
+            syn=syn,
+            sampledf=sampledf,
+            sample_ent=sample_ent,
+            patient_ent=patient_ent,
+            clin_ent=clin_ent,
+            mapping=mapping,
+            retraction_index=retraction_index,
+            tempdir=tempdir,
+            new_release_synid=new_release_synid,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step="clinical",
+        ),
     )
 
-    # Patch assay information file
-    assay_path = patch_file(
-        syn=syn,
-        synid=assay_info_synid,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_values=keep_seq_assay_id,
-        column="SEQ_ASSAY_ID",
+    # The genomic files are independent of each other so they are patched
+    # and uploaded at the same time. The tasks are keyed by their step.
+    patch_tasks = {
+        # Patch CNA file
+        "data_CNA.txt": functools.partial(
+            run_checkpointed_step,
+            checkpoint,
+            step="data_CNA.txt",
+            inputs=_entity_inputs(release_entities[cna_synid]),
+            task=functools.partial(
+                patch_cna_file,
+                syn=syn,
+                cna_synid=cna_synid,
+                tempdir=tempdir,
+                new_release_synid=new_release_synid,
+                keep_samples=keep_samples,
+                owner_id=owner_id,
+                checkpoint=checkpoint,
+                step="data_CNA.txt",
+            ),
+        )
+    }
+    # Patch Fusion, SEG, gene matrix, maf, genomic information
+    # and assay information files
+    patch_file_columns = [
+        (fusion_synid, keep_samples, "Sample_Id"),
+        (seg_synid, keep_samples, "ID"),
+        (gene_synid, keep_samples, "SAMPLE_ID"),
+        (maf_synid, keep_samples, "Tumor_Sample_Barcode"),
+        (genomic_info_synid, keep_seq_assay_id, "SEQ_ASSAY_ID"),
+        (assay_info_synid, keep_seq_assay_id, "SEQ_ASSAY_ID"),
+    ]
+    for synid, keep_values, column in patch_file_columns:
+        step = release_entities[synid].name
+        patch_tasks[step] = functools.partial(
+            run_checkpointed_step,
+            checkpoint,
+            step=step,
+            inputs=_entity_inputs(release_entities[synid]),
+            task=functools.partial(
+                patch_file,
+                syn=syn,
+                synid=synid,
+                tempdir=tempdir,
+                new_release_synid=new_release_synid,
+                keep_values=keep_values,
+                column=column,
+                owner_id=owner_id,
+                checkpoint=checkpoint,
+                step=step,
+            ),
+        )
+    genomic_results = dict(
+        zip(
+            patch_tasks,
+            _run_concurrently(list(patch_tasks.values()), max_workers=max_workers),
+        )
     )
+    for results in genomic_results.values():
+        patch_results.extend(results)
+    assay_path = genomic_results[release_entities[assay_info_synid].name][0].path
 
     # Create cBioPortal case lists
-    patch_case_list_files(
-        syn=syn,
-        new_release_synid=new_release_synid,
-        tempdir=tempdir,
-        clinical_path=clinical_path,
-        assay_path=assay_path,
+    case_list_results = run_checkpointed_step(
+        checkpoint,
+        step="case_lists",
+        inputs={
+            "clinical_md5": md5_for_file(clinical_path).hexdigest(),
+            "assay_md5": md5_for_file(assay_path).hexdigest(),
+        },
+        task=functools.partial(
+            patch_case_list_files,
+            syn=syn,
+            new_release_synid=new_release_synid,
+            tempdir=tempdir,
+            clinical_path=clinical_path,
+            assay_path=assay_path,
+            source_case_list_synid=file_mapping.get("case_lists"),
+            max_workers=max_workers,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step="case_lists",
+        ),
     )
+    patch_results.extend(case_list_results)
 
     # Create cBioPortal gene panel and meta files
-    patch_gene_panel_and_meta_files(
-        syn=syn,
-        file_mapping=file_mapping,
-        tempdir=tempdir,
-        new_release_synid=new_release_synid,
-        keep_seq_assay_id=keep_seq_assay_id,
-        old_release=old_release,
-        new_release=new_release,
+    gene_panel_and_meta_results = run_checkpointed_step(
+        checkpoint,
+        step="gene_panel_and_meta_files",
+        inputs={
+            "old_release": old_release,
+            "new_release": new_release,
+            "entities": [
+                _entity_inputs(entity)
+                for entity in release_entities.values()
+                if entity.name.startswith(("data_gene_panel", "meta"))
+                or "_meta_" in entity.name
+            ],
+        },
+        task=functools.partial(
+            patch_gene_panel_and_meta_files,
+            syn=syn,
+            file_mapping=file_mapping,
+            tempdir=tempdir,
+            new_release_synid=new_release_synid,
+            keep_seq_assay_id=keep_seq_assay_id,
+            old_release=old_release,
+            new_release=new_release,
+            max_workers=max_workers,
+            owner_id=owner_id,
+            checkpoint=checkpoint,
+            step="gene_panel_and_meta_files",
+        ),
     )
+    patch_results.extend(gene_panel_and_meta_results)
+    report_patch_stats(patch_results)
 
-    tempdir_o.cleanup()
+    if tempdir_o is not None:
+        tempdir_o.cleanup()
     # Update dashboard tables
     # Data base mapping synid
     if production:
@@ -453,14 +1503,47 @@ def main():
         action="store_true",
         help="Run production workload or it will default to the staging workload",
     )
+    parser.add_argument(
+        "--remove_centers",
+        nargs="+",
+        default=None,
+        help="Centers to retract entirely on top of the retracted samples",
+    )
+    parser.add_argument(
+        "--remove_seq_assay_ids",
+        nargs="+",
+        default=None,
+        help="SEQ_ASSAY_IDs to retract entirely on top of the retracted samples",
+    )
+    parser.add_argument(
+        "--checkpoint_dir",
+        type=str,
+        default=None,
+        help=(
+            "Local directory to keep the patched files and a checkpoint manifest in. "
+            "Rerunning a failed patch with the same directory skips completed steps."
+        ),
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="The maximum number of files downloaded, patched or uploaded at the same time",
+    )
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
 
     patch_release_workflow(
         release_synid=args.release_synid,
         new_release_synid=args.new_release_synid,
         retracted_sample_synid=args.retracted_sample_synid,
         production=args.production,
+        max_workers=args.max_workers,
+        remove_centers=args.remove_centers,
+        remove_seq_assay_ids=args.remove_seq_assay_ids,
+        checkpoint_dir=args.checkpoint_dir,
     )
 
+
 if __name__ == "__main__":
     main()
@@ -2,7 +2,17 @@
 Check if samples from the BPC need to be retracted by
 comparing the main GENIE sample database against the
 BPC clinical database
+
+The sample ids of both tables are kept as sorted arrays in a local state
+file along with the etags of the tables, so a table is only queried again
+once it has changed, and only samples that weren't already reported in a
+previous run are emailed.
 """
+import argparse
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
 import synapseclient
 
 EMAIL_SUBJECT = "Review GENIE Retractions for BPC"
@@ -19,40 +29,185 @@ Best,
 Sage Team
 """
 
+# Full redcap clinical export of the BPC
+BPC_SAMPLE_TABLE_SYNID = "syn23285889"
 
-def main():
-    """Main function"""
-    syn = synapseclient.login()
+# Main GENIE clinical database
+GENIE_SAMPLE_TABLE_SYNID = "syn7517674"
+
+# Tom 3324230
+# Chelsea 3452608
+# Xindi 3334658
+# Mike 3423837
+# Jocelyn 3360218
+RETRACTION_REVIEWER_IDS = [3324230, 3452608, 3334658, 3423837, 3360218]
+
+# Location of the sample ids seen and retractions reported in the last run
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "genie", "bpc_retraction_state.npz"
+)
+
+EMPTY_STATE = {
+    "bpc_etag": "",
+    "bpc_sample_ids": np.array([], dtype=str),
+    "genie_etag": "",
+    "genie_sample_ids": np.array([], dtype=str),
+    "reported_sample_ids": np.array([], dtype=str),
+}
+
+
+def load_state(state_path: str) -> Dict[str, Any]:
+    """Loads the sample ids seen and the retractions reported in the last run
+
+    Args:
+        state_path (str): path of the state file
+
+    Returns:
+        Dict[str, Any]: the state, which is empty on the first run
+    """
+    if not os.path.exists(state_path):
+        return dict(EMPTY_STATE)
+    with np.load(state_path, allow_pickle=False) as state_file:
+        state = {key: state_file[key] for key in state_file.files}
+    state["bpc_etag"] = str(state["bpc_etag"])
+    state["genie_etag"] = str(state["genie_etag"])
+    return state
+
+
+def save_state(state_path: str, state: Dict[str, Any]) -> None:
+    """Saves the sample ids seen and the retractions reported in this run
+
+    Args:
+        state_path (str): path of the state file
+        state (Dict[str, Any]): the state
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+    # np.savez adds the .npz extension to paths without it
+    temp_state_path = f"{state_path}.tmp.npz"
+    np.savez_compressed(temp_state_path, **state)
+    os.replace(temp_state_path, state_path)
+
+
+def get_sample_ids(
+    syn: synapseclient.Synapse,
+    query: str,
+    table_synid: str,
+    cached_etag: str,
+    cached_sample_ids: np.ndarray,
+) -> Tuple[str, np.ndarray]:
+    """Gets the sample ids of a table, only querying the table when
+    it changed since the sample ids were cached. Rows can be deleted so
+    a changed table is queried in full rather than only its new rows.
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        query (str): query of the sample id column of the table
+        table_synid (str): synapse id of the table
+        cached_etag (str): etag of the table when the sample ids were cached
+        cached_sample_ids (np.ndarray): the cached sample ids
 
-    # Pull table with full redcap clinical export
-    bpc_samples = syn.tableQuery(
-        "SELECT cpt_genie_sample_id FROM syn23285889 where cpt_genie_sample_id is not null"
+    Returns:
+        Tuple[str, np.ndarray]: the etag of the table and its unique sample ids, sorted
+    """
+    etag = syn.get(table_synid, downloadFile=False).etag
+    if etag == cached_etag:
+        return etag, cached_sample_ids
+    sample_df = syn.tableQuery(query, includeRowIdAndRowVersion=False).asDataFrame()
+    sample_ids = sample_df.iloc[:, 0].dropna().astype(str).to_numpy(dtype=str)
+    return etag, np.unique(sample_ids)
+
+
+def find_retractions(
+    bpc_sample_ids: np.ndarray,
+    genie_sample_ids: np.ndarray,
+    reported_sample_ids: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the BPC samples that are no longer in the main GENIE database
+
+    Args:
+        bpc_sample_ids (np.ndarray): unique sample ids of the BPC
+        genie_sample_ids (np.ndarray): unique sample ids of the main GENIE database
+        reported_sample_ids (np.ndarray): unique sample ids that were already reported
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: all of the retracted samples and the
+            retracted samples that weren't already reported
+    """
+    retracted = np.setdiff1d(bpc_sample_ids, genie_sample_ids, assume_unique=True)
+    new_retracted = np.setdiff1d(retracted, reported_sample_ids, assume_unique=True)
+    return retracted, new_retracted
+
+
+def notify_retractions(syn: synapseclient.Synapse, sample_ids: List[str]) -> None:
+    """Emails the retracted samples to the BPC reviewers
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        sample_ids (List[str]): the retracted samples
+    """
+    syn.sendMessage(
+        userIds=RETRACTION_REVIEWER_IDS,
+        messageSubject=EMAIL_SUBJECT,
+        messageBody=EMAIL_BODY.format(", ".join(sample_ids)),
     )
-    bpc_samples_df = bpc_samples.asDataFrame()
 
-    # Main GENIE clinical database
-    sample_db = syn.tableQuery("select SAMPLE_ID from syn7517674")
-    sample_df = sample_db.asDataFrame()
+
+def main(state_path: str = DEFAULT_STATE_PATH):
+    """Main function
+
+    Args:
+        state_path (str, optional): path of the state file.
+            Defaults to DEFAULT_STATE_PATH.
+    """
+    syn = synapseclient.login()
+    state = load_state(state_path)
+
+    bpc_etag, bpc_sample_ids = get_sample_ids(
+        syn,
+        f"SELECT cpt_genie_sample_id FROM {BPC_SAMPLE_TABLE_SYNID} "
+        "where cpt_genie_sample_id is not null",
+        BPC_SAMPLE_TABLE_SYNID,
+        state["bpc_etag"],
+        state["bpc_sample_ids"],
+    )
+    genie_etag, genie_sample_ids = get_sample_ids(
+        syn,
+        f"select SAMPLE_ID from {GENIE_SAMPLE_TABLE_SYNID}",
+        GENIE_SAMPLE_TABLE_SYNID,
+        state["genie_etag"],
+        state["genie_sample_ids"],
+    )
 
     # Retract these samples from BPC samples
-    retract_idx = ~bpc_samples_df['cpt_genie_sample_id'].isin(
-        sample_df['SAMPLE_ID']
+    retracted, new_retracted = find_retractions(
+        bpc_sample_ids, genie_sample_ids, state["reported_sample_ids"]
+    )
+    print(f"{len(retracted)} retracted samples, {len(new_retracted)} new")
+    if len(new_retracted) > 0:
+        print(new_retracted)
+        notify_retractions(syn, new_retracted.tolist())
+
+    # retractions that are undone are forgotten so they are reported again
+    # if they are retracted again
+    save_state(
+        state_path,
+        {
+            "bpc_etag": bpc_etag,
+            "bpc_sample_ids": bpc_sample_ids,
+            "genie_etag": genie_etag,
+            "genie_sample_ids": genie_sample_ids,
+            "reported_sample_ids": retracted,
+        },
     )
-    retract_from_bpc = bpc_samples_df['cpt_genie_sample_id'][retract_idx]
-    if retract_from_bpc.any():
-        print(retract_from_bpc.unique())
-        # Tom 3324230
-        # Chelsea 3452608
-        # Xindi 3334658
-        # Mike 3423837
-        # Jocelyn 3360218
-        # Email users
-        syn.sendMessage(
-            userIds=[3324230, 3452608, 3334658, 3423837, 3360218],
-            messageSubject=EMAIL_SUBJECT,
-            messageBody=EMAIL_BODY.format(", ".join(retract_from_bpc.unique()))
-        )
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Check BPC retractions")
+    parser.add_argument(
+        "--state_path",
+        type=str,
+        default=DEFAULT_STATE_PATH,
+        help="Path of the sample ids seen and retractions reported in the last run",
+    )
+    args = parser.parse_args()
+    main(state_path=args.state_path)
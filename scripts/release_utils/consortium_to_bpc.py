@@ -2,12 +2,30 @@
 Consortium releases to internal BPC page"""
 
 import argparse
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 
 import synapseclient
-from synapseclient import Folder, Project, File, Link, Schema, Entity
+from synapseclient import Activity, Folder, File
 import synapseutils as synu
 
+# the script is run from its own directory in the docker image, which has the
+# modules of scripts/shared copied in, and imported from the repository root by the tests
+try:
+    from file_handles import get_data_file_handle
+    from release_resolver import ReleaseResolver
+except ImportError:
+    from scripts.shared.file_handles import get_data_file_handle
+    from scripts.shared.release_resolver import ReleaseResolver
+
+# Maximum number of Synapse requests made at the same time when copying
+DEFAULT_MAX_WORKERS = 8
+
+# Maximum number of file handles Synapse copies in one request
+FILE_HANDLE_COPY_BATCH_SIZE = 100
+
 
 def get_release_synids(test: bool = False) -> Dict[str, str]:
     """Retrieves the set of synapse ids associated with the
@@ -33,7 +51,11 @@ def get_release_synids(test: bool = False) -> Dict[str, str]:
 
 
 def find_release(
-    syn: synapseclient.Synapse, release: str, release_table_synid: str, test: bool
+    syn: synapseclient.Synapse,
+    release: str,
+    release_table_synid: str,
+    test: bool,
+    resolver: Optional[ReleaseResolver] = None,
 ) -> str:
     """Finds the Synapse id of a private consortium release folder
 
@@ -42,6 +64,8 @@ def find_release(
         release (str): name of the consortium release
         release_table_synid (str): synapse id of the release table
         test (bool, optional): Whether this is using the test project or not
+        resolver (ReleaseResolver, optional): resolver of the release folders.
+            Defaults to a resolver memoizing the release folders for the run.
 
     Raises:
         ValueError: raised if no table record exists for the specified release
@@ -52,147 +76,450 @@ def find_release(
     if test:
         # use the release folder directly
         return release_table_synid
-    else:
-        release_synid = syn.tableQuery(
-            "select distinct(parentId) from {} where "
-            "release = '{}'".format(release_table_synid, release)
-        )
-        releasedf = release_synid.asDataFrame()
-        if releasedf.empty:
-            raise ValueError("Please specify correct release value")
-        return releasedf.iloc[0, 0]
+    if resolver is None:
+        resolver = ReleaseResolver(syn)
+    try:
+        return resolver.from_release_table(release_table_synid, release)
+    except ValueError as err:
+        raise ValueError(f"Please specify correct release value. {err}") from err
 
 
-def _copyRecursive(
-    syn: synapseclient.Synapse,
-    entity: str,
-    destinationId: str,
-    mapping: Dict[str, str] = None,
-    skipCopyAnnotations: bool = False,
-    **kwargs,
-) -> Dict[str, str]:
+class CopySource(NamedTuple):
+    """A release file to copy along with the folder it is copied to"""
+
+    entity: File
+    file_handle: Dict[str, Any]
+    destination_id: Optional[str]
+
+
+class SyncAction:
+    """The operations of a sync plan"""
+
+    CREATE = "create"
+    UPDATE = "update"
+    UNCHANGED = "unchanged"
+    DELETE = "delete"
+    ALL = (CREATE, UPDATE, UNCHANGED, DELETE)
+
+
+class SyncOperation(NamedTuple):
+    """An operation of a sync plan on a file in a destination folder"""
+
+    action: str
+    name: str
+    folder_id: Optional[str]
+    source: Optional[CopySource]
+    existing_id: Optional[str]
+
+
+def _run_concurrently(
+    tasks: List[Callable[[], Any]], max_workers: int = DEFAULT_MAX_WORKERS
+) -> List[Any]:
+    """Runs independent Synapse requests in a bounded thread pool
+
+    Args:
+        tasks (List[Callable[[], Any]]): the tasks to run, taking no arguments
+        max_workers (int, optional): the maximum number of tasks run at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        List[Any]: the result of each task, in the same order as the tasks
     """
-    NOTE: This is a copy of the function found here: https://github.com/Sage-Bionetworks/synapsePythonClient/blob/develop/synapseutils/copy_functions.py#L409
-    This was copied because there is a restriction that doesn't allow for copying entities with access requirements
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(task) for task in tasks]
+        return [future.result() for future in futures]
 
-    Recursively copies synapse entites, but does not copy the wikis
 
-    Arguments:
-        syn: A Synapse object with user's login
-        entity: A synapse entity ID
-        destinationId: Synapse ID of a folder/project that the copied entity is being copied to
-        mapping: A mapping of the old entities to the new entities
-        skipCopyAnnotations: Skips copying the annotations
-                                Default is False
+def _get_destination_file_handle(
+    syn: synapseclient.Synapse, synid: str
+) -> Dict[str, Any]:
+    """Gets the data file handle of a file in a destination folder
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        synid (str): synapse id of the file
 
     Returns:
-        a mapping between the original and copied entity: {'syn1234':'syn33455'}
+        Dict[str, Any]: the file handle of the file
     """
+    ent = syn.get(synid, downloadFile=False)
+    return get_data_file_handle(syn, ent)
 
-    version = kwargs.get("version", None)
-    setProvenance = kwargs.get("setProvenance", "traceback")
-    excludeTypes = kwargs.get("excludeTypes", [])
-    updateExisting = kwargs.get("updateExisting", False)
-    if mapping is None:
-        mapping = dict()
-    # Check that passed in excludeTypes is file, table, and link
-    if not isinstance(excludeTypes, list):
-        raise ValueError("Excluded types must be a list")
-    elif not all([i in ["file", "link", "table"] for i in excludeTypes]):
-        raise ValueError(
-            "Excluded types can only be a list of these values: file, table, and link"
-        )
 
-    ent = syn.get(entity, downloadFile=False)
-    if ent.id == destinationId:
-        raise ValueError("destinationId cannot be the same as entity id")
+def _get_copy_source(
+    syn: synapseclient.Synapse, synid: str, destination_id: Optional[str]
+) -> Optional[CopySource]:
+    """Gets a release file along with its file handle and permissions
 
-    if (isinstance(ent, Project) or isinstance(ent, Folder)) and version is not None:
-        raise ValueError("Cannot specify version when copying a project of folder")
+    NOTE: the access requirements of the file are deliberately not checked.
+    The copy functions from synapseutils refuse to copy entities with access
+    requirements, which every release file has, so only the download
+    permission is checked here.
 
-    if not isinstance(ent, (Project, Folder, File, Link, Schema, Entity)):
-        raise ValueError("Not able to copy this type of file")
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        synid (str): synapse id of the release file or a link to it
+        destination_id (str): synapse id of the folder the file is copied to
 
-    permissions = syn.restGET("/entity/{}/permissions".format(ent.id))
+    Returns:
+        Optional[CopySource]: the file to copy or None if it lacks download permission
+    """
+    ent = syn.get(synid, followLink=True, downloadFile=False)
+    permissions = syn.restGET(f"/entity/{ent.id}/permissions")
     # Don't copy entities without DOWNLOAD permissions
     if not permissions["canDownload"]:
         syn.logger.warning(
             "%s not copied - this file lacks download permission" % ent.id
         )
-        return mapping
+        return None
+    file_handle = get_data_file_handle(syn, ent)
+    return CopySource(
+        entity=ent, file_handle=file_handle, destination_id=destination_id
+    )
+
+
+def gather_copy_sources(
+    syn: synapseclient.Synapse,
+    copies: List[Tuple[str, Optional[str]]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[CopySource]:
+    """Gets every release file to copy up front, checking their
+    permissions concurrently
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        copies (List[Tuple[str, Optional[str]]]): synapse id of each release file
+            and of the folder it is copied to
+        max_workers (int, optional): the maximum number of requests made at once.
+            Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        List[CopySource]: the files to copy, except those lacking download permission
+    """
+    tasks = [
+        partial(_get_copy_source, syn, synid, destination_id)
+        for synid, destination_id in copies
+    ]
+    sources = _run_concurrently(tasks, max_workers=max_workers)
+    return [source for source in sources if source is not None]
 
-    # HACK: These lines of code were removed to allow for data with access requirements to be copied
-    # https://github.com/Sage-Bionetworks/synapsePythonClient/blob/2909fa778e814f62f6fe6ce2d951ce58c0080a4e/synapseutils/copy_functions.py#L464-L470
 
-    copiedId = None
+def _copy_file_handle_batch(
+    syn: synapseclient.Synapse, sources: List[CopySource]
+) -> List[str]:
+    """Copies the file handles of a batch of release files in one request
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        sources (List[CopySource]): the files to copy, at most
+            FILE_HANDLE_COPY_BATCH_SIZE of them
 
-    if isinstance(ent, Project):
-        project = syn.get(destinationId)
-        if not isinstance(project, Project):
+    Raises:
+        ValueError: raised if a file handle couldn't be copied
+
+    Returns:
+        List[str]: the id of each copied file handle, in the same order as the files
+    """
+    copy_results = synu.copy_functions.copyFileHandles(
+        syn,
+        [source.file_handle for source in sources],
+        ["FileEntity"] * len(sources),
+        [source.entity.id for source in sources],
+        [source.file_handle["contentType"] for source in sources],
+        [source.file_handle["fileName"] for source in sources],
+    )
+    new_file_handle_ids = []
+    for copy_result in copy_results:
+        if copy_result.get("failureCode") is not None:
             raise ValueError(
-                "You must give a destinationId of a new project to copy projects"
-            )
-        copiedId = destinationId
-        # Projects include Docker repos, and Docker repos cannot be copied
-        # with the Synapse rest API. Entity views currently also aren't
-        # supported
-        entities = syn.getChildren(
-            entity, includeTypes=["folder", "file", "table", "link"]
-        )
-        for i in entities:
-            mapping = _copyRecursive(
-                syn,
-                i["id"],
-                destinationId,
-                mapping=mapping,
-                skipCopyAnnotations=skipCopyAnnotations,
-                **kwargs,
+                "%s dataFileHandleId: %s"
+                % (copy_result["failureCode"], copy_result["originalFileHandleId"])
             )
+        new_file_handle_ids.append(copy_result["newFileHandle"]["id"])
+    return new_file_handle_ids
 
-        if not skipCopyAnnotations:
-            project.annotations = ent.annotations
-            syn.store(project)
-    elif isinstance(ent, Folder):
-        copiedId = synu.copy_functions._copyFolder(
-            syn,
-            ent.id,
-            destinationId,
-            mapping=mapping,
-            skipCopyAnnotations=skipCopyAnnotations,
-            **kwargs,
-        )
-    elif isinstance(ent, File) and "file" not in excludeTypes:
-        copiedId = synu.copy_functions._copyFile(
-            syn,
-            ent.id,
-            destinationId,
-            version=version,
-            updateExisting=updateExisting,
-            setProvenance=setProvenance,
-            skipCopyAnnotations=skipCopyAnnotations,
-        )
-    elif isinstance(ent, Link) and "link" not in excludeTypes:
-        copiedId = synu.copy_functions._copyLink(
-            syn, ent.id, destinationId, updateExisting=updateExisting
-        )
-    elif isinstance(ent, Schema) and "table" not in excludeTypes:
-        copiedId = synu.copy_functions._copyTable(
-            syn, ent.id, destinationId, updateExisting=updateExisting
+
+def copy_file_handles(
+    syn: synapseclient.Synapse,
+    sources: List[CopySource],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[str]:
+    """Copies the file handles of the release files in concurrent batches.
+    File handles created by the logged in user are reused rather than copied.
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        sources (List[CopySource]): the files to copy
+        max_workers (int, optional): the maximum number of requests made at once.
+            Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        List[str]: the file handle id of each copy, in the same order as the files
+    """
+    owner_id = syn.getUserProfile().ownerId
+    file_handle_ids = [source.file_handle["id"] for source in sources]
+    to_copy = [
+        i
+        for i, source in enumerate(sources)
+        if source.file_handle["createdBy"] != owner_id
+    ]
+    batches = [
+        to_copy[i : i + FILE_HANDLE_COPY_BATCH_SIZE]
+        for i in range(0, len(to_copy), FILE_HANDLE_COPY_BATCH_SIZE)
+    ]
+    tasks = [
+        partial(_copy_file_handle_batch, syn, [sources[i] for i in batch])
+        for batch in batches
+    ]
+    for batch, new_ids in zip(batches, _run_concurrently(tasks, max_workers)):
+        for i, new_id in zip(batch, new_ids):
+            file_handle_ids[i] = new_id
+    return file_handle_ids
+
+
+def _store_copy(
+    syn: synapseclient.Synapse, source: CopySource, file_handle_id: str
+) -> str:
+    """Stores the copy of a release file, updating the file
+    of the same name in the destination if there is one
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        source (CopySource): the file to copy
+        file_handle_id (str): the file handle id of the copy
+
+    Returns:
+        str: synapse id of the copy
+    """
+    new_ent = File(
+        dataFileHandleId=file_handle_id,
+        name=source.entity.name,
+        parentId=source.destination_id,
+    )
+    new_ent = syn.store(new_ent, activity=Activity("Copied file", used=source.entity))
+    return new_ent.id
+
+
+def get_destination_files(
+    syn: synapseclient.Synapse,
+    folder_ids: List[Optional[str]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[Optional[str], Dict[str, Dict[str, Any]]]:
+    """Gets the files already in the destination folders along with their file handles
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        folder_ids (List[Optional[str]]): synapse ids of the destination folders.
+            A folder that doesn't exist yet (None) has no files.
+        max_workers (int, optional): the maximum number of requests made at once.
+            Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        Dict[Optional[str], Dict[str, Dict[str, Any]]]: the files of each folder by
+            name, each with its synapse id and file handle
+    """
+    children = [
+        (folder_id, child)
+        for folder_id in folder_ids
+        if folder_id is not None
+        for child in syn.getChildren(folder_id, includeTypes=["file"])
+    ]
+    tasks = [
+        partial(_get_destination_file_handle, syn, child["id"])
+        for _, child in children
+    ]
+    file_handles = _run_concurrently(tasks, max_workers=max_workers)
+    destination_files = {folder_id: {} for folder_id in folder_ids}
+    for (folder_id, child), file_handle in zip(children, file_handles):
+        destination_files[folder_id][child["name"]] = {
+            "id": child["id"],
+            "file_handle": file_handle,
+        }
+    return destination_files
+
+
+def _is_same_file(
+    source_file_handle: Dict[str, Any], file_handle: Optional[Dict[str, Any]]
+) -> bool:
+    """Whether a destination file already holds the content of a source file,
+    either because it shares its file handle or has the same md5
+    """
+    if file_handle is None:
+        return False
+    if source_file_handle["id"] == file_handle["id"]:
+        return True
+    md5 = source_file_handle.get("contentMd5")
+    return md5 is not None and md5 == file_handle.get("contentMd5")
+
+
+def plan_sync(
+    sources: List[CopySource],
+    destination_files: Dict[Optional[str], Dict[str, Dict[str, Any]]],
+    release_names: Dict[Optional[str], Set[str]],
+) -> List[SyncOperation]:
+    """Plans the operations that bring the destination folders in line with
+    the release files. Files are matched by name and compared by file handle
+    id or md5 so that files that were already copied are left alone.
+
+    Args:
+        sources (List[CopySource]): the release files to copy
+        destination_files (Dict[Optional[str], Dict[str, Dict[str, Any]]]): the files
+            already in each destination folder, see get_destination_files
+        release_names (Dict[Optional[str], Set[str]]): the names of the files listed
+            in the release for each destination folder in which files that are no
+            longer released are deleted. The listed names are used rather than the
+            sources so that a release file skipped for lacking download permission
+            isn't deleted.
+
+    Returns:
+        List[SyncOperation]: the planned create, update, unchanged and delete operations
+    """
+    plan = []
+    for source in sources:
+        name = source.entity.name
+        existing = destination_files.get(source.destination_id, {}).get(name)
+        if existing is None:
+            action = SyncAction.CREATE
+        elif _is_same_file(source.file_handle, existing["file_handle"]):
+            action = SyncAction.UNCHANGED
+        else:
+            action = SyncAction.UPDATE
+        plan.append(
+            SyncOperation(
+                action=action,
+                name=name,
+                folder_id=source.destination_id,
+                source=source,
+                existing_id=None if existing is None else existing["id"],
+            )
         )
-    # This is currently done because copyLink returns None sometimes
-    if copiedId is not None:
-        mapping[ent.id] = copiedId
-        syn.logger.info("Copied %s to %s" % (ent.id, copiedId))
-    else:
-        syn.logger.info("%s not copied" % ent.id)
+    for folder_id, names in release_names.items():
+        for name, existing in destination_files.get(folder_id, {}).items():
+            if name not in names:
+                plan.append(
+                    SyncOperation(
+                        action=SyncAction.DELETE,
+                        name=name,
+                        folder_id=folder_id,
+                        source=None,
+                        existing_id=existing["id"],
+                    )
+                )
+    return plan
+
+
+def apply_sync_plan(
+    syn: synapseclient.Synapse,
+    plan: List[SyncOperation],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[str, str]:
+    """Applies the create, update and delete operations of a sync plan.
+    The file handles of the created and updated files are copied in
+    concurrent batches and the copies are stored concurrently.
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        plan (List[SyncOperation]): the sync plan, see plan_sync
+        max_workers (int, optional): the maximum number of requests made at once.
+            Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        Dict[str, str]: mapping of the original to the copied files: {"syn1": "syn2"}
+    """
+    start = time.time()
+    sources = [
+        operation.source
+        for operation in plan
+        if operation.action in (SyncAction.CREATE, SyncAction.UPDATE)
+    ]
+    file_handle_ids = copy_file_handles(syn, sources, max_workers=max_workers)
+    tasks = [
+        partial(_store_copy, syn, source, file_handle_id)
+        for source, file_handle_id in zip(sources, file_handle_ids)
+    ]
+    copied_ids = _run_concurrently(tasks, max_workers=max_workers)
+    mapping = {
+        source.entity.id: copied_id for source, copied_id in zip(sources, copied_ids)
+    }
+    elapsed = time.time() - start
+    syn.logger.info(
+        "Copied %d entities in %.1fs (%.1f entities/sec)"
+        % (len(mapping), elapsed, len(mapping) / elapsed if elapsed else 0)
+    )
+    deletes = [
+        operation for operation in plan if operation.action == SyncAction.DELETE
+    ]
+    for operation in deletes:
+        print("Removing: {}({})".format(operation.name, operation.existing_id))
+    _run_concurrently(
+        [partial(syn.delete, operation.existing_id) for operation in deletes],
+        max_workers=max_workers,
+    )
     return mapping
 
 
-def main(release: str, test: bool) -> None:
+def report_sync_plan(syn: synapseclient.Synapse, plan: List[SyncOperation]) -> None:
+    """Logs the operations of a sync plan that change the destination
+    along with the number of operations of each kind
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        plan (List[SyncOperation]): the sync plan, see plan_sync
+    """
+    for operation in plan:
+        if operation.action != SyncAction.UNCHANGED:
+            syn.logger.info(
+                "%s: %s (%s)" % (operation.action, operation.name, operation.folder_id)
+            )
+    counts = {
+        action: sum(operation.action == action for operation in plan)
+        for action in SyncAction.ALL
+    }
+    syn.logger.info(
+        "Sync plan: "
+        + ", ".join("%d %s" % (count, action) for action, count in counts.items())
+    )
+
+
+def _get_folder(
+    syn: synapseclient.Synapse, name: str, parent_id: Optional[str], dry_run: bool
+) -> Optional[str]:
+    """Gets the synapse id of a destination folder, creating it unless it is a dry run
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        name (str): name of the folder
+        parent_id (Optional[str]): synapse id of the parent of the folder
+        dry_run (bool): only look up the folder rather than create it
+
+    Returns:
+        Optional[str]: the synapse id of the folder or None if
+            it doesn't exist in a dry run
+    """
+    if dry_run:
+        if parent_id is None:
+            return None
+        return syn.findEntityId(name, parent=parent_id)
+    return syn.store(Folder(name, parent=parent_id)).id
+
+
+def main(
+    release: str,
+    test: bool,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    dry_run: bool = False,
+) -> List[SyncOperation]:
     """Updated BPC project
     Args:
         release (str): name of the release
         test (bool): testing or not
+        max_workers (int, optional): the maximum number of Synapse requests made
+            at the same time when copying. Defaults to DEFAULT_MAX_WORKERS.
+        dry_run (bool, optional): only plan and report the sync without changing
+            the BPC project. Defaults to False.
+
+    Returns:
+        List[SyncOperation]: the sync plan
     """
     # if release.endswith("1-consortium"):
     #     raise ValueError("First consortium release are not released")
@@ -209,79 +536,58 @@ def main(release: str, test: bool) -> None:
         test=test,
     )
 
-    # Get existing BPC cBioPortal release files
+    # Get existing BPC cBioPortal release folders
     major_release = release.split(".")[0]
-    release_folder_ent = syn.store(
-        Folder(f"Release {major_release}", parent=ent_synids["data_folder_synid"])
+    release_folder_id = _get_folder(
+        syn, f"Release {major_release}", ent_synids["data_folder_synid"], dry_run
     )
-    bpc_folder_ent = syn.store(Folder(release, parent=release_folder_ent))
-    caselist_folder_ent = syn.store(Folder("case_lists", parent=bpc_folder_ent))
-    genepanel_folder_ent = syn.store(Folder("gene_panels", parent=bpc_folder_ent))
-
-    # Get existing gene panels
-    existing_gene_panels = syn.getChildren(genepanel_folder_ent)
-    genepanel_map = {exist["name"]: exist["id"] for exist in existing_gene_panels}
-    # Get existing case lists
-    case_list = syn.getChildren(caselist_folder_ent)
-    caselist_map = {case["name"]: case["id"] for case in case_list}
+    bpc_folder_id = _get_folder(syn, release, release_folder_id, dry_run)
+    caselist_folder_id = _get_folder(syn, "case_lists", bpc_folder_id, dry_run)
+    genepanel_folder_id = _get_folder(syn, "gene_panels", bpc_folder_id, dry_run)
 
     # Get release files
     release_files = syn.getChildren(release_synid)
     synid_map = {release["name"]: release["id"] for release in release_files}
 
-    #HACK: Copy functions from synapseutils won't work because files have access restrictions
-    synu.copy_functions._copyRecursive = _copyRecursive
-
-    # Copy gene panel files
-    for name in synid_map:
-        if name.startswith("data_gene_panel_"):
-            ent = syn.get(synid_map[name], followLink=True, downloadFile=False)
-            synu.copy(
-                syn,
-                ent,
-                genepanel_folder_ent.id,
-                updateExisting=True,
-                skipCopyAnnotations=True,
-            )
-    # Remove gene panels
-    for name in genepanel_map:
-        if name not in synid_map:
-            print("Removing: {}({})".format(name, genepanel_map[name]))
-            syn.delete(genepanel_map[name])
-
     new_caselists = syn.getChildren(synid_map["case_lists"])
     new_caselist_map = {case["name"]: case["id"] for case in new_caselists}
-    # Copy case lists
-    for name in new_caselist_map:
-        ent = syn.get(new_caselist_map[name], followLink=True, downloadFile=False)
-        synu.copy(
-            syn,
-            ent,
-            caselist_folder_ent.id,
-            updateExisting=True,
-            skipCopyAnnotations=True,
-        )
-    # Remove case lists
-    for name in caselist_map:
-        if name not in new_caselist_map:
-            print("Removing: {}({})".format(name, caselist_map[name]))
-            syn.delete(caselist_map[name])
-
-    # Copy rest of the files
-    for name in synid_map:
-        # Do not copy over files with these patterns
-        # exclude = name.startswith(("data_gene_panel_", "data_clinical.txt",
-        #                            "case_lists")) or name.endswith(".html")
-        if not name.startswith(("data_gene_panel_", "data_clinical.txt", "case_lists")):
-            ent = syn.get(synid_map[name], followLink=True, downloadFile=False)
-            synu.copy(
-                syn,
-                ent,
-                bpc_folder_ent.id,
-                updateExisting=True,
-                skipCopyAnnotations=True,
-            )
 
+    genepanel_names = [
+        name for name in synid_map if name.startswith("data_gene_panel_")
+    ]
+
+    # Gene panels, case lists and the rest of the files are synced together
+    copies = [(synid_map[name], genepanel_folder_id) for name in genepanel_names]
+    copies.extend(
+        (new_caselist_map[name], caselist_folder_id) for name in new_caselist_map
+    )
+    # Do not copy over files with these patterns
+    # exclude = name.startswith(("data_gene_panel_", "data_clinical.txt",
+    #                            "case_lists")) or name.endswith(".html")
+    copies.extend(
+        (synid_map[name], bpc_folder_id)
+        for name in synid_map
+        if not name.startswith(("data_gene_panel_", "data_clinical.txt", "case_lists"))
+    )
+    sources = gather_copy_sources(syn, copies, max_workers=max_workers)
+    destination_files = get_destination_files(
+        syn,
+        [bpc_folder_id, caselist_folder_id, genepanel_folder_id],
+        max_workers=max_workers,
+    )
+    # Only gene panels and case lists that are no longer released are removed
+    plan = plan_sync(
+        sources,
+        destination_files,
+        release_names={
+            caselist_folder_id: set(new_caselist_map),
+            genepanel_folder_id: set(genepanel_names),
+        },
+    )
+    report_sync_plan(syn, plan)
+    if not dry_run:
+        apply_sync_plan(syn, plan, max_workers=max_workers)
+    return plan
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Consortium to BPC")
@@ -289,5 +595,18 @@ if __name__ == "__main__":
         "release", type=str, metavar="8.2-consortium", help="GENIE release version"
     )
     parser.add_argument("--test", action="store_true", help="Testing")
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Maximum number of Synapse requests made at the same time when copying",
+    )
+    parser.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only report the files that would be created, updated or deleted",
+    )
     args = parser.parse_args()
-    main(args.release, args.test)
\ No newline at end of file
+    main(
+        args.release, args.test, max_workers=args.max_workers, dry_run=args.dry_run
+    )
\ No newline at end of file
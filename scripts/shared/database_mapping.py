@@ -0,0 +1,128 @@
+"""
+Resolves GENIE database names (the Database column of the database mapping
+tables, e.g: sample, bed, releaseFolder) to the synapse ids in their Id column.
+
+Each mapping table is queried once and memoized for the rest of the run, so
+every lookup after the first one is free. The mapping tables can also be
+cached on disk between runs, in which case they are only queried again once
+the etag of the mapping table changes.
+
+Usage:
+    from database_mapping import DatabaseMapping
+
+    mapping = DatabaseMapping({"production": "syn10967259", "staging": "syn12094210"})
+    sample_synid = mapping.get_synid("sample", "production")
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+import synapseclient
+from synapseclient.models import query
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseMapping:
+    """Memoized lookups of the database mapping tables."""
+
+    def __init__(
+        self,
+        mapping_synids: Dict[str, str],
+        syn: Optional[synapseclient.Synapse] = None,
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            mapping_synids (Dict[str, str]): mapping of each database (e.g: production, staging)
+                to the synapse id of its mapping table.
+            syn (synapseclient.Synapse): synapse client connection used to get the etags of
+                the mapping tables. Only needed with cache_dir. Optional.
+            cache_dir (str): local directory to cache the mapping tables in between runs.
+                Optional. The mapping tables are only memoized for the run if None.
+        """
+        self.mapping_synids = mapping_synids
+        self._lock = threading.Lock()
+        self._mappings = {}
+        self.syn = None
+        self.cache_dir = None
+        if cache_dir is not None:
+            self.use_disk_cache(syn, cache_dir)
+
+    def use_disk_cache(self, syn: synapseclient.Synapse, cache_dir: str) -> None:
+        """
+        Caches the mapping tables on disk, validated against their etags.
+        Args:
+            syn (synapseclient.Synapse): synapse client connection
+            cache_dir (str): local directory to cache the mapping tables in
+        """
+        self.syn = syn
+        self.cache_dir = cache_dir
+
+    def _load_cached(self, mapping_synid: str) -> Optional[pd.DataFrame]:
+        """
+        Loads a mapping table from the disk cache if its etag is unchanged,
+        otherwise queries it and updates the cache.
+        Args:
+            mapping_synid (str): synapse id of the mapping table
+        Returns:
+            pd.DataFrame: the mapping table
+        """
+        etag = self.syn.get(mapping_synid, downloadFile=False).etag
+        cache_path = os.path.join(self.cache_dir, f"{mapping_synid}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r") as cache_file:
+                cached = json.load(cache_file)
+            if cached["etag"] == etag:
+                logger.info(f"Loaded database mapping {mapping_synid} from cache")
+                return pd.DataFrame.from_records(cached["records"])
+        mapping = query(f"SELECT * FROM {mapping_synid}").convert_dtypes()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_cache_path = f"{cache_path}.tmp"
+        with open(temp_cache_path, "w") as cache_file:
+            json.dump(
+                {"etag": etag, "records": mapping.to_dict(orient="records")},
+                cache_file,
+                default=str,
+            )
+        os.replace(temp_cache_path, cache_path)
+        return mapping
+
+    def get_mapping(self, database: str) -> pd.DataFrame:
+        """
+        Gets the mapping table of a database, querying it only on the first call.
+        Args:
+            database (str): the database, e.g: production or staging
+        Returns:
+            pd.DataFrame: the mapping table
+        """
+        with self._lock:
+            if database not in self._mappings:
+                mapping_synid = self.mapping_synids[database]
+                if self.cache_dir is not None:
+                    mapping = self._load_cached(mapping_synid)
+                else:
+                    mapping = query(f"SELECT * FROM {mapping_synid}").convert_dtypes()
+                self._mappings[database] = mapping
+            return self._mappings[database]
+
+    def get_synid(self, table_key: str, database: str) -> str:
+        """
+        Gets the synapse id of a table from the mapping table of a database.
+        Args:
+            table_key (str): the name of the table in the Database column, e.g: sample
+            database (str): the database, e.g: production or staging
+        Raises:
+            KeyError: when the table isn't in the mapping table
+        Returns:
+            str: the synapse id of the table
+        """
+        mapping = self.get_mapping(database)
+        synids = mapping[mapping["Database"] == table_key].Id.values
+        if len(synids) == 0:
+            raise KeyError(f"{table_key} is not in the {database} database mapping")
+        return synids[0]
@@ -0,0 +1,36 @@
+"""
+Looks up the file handles of Synapse file entities without downloading them.
+
+Usage:
+    from file_handles import get_data_file_handle
+
+    ent = syn.get("syn123", downloadFile=False)
+    file_handle = get_data_file_handle(syn, ent)
+"""
+
+from typing import Any, Dict
+
+import synapseclient
+
+
+def get_data_file_handle(
+    syn: synapseclient.Synapse, entity: synapseclient.File
+) -> Dict[str, Any]:
+    """Gets the data file handle of a version of a file without downloading it
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        entity (synapseclient.File): the file entity
+
+    Returns:
+        Dict[str, Any]: the file handle of the entity's data file
+    """
+    file_handles = syn.restGET(
+        f"/entity/{entity.id}/version/{entity.versionNumber}/filehandles"
+    )
+    # the results include the preview file handle along with the data file handle
+    return next(
+        file_handle
+        for file_handle in file_handles["list"]
+        if file_handle["id"] == entity.dataFileHandleId
+    )
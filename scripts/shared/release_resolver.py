@@ -0,0 +1,183 @@
+"""
+Resolves GENIE release names (e.g: 17.2-consortium) to the synapse ids of
+their release folders.
+
+Every release name to folder id pair of a release table or database mapping
+is fetched with one query and memoized for the rest of the run, keyed by the
+synapse id of the table or mapping. They are queried again when a release
+isn't memoized, e.g: when the release was created during the run.
+
+Usage:
+    from database_mapping import DatabaseMapping
+    from release_resolver import ReleaseResolver
+
+    mapping = DatabaseMapping({"production": "syn10967259"})
+    resolver = ReleaseResolver(syn)
+    release_folder_synid = resolver.from_database_mapping(
+        mapping, "production", "17.2-public"
+    )
+"""
+
+import re
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+import synapseclient
+
+# database_mapping needs synapseclient.models, which the synapseclient of the
+# release_utils image doesn't have, so it is only imported for type checking
+if TYPE_CHECKING:
+    from database_mapping import DatabaseMapping
+
+# Test releases and the names of their release folders
+TEST_RELEASE_FOLDER_NAMES = {"TEST.consortium": "TESTING", "TEST.public": "TESTpublic"}
+
+SYNID_PATTERN = re.compile(r"^syn\d+$")
+
+
+def _validate_synid(synid: str) -> str:
+    """
+    Checks that a synapse id is safe to put in a table query.
+    Args:
+        synid (str): the synapse id
+    Raises:
+        ValueError: when the synapse id is malformed
+    Returns:
+        str: the synapse id
+    """
+    if not SYNID_PATTERN.match(str(synid)):
+        raise ValueError(f"{synid} is not a valid synapse id")
+    return synid
+
+
+class ReleaseResolver:
+    """Cached lookups of the release folder of a release."""
+
+    def __init__(self, syn: synapseclient.Synapse) -> None:
+        """
+        Args:
+            syn (synapseclient.Synapse): synapse client connection
+        """
+        self.syn = syn
+        self._cache = {}
+
+    def _query_pairs(self, query: str, name_col: str, id_col: str) -> Dict[str, str]:
+        """
+        Queries release name to release folder id pairs.
+        Args:
+            query (str): the table query
+            name_col (str): the column of the release names
+            id_col (str): the column of the release folder ids
+        Returns:
+            Dict[str, str]: the release folder id of each release
+        """
+        df = self.syn.tableQuery(query, includeRowIdAndRowVersion=False).asDataFrame()
+        df = df.dropna(subset=[name_col, id_col])
+        release_folders = {}
+        for name, synid in zip(df[name_col], df[id_col]):
+            # releases in more than one folder resolve to the first one
+            release_folders.setdefault(str(name), str(synid))
+        return release_folders
+
+    def _resolve(
+        self,
+        cache_key: str,
+        release: str,
+        query_release_folders: Callable[[], Dict[str, str]],
+    ) -> str:
+        """
+        Resolves a release from the memoized release folders, querying the
+        release folders when they aren't memoized or don't have the release.
+        Args:
+            cache_key (str): the key of the release table or mapping
+            release (str): name of the release
+            query_release_folders (Callable[[], Dict[str, str]]): queries the
+                release folder id of every release
+        Raises:
+            ValueError: when the release has no release folder
+        Returns:
+            str: the synapse id of the release folder
+        """
+        release_folders = self._cache.get(cache_key)
+        if release_folders is None or release not in release_folders:
+            release_folders = query_release_folders()
+            self._cache[cache_key] = release_folders
+        if release not in release_folders:
+            all_releases = ", ".join(sorted(release_folders))
+            raise ValueError(f"Must choose correct release: {all_releases}")
+        return release_folders[release]
+
+    def get_release_table_folders(self, release_table_synid: str) -> Dict[str, str]:
+        """
+        Queries the release folder id of every release in a release table.
+        Args:
+            release_table_synid (str): synapse id of the release table
+        Returns:
+            Dict[str, str]: the release folder id of each release
+        """
+        release_table_synid = _validate_synid(release_table_synid)
+        return self._query_pairs(
+            f"SELECT DISTINCT release, parentId FROM {release_table_synid}",
+            name_col="release",
+            id_col="parentId",
+        )
+
+    def get_database_mapping_folders(
+        self, mapping: "DatabaseMapping", database: str
+    ) -> Dict[str, str]:
+        """
+        Queries the release folder id of every release in the release folder
+        view of a database mapping.
+        Args:
+            mapping (DatabaseMapping): the database mapping tables
+            database (str): the database, e.g: production or staging
+        Returns:
+            Dict[str, str]: the release folder id of each release
+        """
+        release_view_synid = _validate_synid(
+            mapping.get_synid("releaseFolder", database)
+        )
+        return self._query_pairs(
+            f"SELECT name, id FROM {release_view_synid} "
+            "WHERE name NOT LIKE 'Release%' AND name <> 'case_lists'",
+            name_col="name",
+            id_col="id",
+        )
+
+    def from_release_table(self, release_table_synid: str, release: str) -> str:
+        """
+        Resolves the release folder of a release from a release table.
+        Args:
+            release_table_synid (str): synapse id of the release table
+            release (str): name of the release
+        Raises:
+            ValueError: when the release isn't in the release table
+        Returns:
+            str: the synapse id of the release folder
+        """
+        return self._resolve(
+            f"release_table:{release_table_synid}",
+            release,
+            lambda: self.get_release_table_folders(release_table_synid),
+        )
+
+    def from_database_mapping(
+        self, mapping: "DatabaseMapping", database: str, release: str
+    ) -> str:
+        """
+        Resolves the release folder of a release from the release folder view
+        of a database mapping. Test releases resolve to their test folders.
+        Args:
+            mapping (DatabaseMapping): the database mapping tables
+            database (str): the database, e.g: production or staging
+            release (str): name of the release
+        Raises:
+            ValueError: when the release isn't in the release folder view
+        Returns:
+            str: the synapse id of the release folder
+        """
+        release = TEST_RELEASE_FOLDER_NAMES.get(release, release)
+        return self._resolve(
+            f"database_mapping:{mapping.mapping_synids[database]}",
+            release,
+            lambda: self.get_database_mapping_folders(mapping, database),
+        )
@@ -0,0 +1,49 @@
+"""Benchmarks the memory use and load time of a MAF-sized file read by
+`get_synapse_file_or_table_as_dataframe` with the default dtypes against
+the pyarrow-backed and categorical dtypes of `arrow_dtypes=True`.
+
+Usage:
+    python benchmarks/benchmark_arrow_dtypes.py --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+from benchmark_read_csv_with_auto_sep import write_maf
+
+import synapse_compare.compare_between_two_synapse_entities as compare
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default=1000000, type=int, help="Rows in the MAF")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, "data_mutations_extended.txt")
+        write_maf(filepath, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(filepath) / 1024 ** 2:.1f} MB on disk")
+        # the file is read from disk instead of downloaded from Synapse
+        syn = mock.Mock()
+        syn.get.return_value.path = filepath
+        for arrow_dtypes in [False, True]:
+            start = time.perf_counter()
+            df = compare.get_synapse_file_or_table_as_dataframe(
+                syn=syn,
+                compare_type="file",
+                syn_id="syn0",
+                arrow_dtypes=arrow_dtypes,
+            )
+            elapsed = time.perf_counter() - start
+            memory_mb = df.memory_usage(deep=True).sum() / 1024**2
+            print(
+                f"arrow_dtypes={arrow_dtypes}: {elapsed:.2f}s to load, "
+                f"{memory_mb:.1f} MB in memory"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmarks the quick check of `run_compare` on clinical-sized TSVs against
+the original quick check, which read both files into dataframes and ran
+`assert_frame_equal` on them. Both files are the same in the "identical"
+case and differ in one value in the "different" case.
+
+Usage:
+    python benchmarks/benchmark_quick_check.py --rows 200000 --columns 41
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import pandas as pd
+
+import synapse_compare.compare_between_two_synapse_entities as compare
+
+
+def write_tsv(filepath: str, rows: int, columns: int, changed_row: int = -1) -> None:
+    """Writes a TSV with an id column and the given number of value columns,
+    with a different value in one of the rows if changed_row is set"""
+    with open(filepath, "w") as tsv:
+        tsv.write("\t".join(["SAMPLE_ID"] + [f"COL{col}" for col in range(columns - 1)]))
+        tsv.write("\n")
+        for row in range(rows):
+            values = [f"GENIE-CENTER-{row}"] + [
+                "NA" if (row + col) % 17 == 0 else f"value{(row * col) % 1000}"
+                for col in range(columns - 1)
+            ]
+            if row == changed_row:
+                values[1] = "changed"
+            tsv.write("\t".join(values) + "\n")
+
+
+def original_quick_check(filepath1: str, filepath2: str) -> str:
+    """The original quick check, which reads both files in full"""
+    df1 = compare.read_csv_with_auto_sep(
+        filepath1, na_values=compare.DEFAULT_NA_VALUES, keep_default_na=False
+    )
+    df2 = compare.read_csv_with_auto_sep(
+        filepath2, na_values=compare.DEFAULT_NA_VALUES, keep_default_na=False
+    )
+    try:
+        pd.testing.assert_frame_equal(df1, df2)
+        return "identical"
+    except AssertionError:
+        return "different"
+
+
+def run_compare_quick_check(filepath1: str, filepath2: str) -> str:
+    """The quick check of `run_compare`, with the reports left out"""
+    syn = mock.Mock()
+    syn.get.side_effect = lambda synid, **kwargs: mock.Mock(
+        path={"syn1": filepath1, "syn2": filepath2}[synid]
+    )
+    reports = {"comparison_report": None}
+    with tempfile.TemporaryDirectory() as report_dir, mock.patch.object(
+        compare, "generate_comparison_reports", return_value=reports
+    ), mock.patch.object(compare, "get_differing_columns", return_value=[]), mock.patch.object(
+        compare, "save_reports", return_value=[]
+    ):
+        return compare.run_compare(
+            syn_id_1="syn1",
+            syn_id_2="syn2",
+            version1="v1",
+            version2="v2",
+            compare_type="file",
+            main_download_directory=report_dir,
+            join_keys=["SAMPLE_ID"],
+            syn=syn,
+        )["status"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default=200000, type=int, help="Rows in each TSV")
+    parser.add_argument("--columns", default=41, type=int, help="Columns in each TSV")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath1 = os.path.join(tmp_dir, "data_clinical_sample_1.txt")
+        identical_filepath = os.path.join(tmp_dir, "data_clinical_sample_2.txt")
+        different_filepath = os.path.join(tmp_dir, "data_clinical_sample_3.txt")
+        write_tsv(filepath1, args.rows, args.columns)
+        shutil.copyfile(filepath1, identical_filepath)
+        write_tsv(different_filepath, args.rows, args.columns, changed_row=args.rows // 2)
+        print(
+            f"{args.rows} rows x {args.columns} columns, "
+            f"{os.path.getsize(filepath1) / 1024 ** 2:.1f} MB per file"
+        )
+        for case, filepath2 in [
+            ("identical", identical_filepath),
+            ("different", different_filepath),
+        ]:
+            timings = {}
+            for name, check_func in [
+                ("original", original_quick_check),
+                ("run_compare", run_compare_quick_check),
+            ]:
+                start = time.perf_counter()
+                status = check_func(filepath1, filepath2)
+                timings[name] = time.perf_counter() - start
+                print(f"{case} files, {name}: {timings[name]:.2f}s ({status})")
+            print(
+                f"{case} files, speedup: "
+                f"{timings['original'] / timings['run_compare']:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
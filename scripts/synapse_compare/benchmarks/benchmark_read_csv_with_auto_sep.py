@@ -0,0 +1,88 @@
+"""Benchmarks `read_csv_with_auto_sep` on a MAF-sized TSV against the previous
+behavior of parsing the whole file with a comma before parsing it again with a tab.
+
+Usage:
+    python benchmarks/benchmark_read_csv_with_auto_sep.py --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import synapse_compare.compare_between_two_synapse_entities as compare
+
+MAF_COLUMNS = [
+    "Hugo_Symbol",
+    "Entrez_Gene_Id",
+    "Center",
+    "NCBI_Build",
+    "Chromosome",
+    "Start_Position",
+    "End_Position",
+    "Strand",
+    "Variant_Classification",
+    "Variant_Type",
+    "Reference_Allele",
+    "Tumor_Seq_Allele1",
+    "Tumor_Seq_Allele2",
+    "Tumor_Sample_Barcode",
+    "HGVSp_Short",
+    "t_depth",
+    "t_ref_count",
+    "t_alt_count",
+]
+
+
+def write_maf(filepath: str, rows: int) -> None:
+    """Writes a MAF-like TSV with the given number of rows"""
+    with open(filepath, "w") as maf:
+        maf.write("\t".join(MAF_COLUMNS) + "\n")
+        for row in range(rows):
+            maf.write(
+                f"GENE{row % 500}\t{row % 20000}\tCENTER{row % 20}\tGRCh37\t{row % 22 + 1}\t"
+                f"{row}\t{row + 1}\t+\tMissense_Mutation\tSNP\tA\tA\tT\t"
+                f"GENIE-CENTER-{row % 5000}-1\tp.A{row % 900}T\t{row % 300}\t"
+                f"{row % 200}\t{row % 100}\n"
+            )
+
+
+def read_with_double_parse(filepath: str, **csv_kwargs) -> pd.DataFrame:
+    """The previous delimiter detection, which parses the whole file up to twice"""
+    df = pd.read_csv(filepath, sep=",", **csv_kwargs)
+    if len(df.columns) > 1:
+        return df
+    return pd.read_csv(filepath, sep="\t", **csv_kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default=1000000, type=int, help="Rows in the TSV")
+    args = parser.parse_args()
+
+    csv_kwargs = {
+        "na_values": compare.DEFAULT_NA_VALUES,
+        "keep_default_na": compare.DEFAULT_KEEP_DEFAULT_NA,
+        "low_memory": False,
+        "engine": "c",
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, "data_mutations_extended.txt")
+        write_maf(filepath, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(filepath) / 1024 ** 2:.1f} MB")
+        timings = {}
+        for name, read_func in [
+            ("double parse", read_with_double_parse),
+            ("single parse", compare.read_csv_with_auto_sep),
+        ]:
+            start = time.perf_counter()
+            read_func(filepath, **csv_kwargs)
+            timings[name] = time.perf_counter() - start
+            print(f"{name}: {timings[name]:.2f}s")
+        print(f"speedup: {timings['double parse'] / timings['single parse']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
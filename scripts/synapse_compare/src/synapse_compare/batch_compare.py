@@ -0,0 +1,365 @@
+"""Runs `run_compare` for every pair of synapse entities listed in a manifest
+(e.g: all of the files and tables in a project) across a pool of processes
+and writes a summary index linking each entity's reports.
+
+The manifest is a CSV or YAML file with one comparison per row/item:
+    syn_id_1, syn_id_2: synapse ids of the entities to compare. Required.
+    compare_type: file or table. Defaults to table.
+    entity_name: prefix of the entity's reports. Defaults to syn_id_1.
+    join_keys: keys to merge on, space separated in CSV. Optional.
+    version1, version2: version names. Defaults to v1 and v2.
+    filter_on_version: whether to filter on version comment. Defaults to False.
+
+Each worker process reuses one Synapse client for all of its comparisons and
+all of them share the Synapse download cache on disk.
+"""
+
+import argparse
+import csv
+import html
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import yaml
+
+import synapse_compare.compare_between_two_synapse_entities as compare
+
+logger = logging.getLogger("compare_report_logger")
+
+DEFAULT_MAX_WORKERS = 4
+
+MANIFEST_COLUMNS = [
+    "syn_id_1",
+    "syn_id_2",
+    "compare_type",
+    "entity_name",
+    "join_keys",
+    "version1",
+    "version2",
+    "filter_on_version",
+]
+
+INDEX_JSON_NAME = "comparison_index.json"
+INDEX_HTML_NAME = "comparison_index.html"
+
+
+def _normalize_manifest_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Fills in the defaults of a manifest entry and converts
+    the CSV string values to their types
+
+    Args:
+        entry (Dict[str, Any]): raw manifest entry
+
+    Raises:
+        ValueError: when the entry is missing a synapse id or has unknown columns
+
+    Returns:
+        Dict[str, Any]: the keyword arguments of `run_compare` for the entry
+    """
+    entry = {key: value for key, value in entry.items() if value not in (None, "")}
+    unknown = set(entry) - set(MANIFEST_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown manifest columns: {sorted(unknown)}")
+    if "syn_id_1" not in entry or "syn_id_2" not in entry:
+        raise ValueError(f"Manifest entry {entry} is missing syn_id_1 or syn_id_2")
+
+    join_keys = entry.get("join_keys")
+    if isinstance(join_keys, str):
+        join_keys = join_keys.split()
+    filter_on_version = entry.get("filter_on_version", False)
+    if isinstance(filter_on_version, str):
+        filter_on_version = filter_on_version.strip().lower() in ("true", "yes", "1")
+    return {
+        "syn_id_1": entry["syn_id_1"],
+        "syn_id_2": entry["syn_id_2"],
+        "compare_type": entry.get("compare_type", "table"),
+        "entity_name": entry.get("entity_name", entry["syn_id_1"]),
+        "join_keys": join_keys,
+        "version1": str(entry.get("version1", "v1")),
+        "version2": str(entry.get("version2", "v2")),
+        "filter_on_version": filter_on_version,
+    }
+
+
+def read_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Reads the comparisons listed in a CSV or YAML manifest
+
+    Args:
+        manifest_path (str): path to the manifest. YAML manifests
+            end in .yaml or .yml and are a list of comparisons.
+
+    Raises:
+        ValueError: when two comparisons would write to the same reports
+
+    Returns:
+        List[Dict[str, Any]]: the keyword arguments of `run_compare` for each comparison
+    """
+    with open(manifest_path, "r", newline="") as manifest_file:
+        if manifest_path.endswith((".yaml", ".yml")):
+            entries = yaml.safe_load(manifest_file) or []
+        else:
+            entries = list(csv.DictReader(manifest_file))
+    entries = [_normalize_manifest_entry(entry) for entry in entries]
+
+    report_prefixes = [
+        f"{entry['entity_name']}_{entry['version1']}_vs_{entry['version2']}"
+        for entry in entries
+    ]
+    duplicates = sorted(
+        {prefix for prefix in report_prefixes if report_prefixes.count(prefix) > 1}
+    )
+    if duplicates:
+        raise ValueError(
+            f"Manifest entries share the same report names: {duplicates}. "
+            "Give them different entity_name values."
+        )
+    return entries
+
+
+def _run_manifest_entry(
+    entry: Dict[str, Any], output_dir: str, compare_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Runs one comparison of the manifest. Failures are recorded
+    in the result instead of stopping the batch.
+
+    Args:
+        entry (Dict[str, Any]): the keyword arguments of `run_compare` for the comparison
+        output_dir (str): local output directory for the reports
+        compare_kwargs (Dict[str, Any]): keyword arguments of `run_compare`
+            shared by all of the comparisons
+
+    Returns:
+        Dict[str, Any]: the entry along with its status, differing_columns,
+            reports, error and elapsed seconds
+    """
+    result = {
+        **entry,
+        "status": None,
+        "differing_columns": [],
+        "reports": [],
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        result.update(
+            compare.run_compare(
+                main_download_directory=output_dir, **entry, **compare_kwargs
+            )
+        )
+    except Exception as err:
+        logger.exception(f"Comparison of {entry['entity_name']} failed.")
+        result.update(status="error", error=f"{type(err).__name__}: {err}")
+    result["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def write_index(results: List[Dict[str, Any]], output_dir: str) -> Dict[str, str]:
+    """Writes the summary index of a batch as JSON and as an HTML
+    page linking each entity's reports
+
+    Args:
+        results (List[Dict[str, Any]]): results of each comparison
+        output_dir (str): local output directory of the reports
+
+    Returns:
+        Dict[str, str]: paths of the json and html index
+    """
+    statuses = [result["status"] for result in results]
+    summary = {
+        status: statuses.count(status) for status in ["identical", "different", "error"]
+    }
+    index = {
+        "summary": summary,
+        "results": [
+            {
+                **result,
+                "reports": [
+                    os.path.relpath(report, output_dir) for report in result["reports"]
+                ],
+            }
+            for result in results
+        ],
+    }
+    json_path = os.path.join(output_dir, INDEX_JSON_NAME)
+    with open(json_path, "w") as json_file:
+        json.dump(index, json_file, indent=2)
+
+    rows = []
+    for result in index["results"]:
+        links = " ".join(
+            f'<a href="{html.escape(report)}">{html.escape(os.path.basename(report))}</a>'
+            for report in result["reports"]
+        )
+        cells = [
+            result["entity_name"],
+            f"{result['syn_id_1']} ({result['version1']})",
+            f"{result['syn_id_2']} ({result['version2']})",
+            result["compare_type"],
+            result["status"],
+            ", ".join(result["differing_columns"]),
+            result["error"] or "",
+            result["elapsed_seconds"],
+        ]
+        rows.append(
+            "<tr>"
+            + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in cells)
+            + f"<td>{links}</td></tr>"
+        )
+    headers = [
+        "Entity",
+        "Entity 1",
+        "Entity 2",
+        "Type",
+        "Status",
+        "Differing columns",
+        "Error",
+        "Seconds",
+        "Reports",
+    ]
+    html_path = os.path.join(output_dir, INDEX_HTML_NAME)
+    with open(html_path, "w") as html_file:
+        html_file.write(
+            "<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\">"
+            "<title>Comparison index</title></head>\n<body>\n"
+            "<h1>Comparison index</h1>\n"
+            f"<p>{summary['identical']} identical, {summary['different']} different, "
+            f"{summary['error']} failed</p>\n"
+            "<table border=\"1\">\n<tr>"
+            + "".join(f"<th>{header}</th>" for header in headers)
+            + "</tr>\n"
+            + "\n".join(rows)
+            + "\n</table>\n</body>\n</html>\n"
+        )
+    logger.info(f"Comparison index generated to {json_path} and {html_path}")
+    return {"json": json_path, "html": html_path}
+
+
+def run_batch(
+    manifest_path: str,
+    output_dir: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    **compare_kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """Runs every comparison in the manifest and writes the summary index
+
+    Args:
+        manifest_path (str): path to the CSV or YAML manifest
+        output_dir (str): local output directory for the reports and index
+        max_workers (int, optional): number of comparisons run at the same time,
+            each in its own process. Comparisons run in this process if 1.
+            Defaults to DEFAULT_MAX_WORKERS.
+        **compare_kwargs: keyword arguments of `run_compare` shared by all
+            of the comparisons (e.g: profile, na_values, save_to_synapse)
+
+    Returns:
+        List[Dict[str, Any]]: result of each comparison, in manifest order
+    """
+    entries = read_manifest(manifest_path)
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info(f"Running {len(entries)} comparisons with {max_workers} workers.")
+    run_args = (
+        entries,
+        [output_dir] * len(entries),
+        [compare_kwargs] * len(entries),
+    )
+    if max_workers > 1 and len(entries) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_run_manifest_entry, *run_args))
+    else:
+        results = list(map(_run_manifest_entry, *run_args))
+    write_index(results, output_dir)
+    return results
+
+
+def read_args():
+    parser = argparse.ArgumentParser(
+        description="Compare every pair of synapse entities listed in a manifest"
+    )
+    parser.add_argument(
+        "--manifest",
+        required=True,
+        help="CSV or YAML manifest of the synapse entities to compare",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=os.getcwd(),
+        help="Local directory to save the reports and the summary index in",
+    )
+    parser.add_argument(
+        "--max-workers",
+        default=DEFAULT_MAX_WORKERS,
+        type=int,
+        help="Number of comparisons run at the same time. Default: DEFAULT_MAX_WORKERS",
+    )
+    parser.add_argument(
+        "--profile",
+        default=compare.DEFAULT_PROFILE_MODE,
+        choices=compare.PROFILE_MODES,
+        help="Profiling tier of the detailed reports. Default: full",
+    )
+    parser.add_argument(
+        "--profile-sample-size",
+        default=compare.DEFAULT_PROFILE_SAMPLE_SIZE,
+        type=int,
+        help="Number of rows sampled from each entity with --profile sampled.",
+    )
+    parser.add_argument(
+        "--only-differing-columns",
+        default=False,
+        action="store_true",
+        help="Restrict the reports to the join keys and the differing columns. Optional.",
+    )
+    parser.add_argument(
+        "--save-to-synapse",
+        default=False,
+        action="store_true",
+        help="Whether to save reports to Synapse on top of saving locally. Optional.",
+    )
+    parser.add_argument(
+        "--output-synid",
+        default=None,
+        help="Synapse id of the output entity to store the reports to. Optional.",
+    )
+    parser.add_argument(
+        "--table-cache-dir",
+        default=None,
+        help="Local directory to cache table query results in. Optional.",
+    )
+    parser.add_argument(
+        "--table-cache-size-mb",
+        default=compare.table_cache.DEFAULT_TABLE_CACHE_SIZE_MB,
+        type=int,
+        help="Maximum total size of the table cache. Default: DEFAULT_TABLE_CACHE_SIZE_MB",
+    )
+    parser.add_argument(
+        "--arrow-dtypes",
+        default=False,
+        action="store_true",
+        help="Read the entities with pyarrow-backed and categorical dtypes. Optional.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = read_args()
+    run_batch(
+        manifest_path=args.manifest,
+        output_dir=args.output_dir,
+        max_workers=args.max_workers,
+        profile=args.profile,
+        profile_sample_size=args.profile_sample_size,
+        only_differing_columns=args.only_differing_columns,
+        save_to_synapse=args.save_to_synapse,
+        output_synid=args.output_synid,
+        table_cache_dir=args.table_cache_dir,
+        table_cache_size_mb=args.table_cache_size_mb,
+        arrow_dtypes=args.arrow_dtypes,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,27 @@ synapse ids that you want to compare against
 """
 
 import argparse
+import filecmp
 import logging
 import os
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import datacompy
 import pandas as pd
 from pandas.testing import assert_frame_equal
 import synapseclient
 from synapseclient.models import query
-from ydata_profiling import ProfileReport
+
+from synapse_compare import fingerprint, partitioned_compare, table_cache
+
+# datacompy and ydata_profiling are imported where the reports are generated
+# as they are slow to import and aren't needed for --help or the quick check
 
 logger = logging.getLogger("compare_report_logger")
 logger.setLevel(logging.INFO)
 
-
-syn = synapseclient.login(silent=True)
+# synapse client shared by the comparisons, created on first use by get_syn()
+_syn = None
 
 DEFAULT_NA_VALUES = [
     "-1.#IND",
@@ -46,6 +50,49 @@ DEFAULT_NA_VALUES = [
 
 DEFAULT_KEEP_DEFAULT_NA = False
 
+# columns with few distinct values repeated across many rows (e.g: in the MAF
+# and clinical files) that are stored as categoricals when reading with arrow dtypes
+ARROW_CATEGORICAL_COLUMNS = [
+    "Hugo_Symbol",
+    "Variant_Classification",
+    "Variant_Type",
+    "Center",
+    "CENTER",
+    "SEQ_ASSAY_ID",
+    "Chromosome",
+    "NCBI_Build",
+    "Strand",
+    "ONCOTREE_CODE",
+    "SAMPLE_TYPE",
+    "SEX",
+    "PRIMARY_RACE",
+    "ETHNICITY",
+]
+
+# profiling tiers for the detailed ydata-profiling report:
+#   full: profiles every row and column
+#   minimal: uses ydata-profiling's minimal mode (no correlations, interactions, etc)
+#   sampled: profiles a random sample of rows from each dataset
+#   differing: profiles the join keys and the columns that differ
+#   off: skips the detailed report
+PROFILE_MODES = ["full", "minimal", "sampled", "differing", "off"]
+DEFAULT_PROFILE_MODE = "full"
+DEFAULT_PROFILE_SAMPLE_SIZE = 10000
+DEFAULT_PROFILE_RANDOM_STATE = 42
+
+
+def get_syn() -> synapseclient.Synapse:
+    """Gets the synapse client connection, logging in on the first call
+        so importing this module doesn't need credentials
+
+    Returns:
+        synapseclient.Synapse: synapse client connection
+    """
+    global _syn
+    if _syn is None:
+        _syn = synapseclient.login(silent=True)
+    return _syn
+
 
 def is_synapse_id_version_format(value: str) -> bool:
     """Check if the string value matches the synapse id version format
@@ -131,15 +178,20 @@ def read_csv_with_auto_sep(
 
     If csv_kwargs contains a "sep" key, then that separator is passed directly to pandas.read_csv.
 
-    If no separator is provided, the function attempts to infer the delimiter
-    by:
+    If no separator is provided, the delimiter is detected from a bounded prefix of
+    the file (see `partitioned_compare.detect_sep`) and the file is parsed once with it:
 
-    1. Attempting to read the file using a comma (",") separator.
-    2. If parsing fails or results in a single-column DataFrame,
-    retry with a tab ("\t") separator.
-    3. Raising a ValueError if neither delimiter produces a structured table
+    1. Comma (",") is used if it gives more than one column and none of the rows
+    in the prefix has more fields than the header.
+    2. Otherwise tab ("\t") is used under the same conditions.
+    3. A ValueError is raised if neither delimiter produces a structured table
     (i.e., more than one column).
 
+    Gzip and bz2 compressed files are detected from their first bytes and
+    decompressed while they're read, whatever their extension, unless the
+    separator or compression are given. Lines skipped with the "comment" and
+    "skiprows" arguments are ignored when detecting the delimiter.
+
     Args:
         filepath (str): Path to the input file to be read.
         csv_kwargs (Optional[Dict[str, Any]], optional): Additional keyword arguments passed to pandas.read_csv.
@@ -152,7 +204,7 @@ def read_csv_with_auto_sep(
         ValueError:
             - If automatic delimiter detection fails to produce a structured table.
         pandas.errors.ParserError
-            - If parsing fails when a user-specified separator is provided.
+            - If parsing fails with the user-specified or detected separator.
 
     NOTE:
     - Automatic detection only attempts comma and tab delimiters.
@@ -163,31 +215,66 @@ def read_csv_with_auto_sep(
     if csv_kwargs is None:
         csv_kwargs = {}
 
+    read_csv_params = csv_kwargs.copy()
     # Respect user-provided separator
-    if "sep" in csv_kwargs:
-        return pd.read_csv(filepath, **csv_kwargs)
+    if "sep" not in read_csv_params:
+        if "compression" not in read_csv_params:
+            compression = partitioned_compare.detect_compression(filepath)
+            if compression:
+                read_csv_params["compression"] = compression
+        read_csv_params["sep"] = partitioned_compare.detect_sep(
+            filepath,
+            comment=read_csv_params.get("comment"),
+            skiprows=read_csv_params.get("skiprows"),
+        )
+    return pd.read_csv(filepath, **read_csv_params)
 
-    read_csv_params = csv_kwargs.copy()
-    # Try comma
-    try:
-        df = pd.read_csv(filepath, sep=",", **read_csv_params)
-        if len(df.columns) > 1:
-            return df
-    except pd.errors.ParserError:
-        pass
 
-    # Try tab
-    try:
-        df = pd.read_csv(filepath, sep="\t", **read_csv_params)
-        if len(df.columns) > 1:
-            return df
-    except pd.errors.ParserError:
-        pass
+def to_arrow_dtypes(
+    df: pd.DataFrame, categorical_columns: List[str] = ARROW_CATEGORICAL_COLUMNS
+) -> pd.DataFrame:
+    """Converts a dataframe read with pyarrow-backed dtypes so that the
+        given columns are dictionary encoded as categoricals
 
-    raise ValueError(
-        "Unable to determine delimiter automatically. "
-        "File does not appear to be comma- or tab-separated."
-    )
+    Args:
+        df (pd.DataFrame): input dataframe with pyarrow-backed dtypes
+        categorical_columns (List[str], optional): columns stored as categoricals.
+            Columns that are not in the dataframe are ignored.
+            Defaults to ARROW_CATEGORICAL_COLUMNS.
+
+    Returns:
+        pd.DataFrame: the dataframe with the categorical columns converted
+    """
+    columns = [column for column in categorical_columns if column in df.columns]
+    return df.astype({column: "category" for column in columns})
+
+
+def align_categories(
+    df1: pd.DataFrame, df2: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Gives the categorical columns in both dataframes the same categories,
+        since categoricals with different categories can't be compared or merged
+        on without being converted back to strings
+
+    Args:
+        df1 (pd.DataFrame): 1st dataset in the comparison
+        df2 (pd.DataFrame): 2nd dataset in the comparison
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: both dataframes with aligned categories
+    """
+    categories = {
+        column: df1[column].cat.categories.union(df2[column].cat.categories)
+        for column in df1.columns
+        if column in df2.columns
+        and isinstance(df1[column].dtype, pd.CategoricalDtype)
+        and isinstance(df2[column].dtype, pd.CategoricalDtype)
+    }
+    dtypes = {
+        column: pd.CategoricalDtype(column_categories)
+        for column, column_categories in categories.items()
+    }
+    return df1.astype(dtypes), df2.astype(dtypes)
 
 
 def get_synapse_file_or_table_as_dataframe(
@@ -197,6 +284,9 @@ def get_synapse_file_or_table_as_dataframe(
     na_values: List[str] = DEFAULT_NA_VALUES,
     keep_default_na: bool = DEFAULT_KEEP_DEFAULT_NA,
     csv_kwargs: Dict[str, Any] = None,
+    table_cache_dir: str = None,
+    table_cache_size_mb: int = table_cache.DEFAULT_TABLE_CACHE_SIZE_MB,
+    arrow_dtypes: bool = False,
 ) -> pd.DataFrame:
     """Takes the synapse file and table and converts it to
         a pandas dataframe for comparison later
@@ -227,6 +317,17 @@ def get_synapse_file_or_table_as_dataframe(
                 These options are only available when calling this function directly
                 in Python — they cannot be supplied via the command-line interface
                 when using argparse.
+        table_cache_dir (str, optional): Directory of the on-disk cache of table query results.
+            Tables are only queried again when their version or etag changes.
+            Defaults to None, which doesn't cache tables.
+        table_cache_size_mb (int, optional): Maximum total size of the table cache before the
+            least recently used tables are evicted. Defaults to
+            table_cache.DEFAULT_TABLE_CACHE_SIZE_MB.
+        arrow_dtypes (bool, optional): Whether to read the data with pyarrow-backed dtypes
+            (e.g: string[pyarrow]) and store the ARROW_CATEGORICAL_COLUMNS as categoricals,
+            which takes a fraction of the memory. Files are parsed with the pyarrow engine,
+            or the C engine when a comment character is given in csv_kwargs.
+            The na_values and keep_default_na are applied the same way. Defaults to False.
 
     Raises:
         ValueError: when compare_type is not available
@@ -241,29 +342,83 @@ def get_synapse_file_or_table_as_dataframe(
     default_params = {
         "na_values": na_values,
         "keep_default_na": keep_default_na,
-        "low_memory": False,
-        "engine": "c",
     }
+    if compare_type == "file" and arrow_dtypes:
+        # the pyarrow engine doesn't support low_memory
+        default_params.update(engine="pyarrow", dtype_backend="pyarrow")
+    else:
+        default_params.update(low_memory=False, engine="c")
     # user args override defaults
     csv_params = {**default_params, **csv_kwargs}
+    # the pyarrow engine doesn't support comment, so commented files are parsed
+    # with the C engine, still into pyarrow-backed dtypes
+    if csv_params["engine"] == "pyarrow" and csv_params.get("comment") is not None:
+        csv_params.update(engine="c", low_memory=False)
 
     if compare_type == "table":
         csv_params = {**csv_params, "sep": ","}
-        df = query(f"SELECT * FROM {syn_id}", **csv_params).convert_dtypes()
+        dtype_backend = "pyarrow" if arrow_dtypes else "numpy_nullable"
+        df = None
+        if table_cache_dir is not None:
+            entity = syn.get(syn_id, downloadFile=False)
+            key = table_cache.cache_key(
+                entity.id,
+                entity.versionNumber,
+                entity.etag,
+                {**csv_params, "dtype_backend": dtype_backend},
+            )
+            df = table_cache.load_table(table_cache_dir, key)
+        if df is None:
+            df = query(f"SELECT * FROM {syn_id}", **csv_params).convert_dtypes(
+                dtype_backend=dtype_backend
+            )
+            if table_cache_dir is not None:
+                table_cache.save_table(
+                    table_cache_dir, key, df, max_size_mb=table_cache_size_mb
+                )
     elif compare_type == "file":
         file_path = syn.get(syn_id).path
         df = read_csv_with_auto_sep(file_path, **csv_params)
     else:
         raise ValueError("Compare type not valid. Only 'table' and 'file' supported.")
+    if arrow_dtypes:
+        df = to_arrow_dtypes(df)
     return df
 
 
+def sample_rows(
+    df: pd.DataFrame,
+    sample_size: int,
+    random_state: int = DEFAULT_PROFILE_RANDOM_STATE,
+) -> pd.DataFrame:
+    """Takes a uniform random sample of rows without replacement, keeping
+        the original row order. The whole dataframe is returned if it has
+        no more rows than the sample size.
+
+    Args:
+        df (pd.DataFrame): input dataframe
+        sample_size (int): number of rows to sample
+        random_state (int, optional): seed so samples are repeatable.
+            Defaults to DEFAULT_PROFILE_RANDOM_STATE.
+
+    Returns:
+        pd.DataFrame: the sampled rows
+    """
+    if len(df) <= sample_size:
+        return df
+    return df.sample(n=sample_size, random_state=random_state).sort_index()
+
+
 def generate_comparison_reports(
     df1: pd.DataFrame,
     df2: pd.DataFrame,
     df1_name: str,
     df2_name: str,
     join_keys: list = None,
+    columns: list = None,
+    profile: str = DEFAULT_PROFILE_MODE,
+    profile_sample_size: int = DEFAULT_PROFILE_SAMPLE_SIZE,
+    profile_columns: list = None,
 ) -> Dict[str, Any]:
     """This function will run comparison reports between two datasets
         and flag any differences. This uses datacompy and ydata-profiling.
@@ -279,13 +434,33 @@ def generate_comparison_reports(
         report_output_dir (str): output directory for the report(s)
         report_name_prefix (str): prefix for the name of the report(s)
         join_keys (list): List of the keys you want to merge the data on in the comparison. Defaults to None.
+        columns (list): List of the columns to restrict both reports to on top of the join keys
+            (e.g: the differing columns from the fingerprint check). Defaults to None,
+            which uses all of the columns.
+        profile (str): Profiling tier of the detailed report. One of PROFILE_MODES.
+            Defaults to DEFAULT_PROFILE_MODE.
+        profile_sample_size (int): Number of rows sampled from each dataset when
+            profile is "sampled". Defaults to DEFAULT_PROFILE_SAMPLE_SIZE.
+        profile_columns (list): List of the differing columns profiled on top of the join keys
+            when profile is "differing". Defaults to None, which profiles all of the columns.
+
+    Raises:
+        ValueError: when profile is not available
 
     Returns:
         Dict[str, Any]: dictionary of the two report objects:
             comparison_report: is a datacompy report object
-            comparison_report_detailed: is a ydata-profiling report object
+            comparison_report_detailed: is a ydata-profiling report object.
+                This is None when profile is "off".
     """
+    if profile not in PROFILE_MODES:
+        raise ValueError(f"Profile not valid. Only {PROFILE_MODES} supported.")
+    import datacompy
+
     join_keys = resolve_join_keys(df1, df2, join_keys)
+    if columns is not None:
+        df1 = df1[[col for col in df1.columns if col in join_keys or col in columns]]
+        df2 = df2[[col for col in df2.columns if col in join_keys or col in columns]]
     # use datacompy for quick report
     compare = datacompy.Compare(
         df1,
@@ -297,15 +472,32 @@ def generate_comparison_reports(
     compare.matches(ignore_extra_columns=False)
 
     # use ydataprofiling for thorough report
-    original_report = ProfileReport(
-        df1,
-        title=df1_name,
-    )
-    transformed_report = ProfileReport(
-        df2,
-        title=df2_name,
-    )
-    comparison_report_detailed = original_report.compare(transformed_report)
+    comparison_report_detailed = None
+    if profile != "off":
+        from ydata_profiling import ProfileReport
+
+        profile_df1, profile_df2 = df1, df2
+        if profile == "sampled":
+            profile_df1 = sample_rows(profile_df1, profile_sample_size)
+            profile_df2 = sample_rows(profile_df2, profile_sample_size)
+        elif profile == "differing" and profile_columns:
+            profile_df1 = profile_df1[
+                [col for col in df1.columns if col in join_keys or col in profile_columns]
+            ]
+            profile_df2 = profile_df2[
+                [col for col in df2.columns if col in join_keys or col in profile_columns]
+            ]
+        original_report = ProfileReport(
+            profile_df1,
+            title=df1_name,
+            minimal=profile == "minimal",
+        )
+        transformed_report = ProfileReport(
+            profile_df2,
+            title=df2_name,
+            minimal=profile == "minimal",
+        )
+        comparison_report_detailed = original_report.compare(transformed_report)
     logger.info("Report objects created.")
 
     return {
@@ -314,6 +506,30 @@ def generate_comparison_reports(
     }
 
 
+def get_differing_columns(compare: Any, columns: List[str]) -> List[str]:
+    """Gets the columns that are only in one of the datasets or have
+        unequal values from a datacompy report
+
+    Args:
+        compare (datacompy.Compare): datacompy report object of the comparison
+        columns (List[str]): the columns of both datasets, before datacompy
+            lower cased them
+
+    Returns:
+        List[str]: the differing columns, named as in columns
+    """
+    differing = (
+        {str(column).lower() for column in compare.df1_unq_columns()}
+        | {str(column).lower() for column in compare.df2_unq_columns()}
+        | {
+            column_stats["column"]
+            for column_stats in compare.column_stats
+            if column_stats["unequal_cnt"] > 0
+        }
+    )
+    return [col for col in columns if str(col).lower() in differing]
+
+
 def save_reports(
     syn: synapseclient.Synapse,
     reports: Dict[str, Any],
@@ -321,18 +537,22 @@ def save_reports(
     output_dir: str,
     output_synid: str = None,
     save_to_synapse: bool = False,
-) -> None:
+) -> List[str]:
     """Saves the two reports locally. Also saves to synapse if specified.
 
     Args:
         syn (synapseclient.Synapse): synapse client connection
         reports (Dict[str, Any]): dictionary of the two report objects:
             comparison_report: is a datacompy report object
-            comparison_report_detailed: is a ydata-profiling report object
+            comparison_report_detailed: is a ydata-profiling report object or None if
+                profiling was turned off
         report_name_prefix (str): prefix for the name of the report(s)
         output_dir (str): local output directory for the report(s)
         output_synid (str): Synapse id of the output entity to save reports to. Defaults to None.
         save_to_synapse (bool, optional): Whether to save reports to Synapse or not. Defaults to False.
+
+    Returns:
+        List[str]: local paths of the saved reports
     """
     if save_to_synapse and not output_synid:
         raise Exception("Missing output_synid when save_to_synapse is True")
@@ -348,18 +568,68 @@ def save_reports(
         comparison_report.write(reports["comparison_report"].report())
     logger.info(f"Comparison report generated to {compare_report_dir}")
 
-    # save ydataprofiling report
-    compare_report_det_dir = os.path.join(
-        output_dir, f"{report_name_prefix}_comparison_report_detailed.html"
-    )
-    reports["comparison_report_detailed"].to_file(compare_report_det_dir)
-    logger.info(f"Detailed comparison report generated to {compare_report_det_dir}")
+    # save ydataprofiling report if it was generated
+    report_dirs = [compare_report_dir]
+    if reports["comparison_report_detailed"] is not None:
+        compare_report_det_dir = os.path.join(
+            output_dir, f"{report_name_prefix}_comparison_report_detailed.html"
+        )
+        reports["comparison_report_detailed"].to_file(compare_report_det_dir)
+        report_dirs.append(compare_report_det_dir)
+        logger.info(
+            f"Detailed comparison report generated to {compare_report_det_dir}"
+        )
 
     # saves to synapse if specified
     if save_to_synapse:
-        syn.store(synapseclient.File(compare_report_dir, parent=output_synid))
-        syn.store(synapseclient.File(compare_report_det_dir, parent=output_synid))
+        for report_dir in report_dirs:
+            syn.store(synapseclient.File(report_dir, parent=output_synid))
         logger.info(f"Reports are saved to Synapse under entity {output_synid}.")
+    return report_dirs
+
+
+def save_large_file_report(
+    syn: synapseclient.Synapse,
+    summary: Dict[str, Any],
+    df1_name: str,
+    df2_name: str,
+    report_name_prefix: str,
+    output_dir: str,
+    output_synid: str = None,
+    save_to_synapse: bool = False,
+) -> List[str]:
+    """Saves the report of a large file comparison locally.
+        Also saves to synapse if specified.
+
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        summary (Dict[str, Any]): summary from `partitioned_compare.compare_large_files`
+        df1_name (str): name for the 1st dataset in the comparison
+        df2_name (str): name for the 2nd dataset in the comparison
+        report_name_prefix (str): prefix for the name of the report
+        output_dir (str): local output directory for the report
+        output_synid (str): Synapse id of the output entity to save the report to. Defaults to None.
+        save_to_synapse (bool, optional): Whether to save the report to Synapse or not. Defaults to False.
+
+    Returns:
+        List[str]: local path of the saved report
+    """
+    if save_to_synapse and not output_synid:
+        raise Exception("Missing output_synid when save_to_synapse is True")
+
+    compare_report_dir = os.path.join(
+        output_dir, f"{report_name_prefix}_comparison_report.txt"
+    )
+    with open(compare_report_dir, "w") as comparison_report:
+        comparison_report.write(
+            partitioned_compare.format_summary(summary, df1_name, df2_name)
+        )
+    logger.info(f"Comparison report generated to {compare_report_dir}")
+
+    if save_to_synapse:
+        syn.store(synapseclient.File(compare_report_dir, parent=output_synid))
+        logger.info(f"Report is saved to Synapse under entity {output_synid}.")
+    return [compare_report_dir]
 
 
 def run_compare(
@@ -377,8 +647,19 @@ def run_compare(
     csv_kwargs: Dict[str, Any] = None,
     output_synid: str = None,
     save_to_synapse: bool = False,
-) -> None:
-    """Runs the main comparison function
+    large_file: bool = False,
+    bucket_size_mb: int = partitioned_compare.DEFAULT_BUCKET_SIZE_MB,
+    max_workers: int = 1,
+    only_differing_columns: bool = False,
+    profile: str = DEFAULT_PROFILE_MODE,
+    profile_sample_size: int = DEFAULT_PROFILE_SAMPLE_SIZE,
+    table_cache_dir: str = None,
+    table_cache_size_mb: int = table_cache.DEFAULT_TABLE_CACHE_SIZE_MB,
+    arrow_dtypes: bool = False,
+    syn: synapseclient.Synapse = None,
+) -> Dict[str, Any]:
+    """Runs the main comparison function. Files with the same bytes and entities
+        with equal dataframes are reported as identical before any reports are generated.
 
     Args:
         syn_id_1 (str): Synapse id of first entity to compare
@@ -409,11 +690,44 @@ def run_compare(
             See that function's documentation for details.
         output_synid (str): Synapse id of the output entity to save reports to. Defaults to None.
         save_to_synapse (bool, optional): Whether to save reports to Synapse or not. Defaults to False.
+        large_file (bool, optional): Whether to compare the files bucket by bucket on disk
+            instead of in memory. Only the summary report is generated. Only available for
+            the file compare type. Defaults to False.
+        bucket_size_mb (int, optional): Approximate size of each bucket when large_file is True.
+            Defaults to partitioned_compare.DEFAULT_BUCKET_SIZE_MB.
+        max_workers (int, optional): Number of processes comparing buckets at the same time
+            when large_file is True. Defaults to 1.
+        only_differing_columns (bool, optional): Whether to restrict the reports to the join keys
+            and the columns that differ according to the fingerprint check. Defaults to False.
+        profile (str, optional): Profiling tier of the detailed report. One of PROFILE_MODES.
+            "differing" profiles the join keys and the columns that differ according to
+            the fingerprint check. Defaults to DEFAULT_PROFILE_MODE.
+        profile_sample_size (int, optional): Number of rows sampled from each entity when
+            profile is "sampled". Defaults to DEFAULT_PROFILE_SAMPLE_SIZE.
+        table_cache_dir (str, optional): Directory of the on-disk cache of table query results
+            for the table compare type. Defaults to None, which doesn't cache tables.
+        table_cache_size_mb (int, optional): Maximum total size of the table cache.
+            Defaults to table_cache.DEFAULT_TABLE_CACHE_SIZE_MB.
+        arrow_dtypes (bool, optional): Whether to read the entities with pyarrow-backed dtypes
+            and categorical ARROW_CATEGORICAL_COLUMNS to cut their memory use. Defaults to False.
+        syn (synapseclient.Synapse, optional): synapse client connection.
+            Defaults to None, which uses the client from `get_syn()`.
+
+    Returns:
+        Dict[str, Any]: result of the comparison:
+            status: "identical" or "different"
+            differing_columns: columns that are only in one of the entities or have different values
+            reports: local paths of the saved reports
     """
+    if large_file and compare_type != "file":
+        raise ValueError("Large file comparison is only supported for compare type 'file'.")
 
     if not os.path.exists(main_download_directory):
         os.makedirs(main_download_directory)
 
+    if syn is None:
+        syn = get_syn()
+
     # update version args if filtering on version comment
     if filter_on_version and not is_synapse_id_version_format(syn_id_1):
         version1 = get_version_to_compare(
@@ -430,6 +744,46 @@ def run_compare(
         syn_id_1 = resolve_synapse_id_with_version(syn_id_1, version1)
         syn_id_2 = resolve_synapse_id_with_version(syn_id_2, version2)
 
+    # quick check, files with the same bytes are identical without being parsed
+    if compare_type == "file" and filecmp.cmp(
+        syn.get(syn_id_1).path, syn.get(syn_id_2).path, shallow=False
+    ):
+        logger.info("No differences found!")
+        return {"status": "identical", "differing_columns": [], "reports": []}
+
+    if large_file:
+        summary = partitioned_compare.compare_large_files(
+            syn.get(syn_id_1).path,
+            syn.get(syn_id_2).path,
+            join_keys=join_keys,
+            sep=(csv_kwargs or {}).get("sep"),
+            na_values=na_values,
+            bucket_size_mb=bucket_size_mb,
+            max_workers=max_workers,
+            comment=(csv_kwargs or {}).get("comment"),
+            skiprows=(csv_kwargs or {}).get("skiprows"),
+        )
+        if not partitioned_compare.has_differences(summary):
+            logger.info("No differences found!")
+            return {"status": "identical", "differing_columns": [], "reports": []}
+        report_paths = save_large_file_report(
+            syn=syn,
+            summary=summary,
+            df1_name=f"df1_{version1}",
+            df2_name=f"df2_{version2}",
+            report_name_prefix=f"{entity_name}_{version1}_vs_{version2}",
+            output_dir=main_download_directory,
+            output_synid=output_synid,
+            save_to_synapse=save_to_synapse,
+        )
+        return {
+            "status": "different",
+            "differing_columns": summary["df1_unq_columns"]
+            + summary["df2_unq_columns"]
+            + list(summary["column_mismatches"]),
+            "reports": report_paths,
+        }
+
     df1 = get_synapse_file_or_table_as_dataframe(
         syn,
         compare_type=compare_type,
@@ -437,6 +791,9 @@ def run_compare(
         na_values=na_values,
         keep_default_na=keep_default_na,
         csv_kwargs=csv_kwargs,
+        table_cache_dir=table_cache_dir,
+        table_cache_size_mb=table_cache_size_mb,
+        arrow_dtypes=arrow_dtypes,
     )
     df2 = get_synapse_file_or_table_as_dataframe(
         syn,
@@ -445,27 +802,67 @@ def run_compare(
         na_values=na_values,
         keep_default_na=keep_default_na,
         csv_kwargs=csv_kwargs,
+        table_cache_dir=table_cache_dir,
+        table_cache_size_mb=table_cache_size_mb,
+        arrow_dtypes=arrow_dtypes,
     )
-    # quick check
+    if arrow_dtypes:
+        df1, df2 = align_categories(df1, df2)
+    # quick check, stops at the first difference
     try:
         assert_frame_equal(df1, df2)
         logger.info("No differences found!")
+        return {"status": "identical", "differing_columns": [], "reports": []}
     except AssertionError:
-        reports = generate_comparison_reports(
-            df1=df1,
-            df2=df2,
-            df1_name=f"df1_{version1}",
-            df2_name=f"df2_{version2}",
-            join_keys=join_keys,
-        )
-        save_reports(
-            syn=syn,
-            reports=reports,
-            report_name_prefix=f"{entity_name}_{version1}_vs_{version2}",
-            output_dir=main_download_directory,
-            output_synid=output_synid,
-            save_to_synapse=save_to_synapse,
+        pass
+
+    # the fingerprints are only made when the reports are restricted to the
+    # differing columns, otherwise the columns come from the datacompy report
+    differing_columns = None
+    if only_differing_columns or profile == "differing":
+        fingerprint_diff = fingerprint.compare_fingerprints(
+            fingerprint.fingerprint_dataframe(df1, join_keys=join_keys),
+            fingerprint.fingerprint_dataframe(df2, join_keys=join_keys),
         )
+        if fingerprint_diff["identical"]:
+            # the rows are the same, only in a different order
+            logger.info("No differences found!")
+            return {"status": "identical", "differing_columns": [], "reports": []}
+        differing_columns = fingerprint_diff["differing_columns"]
+        logger.info(f"Columns with differences: {differing_columns}")
+    report_columns = (
+        differing_columns if only_differing_columns and differing_columns else None
+    )
+
+    # datacompy lower cases the column names of the dataframes in place
+    columns = list(df1.columns) + [col for col in df2.columns if col not in df1.columns]
+    reports = generate_comparison_reports(
+        df1=df1,
+        df2=df2,
+        df1_name=f"df1_{version1}",
+        df2_name=f"df2_{version2}",
+        join_keys=join_keys,
+        columns=report_columns,
+        profile=profile,
+        profile_sample_size=profile_sample_size,
+        profile_columns=differing_columns,
+    )
+    if differing_columns is None:
+        differing_columns = get_differing_columns(reports["comparison_report"], columns)
+        logger.info(f"Columns with differences: {differing_columns}")
+    report_paths = save_reports(
+        syn=syn,
+        reports=reports,
+        report_name_prefix=f"{entity_name}_{version1}_vs_{version2}",
+        output_dir=main_download_directory,
+        output_synid=output_synid,
+        save_to_synapse=save_to_synapse,
+    )
+    return {
+        "status": "different",
+        "differing_columns": differing_columns,
+        "reports": report_paths,
+    }
 
 
 def read_args():
@@ -561,6 +958,81 @@ def read_args():
         default=None,
         help=("Synapse id of the output entity to store the reports to. Optional."),
     )
+    parser.add_argument(
+        "--large-file",
+        default=False,
+        action="store_true",
+        help=(
+            "Compare the files bucket by bucket on disk instead of in memory. "
+            "Only generates the summary report. Only for compare type file. Optional."
+        ),
+    )
+    parser.add_argument(
+        "--bucket-size-mb",
+        default=partitioned_compare.DEFAULT_BUCKET_SIZE_MB,
+        type=int,
+        help=("Approximate size of each on-disk bucket used with --large-file. Optional."),
+    )
+    parser.add_argument(
+        "--max-workers",
+        default=1,
+        type=int,
+        help=("Number of processes comparing buckets at the same time with --large-file. Optional."),
+    )
+    parser.add_argument(
+        "--only-differing-columns",
+        default=False,
+        action="store_true",
+        help=(
+            "Restrict the reports to the join keys and the columns found to differ "
+            "in the fingerprint check. Optional."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        default=DEFAULT_PROFILE_MODE,
+        choices=PROFILE_MODES,
+        help=(
+            "Profiling tier of the detailed report: full, minimal (ydata-profiling minimal mode), "
+            "sampled (a random sample of --profile-sample-size rows), differing (only the "
+            "columns with differences) or off (no detailed report). Default: full"
+        ),
+    )
+    parser.add_argument(
+        "--profile-sample-size",
+        default=DEFAULT_PROFILE_SAMPLE_SIZE,
+        type=int,
+        help=(
+            "Number of rows sampled from each entity with --profile sampled. "
+            "Default: DEFAULT_PROFILE_SAMPLE_SIZE"
+        ),
+    )
+    parser.add_argument(
+        "--table-cache-dir",
+        default=None,
+        help=(
+            "Local directory to cache table query results in, so unchanged tables "
+            "aren't queried again in later comparisons. Optional. Default: no cache"
+        ),
+    )
+    parser.add_argument(
+        "--table-cache-size-mb",
+        default=table_cache.DEFAULT_TABLE_CACHE_SIZE_MB,
+        type=int,
+        help=(
+            "Maximum total size of the table cache before the least recently used "
+            "tables are evicted. Default: DEFAULT_TABLE_CACHE_SIZE_MB"
+        ),
+    )
+    parser.add_argument(
+        "--arrow-dtypes",
+        default=False,
+        action="store_true",
+        help=(
+            "Read the entities with pyarrow-backed dtypes and store repeated values "
+            "(e.g: Hugo_Symbol, CENTER) as categoricals to cut memory use. Optional."
+        ),
+    )
     args = parser.parse_args()
     return args
 
@@ -581,6 +1053,15 @@ def main():
         keep_default_na=args.keep_default_na,
         output_synid=args.output_synid,
         save_to_synapse=args.save_to_synapse,
+        large_file=args.large_file,
+        bucket_size_mb=args.bucket_size_mb,
+        max_workers=args.max_workers,
+        only_differing_columns=args.only_differing_columns,
+        profile=args.profile,
+        profile_sample_size=args.profile_sample_size,
+        table_cache_dir=args.table_cache_dir,
+        table_cache_size_mb=args.table_cache_size_mb,
+        arrow_dtypes=args.arrow_dtypes,
     )
 
 
@@ -0,0 +1,113 @@
+"""Fingerprints of the compared files and tables, used to find the differing
+columns before a full comparison.
+
+A fingerprint holds the row count, an order-independent hash sum of the rows
+and an order-independent hash sum per column. Each column value is hashed
+together with the join keys of its row, so a value moving to a different
+row still changes its column's hash. Two datasets with the same fingerprint
+are identical regardless of row and column order. When the fingerprints
+differ, the columns whose hashes differ are exactly the columns that
+need to be looked at in the full comparison.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# hash sums wrap around at 64 bits to match pandas' uint64 hashes
+HASH_MASK = (1 << 64) - 1
+
+# odd 64-bit constant that mixes the running row hash with the next column's hash
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def fingerprint_dataframe(
+    df: pd.DataFrame, join_keys: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Fingerprints a dataframe (e.g: a queried Synapse table)
+
+    Args:
+        df (pd.DataFrame): input dataframe
+        join_keys (List[str], optional): the keys hashed with each column value.
+            Keys that are not in the dataframe are ignored. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: the fingerprint:
+            row_count, row_hash and column_hashes, which maps each column to its hash
+    """
+    keys = [key for key in join_keys or [] if key in df.columns]
+    # every column is hashed once, and the hashes are combined row by row
+    value_hashes = {
+        column: pd.util.hash_pandas_object(df[column], index=False).to_numpy()
+        for column in df.columns.unique()
+    }
+    key_hash = _combine_hashes([value_hashes[key] for key in keys], len(df))
+
+    def _hash_sum(row_hashes: np.ndarray) -> int:
+        return int(row_hashes.sum(dtype=np.uint64))
+
+    return {
+        "row_count": len(df),
+        "row_hash": _hash_sum(
+            _combine_hashes(
+                [value_hashes[column] for column in sorted(value_hashes)], len(df)
+            )
+        ),
+        "column_hashes": {
+            column: _hash_sum(
+                key_hash
+                if column in keys
+                else _combine_hashes([key_hash, value_hashes[column]], len(df))
+            )
+            for column in value_hashes
+        },
+    }
+
+
+def _combine_hashes(hashes: List[np.ndarray], row_count: int) -> np.ndarray:
+    """Combines the per row hashes of several columns into one hash per row.
+    The order of the columns matters, and each step is rehashed so values
+    can't cancel out between rows when the row hashes are summed.
+
+    Args:
+        hashes (List[np.ndarray]): uint64 hashes of each column
+        row_count (int): number of rows
+
+    Returns:
+        np.ndarray: uint64 hash of each row
+    """
+    combined = np.zeros(row_count, dtype=np.uint64)
+    for column_hashes in hashes:
+        # uint64 arithmetic wraps around, like the hash sums
+        combined = pd.util.hash_array(combined * HASH_MULTIPLIER + column_hashes)
+    return combined
+
+
+def compare_fingerprints(
+    fingerprint1: Dict[str, Any], fingerprint2: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Compares two fingerprints
+
+    Args:
+        fingerprint1 (Dict[str, Any]): fingerprint of the 1st dataset
+        fingerprint2 (Dict[str, Any]): fingerprint of the 2nd dataset
+
+    Returns:
+        Dict[str, Any]: identical, which is whether the datasets are the same,
+            and differing_columns, the columns that are only in one
+            of the datasets or have different values
+    """
+    column_hashes1 = fingerprint1["column_hashes"]
+    column_hashes2 = fingerprint2["column_hashes"]
+    differing_columns = [
+        column
+        for column in column_hashes1
+        if column_hashes1[column] != column_hashes2.get(column)
+    ] + [column for column in column_hashes2 if column not in column_hashes1]
+    identical = (
+        not differing_columns
+        and fingerprint1["row_count"] == fingerprint2["row_count"]
+        and fingerprint1["row_hash"] == fingerprint2["row_hash"]
+    )
+    return {"identical": identical, "differing_columns": differing_columns}
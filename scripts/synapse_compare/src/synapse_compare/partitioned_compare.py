@@ -0,0 +1,634 @@
+"""Comparison engine for delimited files too large to compare in memory.
+
+Both files are hash partitioned on the join keys into on-disk buckets, so
+every row sharing a join key lands in the same bucket number in both files.
+The buckets are then compared pair by pair (optionally across a process
+pool), and the per-bucket counts are merged into the same summary counts that
+the datacompy report gives: rows only in df1/df2, columns only in df1/df2,
+columns with unequal values and the number of mismatches per column.
+
+scripts/patch_release/compare_patch.py has its own copy of the partitioning
+for diffing release files row by row, as the patch_release image doesn't
+install this package. Keep the bucketing of the two in step.
+"""
+
+import bz2
+import csv
+import gzip
+import io
+import logging
+import os
+import sys
+import tempfile
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+logger = logging.getLogger("compare_report_logger")
+
+# Approximate size of each on-disk bucket. Only one pair of buckets
+# is held in memory per worker at a time.
+DEFAULT_BUCKET_SIZE_MB = 64
+
+# buckets are written with this delimiter regardless of the input delimiter
+BUCKET_SEP = "\t"
+
+# value that stands for a missing value within a bucket. It has to be
+# printable, as csv.writer can't write NUL characters before Python 3.11
+NA_SENTINEL = "<partitioned_compare:NA>"
+
+# make sure large text fields (e.g. long alleles) can be parsed
+csv.field_size_limit(sys.maxsize)
+
+# Number of characters read from the start of a file to detect its delimiter
+DEFAULT_SNIFF_SIZE = 64 * 1024
+
+# magic numbers of the compressed formats that can be read
+COMPRESSION_MAGIC = {"gzip": b"\x1f\x8b", "bz2": b"BZh"}
+
+
+def detect_compression(filepath: str) -> Optional[str]:
+    """Detects whether a file is gzip or bz2 compressed from its first bytes,
+    so compressed files are read correctly whatever their extension
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        Optional[str]: "gzip", "bz2" or None if the file isn't compressed
+    """
+    with open(filepath, "rb") as in_file:
+        magic = in_file.read(3)
+    for compression, compression_magic in COMPRESSION_MAGIC.items():
+        if magic.startswith(compression_magic):
+            return compression
+    return None
+
+
+def open_text(filepath: str) -> IO[str]:
+    """Opens a plain, gzip or bz2 compressed delimited file for reading as text
+
+    Args:
+        filepath (str): path to the file
+
+    Returns:
+        IO[str]: the opened file
+    """
+    compression = detect_compression(filepath)
+    if compression == "gzip":
+        return gzip.open(filepath, "rt", newline="")
+    if compression == "bz2":
+        return bz2.open(filepath, "rt", newline="")
+    return open(filepath, "r", newline="")
+
+
+def _is_skipped_row(
+    line_number: int, skiprows: Optional[Union[int, Set[int], Callable[[int], bool]]]
+) -> bool:
+    """Whether pandas.read_csv skips a line of a file with the skiprows argument"""
+    if skiprows is None:
+        return False
+    if callable(skiprows):
+        return bool(skiprows(line_number))
+    if isinstance(skiprows, int):
+        return line_number < skiprows
+    return line_number in skiprows
+
+
+def skip_lines(
+    lines: Iterable[str],
+    comment: Optional[str] = None,
+    skiprows: Optional[Union[int, List[int], Callable[[int], bool]]] = None,
+) -> Iterator[str]:
+    """Drops the lines that pandas.read_csv skips with the same comment and
+    skiprows arguments, so files can be streamed through csv.reader the same
+    way pandas parses them
+
+    Args:
+        lines (Iterable[str]): the lines of the file, e.g: the opened file
+        comment (str, optional): character starting comments. Defaults to None.
+        skiprows (Union[int, List[int], Callable[[int], bool]], optional): number
+            of lines skipped at the start of the file, line numbers to skip or a
+            function of the line number that is True for lines to skip.
+            Defaults to None.
+
+    Yields:
+        Iterator[str]: the lines that pandas parses
+    """
+    if skiprows is not None and not callable(skiprows) and not isinstance(skiprows, int):
+        skiprows = set(skiprows)
+    for line_number, line in enumerate(lines):
+        if _is_skipped_row(line_number, skiprows):
+            continue
+        if comment and comment in line:
+            # pandas ignores the rest of the line and skips lines
+            # that are empty once the comment is removed
+            line = line[: line.index(comment)]
+            if not line.strip():
+                continue
+            line += "\n"
+        yield line
+
+
+def detect_sep(
+    filepath: str,
+    sniff_size: int = DEFAULT_SNIFF_SIZE,
+    comment: Optional[str] = None,
+    skiprows: Optional[Union[int, List[int], Callable[[int], bool]]] = None,
+) -> str:
+    """Detects whether a file is comma or tab separated from the rows in a
+    bounded prefix of the file, matching the comma then tab order of
+    `read_csv_with_auto_sep`. A delimiter is picked when it gives more than one
+    column in the header and no row in the prefix has more fields than the
+    header, which is when pandas can parse the rows with it. Quoted fields are
+    respected, so delimiters inside quotes aren't counted. Lines that pandas
+    skips with the same comment and skiprows arguments (e.g: the #version
+    header of MAF files) are skipped before the delimiter is detected.
+
+    Args:
+        filepath (str): path to the file
+        sniff_size (int, optional): number of characters read from the start of the file.
+            Defaults to DEFAULT_SNIFF_SIZE.
+        comment (str, optional): the comment argument the file is read with.
+            Defaults to None.
+        skiprows (Union[int, List[int], Callable[[int], bool]], optional): the
+            skiprows argument the file is read with. Defaults to None.
+
+    Raises:
+        ValueError: when neither delimiter gives more than one column
+
+    Returns:
+        str: the delimiter of the file
+    """
+    with open_text(filepath) as in_file:
+        sample = in_file.read(sniff_size)
+    # the last line is likely cut off unless the whole file was read
+    if len(sample) == sniff_size and "\n" in sample:
+        sample = sample[: sample.rindex("\n") + 1]
+    sample = "".join(
+        skip_lines(sample.splitlines(keepends=True), comment=comment, skiprows=skiprows)
+    )
+    for sep in [",", "\t"]:
+        rows = []
+        reader = csv.reader(io.StringIO(sample), delimiter=sep)
+        try:
+            for row in reader:
+                rows.append(row)
+        except csv.Error:
+            # the prefix can end inside a quoted field, so
+            # only the rows read before it are checked
+            pass
+        rows = [row for row in rows if row]
+        if rows and len(rows[0]) > 1 and all(len(row) <= len(rows[0]) for row in rows):
+            return sep
+    raise ValueError(
+        "Unable to determine delimiter automatically. "
+        "File does not appear to be comma- or tab-separated."
+    )
+
+
+def _read_rows(
+    in_file: IO[str],
+    sep: str,
+    comment: Optional[str] = None,
+    skiprows: Optional[Union[int, List[int], Callable[[int], bool]]] = None,
+) -> Iterator[List[str]]:
+    """Reads the rows of an opened delimited file, skipping the lines
+    pandas.read_csv skips with the same comment and skiprows arguments
+
+    Args:
+        in_file (IO[str]): the opened file
+        sep (str): delimiter of the file
+        comment (str, optional): character starting comments. Defaults to None.
+        skiprows (Union[int, List[int], Callable[[int], bool]], optional): the
+            skiprows argument of pandas.read_csv. Defaults to None.
+
+    Returns:
+        Iterator[List[str]]: the rows of the file, starting with the header
+    """
+    return csv.reader(
+        skip_lines(in_file, comment=comment, skiprows=skiprows), delimiter=sep
+    )
+
+
+def _read_header(
+    filepath: str,
+    sep: str,
+    comment: Optional[str] = None,
+    skiprows: Optional[Union[int, List[int], Callable[[int], bool]]] = None,
+) -> List[str]:
+    """Reads the header of a delimited file
+
+    Args:
+        filepath (str): path to the file
+        sep (str): delimiter of the file
+        comment (str, optional): character starting comments. Defaults to None.
+        skiprows (Union[int, List[int], Callable[[int], bool]], optional): the
+            skiprows argument of pandas.read_csv. Defaults to None.
+
+    Returns:
+        List[str]: the column names
+    """
+    with open_text(filepath) as in_file:
+        return next(_read_rows(in_file, sep, comment=comment, skiprows=skiprows), [])
+
+
+def _resolve_columns(
+    header1: List[str],
+    header2: List[str],
+    join_keys: Optional[List[str]],
+    cast_column_names_lower: bool,
+) -> Dict[str, Any]:
+    """Works out which columns are compared and which are only in one of the files
+
+    Args:
+        header1 (List[str]): header of the 1st file
+        header2 (List[str]): header of the 2nd file
+        join_keys (Optional[List[str]]): the keys to join on. Uses all the
+            columns in common if None.
+        cast_column_names_lower (bool): whether column names are compared case-insensitively
+
+    Raises:
+        ValueError: when a join key is missing from either file
+
+    Returns:
+        Dict[str, Any]: the join keys, compared columns and the columns
+            only in either file
+    """
+    if cast_column_names_lower:
+        header1 = [column.lower() for column in header1]
+        header2 = [column.lower() for column in header2]
+        join_keys = [key.lower() for key in join_keys] if join_keys else join_keys
+    common = [column for column in header1 if column in set(header2)]
+    if join_keys is None:
+        join_keys = common
+    missing = [key for key in join_keys if key not in common]
+    if missing:
+        raise ValueError(f"Join keys {missing} are not in both files")
+    return {
+        "join_keys": list(join_keys),
+        "compare_columns": [column for column in common if column not in join_keys],
+        "df1_unq_columns": [column for column in header1 if column not in common],
+        "df2_unq_columns": [column for column in header2 if column not in common],
+    }
+
+
+def _partition_file(
+    filepath: str,
+    sep: str,
+    columns: List[str],
+    key_count: int,
+    na_values: Set[str],
+    cast_column_names_lower: bool,
+    bucket_paths: List[str],
+    comment: Optional[str] = None,
+    skiprows: Optional[Union[int, List[int], Callable[[int], bool]]] = None,
+) -> int:
+    """Writes the given columns of every row of a file into the bucket
+    picked by the hash of its join keys
+
+    Args:
+        filepath (str): path to the file
+        sep (str): delimiter of the file
+        columns (List[str]): columns to write, with the join keys first
+        key_count (int): the number of join keys at the start of columns
+        na_values (Set[str]): values read in as missing
+        cast_column_names_lower (bool): whether the header is lower cased to find the columns
+        bucket_paths (List[str]): paths of the bucket files
+        comment (str, optional): character starting comments. Defaults to None.
+        skiprows (Union[int, List[int], Callable[[int], bool]], optional): the
+            skiprows argument of pandas.read_csv. Defaults to None.
+
+    Returns:
+        int: the number of rows in the file
+    """
+    row_count = 0
+    with open_text(filepath) as in_file, ExitStack() as stack:
+        rows = _read_rows(in_file, sep, comment=comment, skiprows=skiprows)
+        header = next(rows, [])
+        if cast_column_names_lower:
+            header = [column.lower() for column in header]
+        column_idx = [header.index(column) for column in columns]
+        writers = [
+            csv.writer(
+                stack.enter_context(open(bucket_path, "w", newline="")),
+                delimiter=BUCKET_SEP,
+                lineterminator="\n",
+            )
+            for bucket_path in bucket_paths
+        ]
+        for row in rows:
+            row += [""] * (len(header) - len(row))
+            values = [
+                NA_SENTINEL if row[idx] in na_values else row[idx]
+                for idx in column_idx
+            ]
+            key = BUCKET_SEP.join(values[:key_count])
+            bucket = zlib.crc32(key.encode("utf-8")) % len(writers)
+            writers[bucket].writerow(values)
+            row_count += 1
+    return row_count
+
+
+def _read_bucket(bucket_path: str, key_count: int) -> Dict[Tuple[str, ...], List[List[str]]]:
+    """Reads a bucket into the rows of each join key, in file order
+
+    Args:
+        bucket_path (str): path of the bucket
+        key_count (int): the number of join keys at the start of each row
+
+    Returns:
+        Dict[Tuple[str, ...], List[List[str]]]: the rows of each join key
+    """
+    rows = {}
+    with open(bucket_path, "r", newline="") as bucket_file:
+        for row in csv.reader(bucket_file, delimiter=BUCKET_SEP):
+            rows.setdefault(tuple(row[:key_count]), []).append(row[key_count:])
+    return rows
+
+
+def values_match(value1: str, value2: str) -> bool:
+    """Checks if two values are the same. Missing values match each other
+    and numbers match if they are numerically equal (e.g: 1 and 1.0),
+    as in datacompy.
+
+    Args:
+        value1 (str): 1st value
+        value2 (str): 2nd value
+
+    Returns:
+        bool: whether the values match
+    """
+    if value1 == value2:
+        return True
+    if NA_SENTINEL in (value1, value2):
+        return False
+    try:
+        return float(value1) == float(value2)
+    except ValueError:
+        return False
+
+
+def compare_bucket(
+    bucket_path1: str, bucket_path2: str, key_count: int, compare_count: int
+) -> Dict[str, Any]:
+    """Compares the rows of one pair of buckets. Rows with the same join keys
+    are paired up in the order they appear in, like datacompy does for
+    duplicate join keys.
+
+    Args:
+        bucket_path1 (str): path of the bucket from the 1st file
+        bucket_path2 (str): path of the bucket from the 2nd file
+        key_count (int): the number of join keys at the start of each row
+        compare_count (int): the number of compared columns after the join keys
+
+    Returns:
+        Dict[str, Any]: the counts of the rows only in either file, rows in
+            common, rows with unequal values and the mismatches per compared column
+    """
+    rows1 = _read_bucket(bucket_path1, key_count)
+    rows2 = _read_bucket(bucket_path2, key_count)
+    counts = {
+        "df1_unq_rows": 0,
+        "df2_unq_rows": 0,
+        "intersect_rows": 0,
+        "rows_with_unequal_values": 0,
+        "column_mismatches": [0] * compare_count,
+    }
+    for key in rows1.keys() | rows2.keys():
+        key_rows1 = rows1.get(key, [])
+        key_rows2 = rows2.get(key, [])
+        counts["df1_unq_rows"] += max(0, len(key_rows1) - len(key_rows2))
+        counts["df2_unq_rows"] += max(0, len(key_rows2) - len(key_rows1))
+        for row1, row2 in zip(key_rows1, key_rows2):
+            counts["intersect_rows"] += 1
+            row_unequal = False
+            for idx, (value1, value2) in enumerate(zip(row1, row2)):
+                if not values_match(value1, value2):
+                    counts["column_mismatches"][idx] += 1
+                    row_unequal = True
+            counts["rows_with_unequal_values"] += row_unequal
+    return counts
+
+
+def compare_large_files(
+    filepath1: str,
+    filepath2: str,
+    join_keys: Optional[List[str]] = None,
+    sep: Optional[str] = None,
+    na_values: Optional[List[str]] = None,
+    cast_column_names_lower: bool = True,
+    bucket_size_mb: int = DEFAULT_BUCKET_SIZE_MB,
+    max_workers: int = 1,
+    comment: Optional[str] = None,
+    skiprows: Optional[Union[int, List[int], Callable[[int], bool]]] = None,
+) -> Dict[str, Any]:
+    """Compares two delimited files by hash partitioning both on the join keys
+    into on-disk buckets and comparing them bucket by bucket, so memory use is
+    bounded by the bucket size rather than the file size.
+
+    Values are compared as text with missing values and numbers normalized,
+    so the counts line up with the datacompy report without parsing
+    the files into dataframes.
+
+    Args:
+        filepath1 (str): path to the 1st file
+        filepath2 (str): path to the 2nd file
+        join_keys (List[str], optional): List of the keys you want to merge the data on
+            in the comparison. Defaults to None, which uses all of the columns in common.
+        sep (str, optional): delimiter of both files. Detected from the header
+            of each file if None. Defaults to None.
+        na_values (List[str], optional): values read in as missing. Defaults to None.
+        cast_column_names_lower (bool, optional): whether to compare column names
+            case-insensitively like datacompy. Defaults to True.
+        bucket_size_mb (int, optional): approximate size of each bucket.
+            Defaults to DEFAULT_BUCKET_SIZE_MB.
+        max_workers (int, optional): number of processes comparing buckets at the
+            same time. Buckets are compared in this process if 1. Defaults to 1.
+        comment (str, optional): the comment argument of pandas.read_csv. Lines
+            pandas skips with it (e.g: the #version header of MAF files) are
+            skipped in both files. Defaults to None.
+        skiprows (Union[int, List[int], Callable[[int], bool]], optional): the
+            skiprows argument of pandas.read_csv. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: summary of the comparison:
+            join_keys, df1_rows, df2_rows, df1_unq_columns, df2_unq_columns,
+            df1_unq_rows, df2_unq_rows, intersect_rows, rows_with_unequal_values
+            and column_mismatches, which maps each column with unequal values
+            to its number of mismatches
+    """
+    na_values = set(na_values or [])
+    sep1 = sep or detect_sep(filepath1, comment=comment, skiprows=skiprows)
+    sep2 = sep or detect_sep(filepath2, comment=comment, skiprows=skiprows)
+    columns = _resolve_columns(
+        _read_header(filepath1, sep1, comment=comment, skiprows=skiprows),
+        _read_header(filepath2, sep2, comment=comment, skiprows=skiprows),
+        join_keys,
+        cast_column_names_lower,
+    )
+    key_count = len(columns["join_keys"])
+    bucket_columns = columns["join_keys"] + columns["compare_columns"]
+
+    file_size = max(os.path.getsize(filepath1), os.path.getsize(filepath2))
+    bucket_count = int(max(1, -(-file_size // (bucket_size_mb * 1024 * 1024))))
+    logger.info(f"Partitioning files into {bucket_count} buckets.")
+
+    with tempfile.TemporaryDirectory() as bucket_dir:
+        bucket_paths1 = [
+            os.path.join(bucket_dir, f"df1_{bucket}.tsv") for bucket in range(bucket_count)
+        ]
+        bucket_paths2 = [
+            os.path.join(bucket_dir, f"df2_{bucket}.tsv") for bucket in range(bucket_count)
+        ]
+        df1_rows = _partition_file(
+            filepath1,
+            sep1,
+            bucket_columns,
+            key_count,
+            na_values,
+            cast_column_names_lower,
+            bucket_paths1,
+            comment=comment,
+            skiprows=skiprows,
+        )
+        df2_rows = _partition_file(
+            filepath2,
+            sep2,
+            bucket_columns,
+            key_count,
+            na_values,
+            cast_column_names_lower,
+            bucket_paths2,
+            comment=comment,
+            skiprows=skiprows,
+        )
+        compare_args = (
+            bucket_paths1,
+            bucket_paths2,
+            [key_count] * bucket_count,
+            [len(columns["compare_columns"])] * bucket_count,
+        )
+        if max_workers > 1 and bucket_count > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                bucket_counts = list(executor.map(compare_bucket, *compare_args))
+        else:
+            bucket_counts = list(map(compare_bucket, *compare_args))
+
+    mismatches = Counter()
+    summary = {
+        "join_keys": columns["join_keys"],
+        "df1_rows": df1_rows,
+        "df2_rows": df2_rows,
+        "df1_unq_columns": columns["df1_unq_columns"],
+        "df2_unq_columns": columns["df2_unq_columns"],
+        "df1_unq_rows": 0,
+        "df2_unq_rows": 0,
+        "intersect_rows": 0,
+        "rows_with_unequal_values": 0,
+    }
+    for counts in bucket_counts:
+        for count_name in [
+            "df1_unq_rows",
+            "df2_unq_rows",
+            "intersect_rows",
+            "rows_with_unequal_values",
+        ]:
+            summary[count_name] += counts[count_name]
+        for column, mismatch_count in zip(
+            columns["compare_columns"], counts["column_mismatches"]
+        ):
+            mismatches[column] += mismatch_count
+    summary["column_mismatches"] = {
+        column: mismatches[column]
+        for column in columns["compare_columns"]
+        if mismatches[column] > 0
+    }
+    return summary
+
+
+def has_differences(summary: Dict[str, Any]) -> bool:
+    """Checks if the summary from `compare_large_files` has any differences
+
+    Args:
+        summary (Dict[str, Any]): summary of the comparison
+
+    Returns:
+        bool: whether the two files differ
+    """
+    return bool(
+        summary["df1_unq_columns"]
+        or summary["df2_unq_columns"]
+        or summary["df1_unq_rows"]
+        or summary["df2_unq_rows"]
+        or summary["column_mismatches"]
+    )
+
+
+def format_summary(summary: Dict[str, Any], df1_name: str, df2_name: str) -> str:
+    """Formats the summary from `compare_large_files` as a text report
+    laid out like the datacompy report
+
+    Args:
+        summary (Dict[str, Any]): summary of the comparison
+        df1_name (str): name for the 1st dataset in the comparison
+        df2_name (str): name for the 2nd dataset in the comparison
+
+    Returns:
+        str: the text report
+    """
+    lines = [
+        "Partitioned Comparison",
+        "----------------------",
+        "",
+        f"Join columns: {', '.join(summary['join_keys'])}",
+        f"Number of rows in {df1_name}: {summary['df1_rows']}",
+        f"Number of rows in {df2_name}: {summary['df2_rows']}",
+        "",
+        "Column Summary",
+        "--------------",
+        "",
+        f"Number of columns in {df1_name} but not in {df2_name}: "
+        f"{len(summary['df1_unq_columns'])} {summary['df1_unq_columns']}",
+        f"Number of columns in {df2_name} but not in {df1_name}: "
+        f"{len(summary['df2_unq_columns'])} {summary['df2_unq_columns']}",
+        "",
+        "Row Summary",
+        "-----------",
+        "",
+        f"Number of rows in common: {summary['intersect_rows']}",
+        f"Number of rows in {df1_name} but not in {df2_name}: {summary['df1_unq_rows']}",
+        f"Number of rows in {df2_name} but not in {df1_name}: {summary['df2_unq_rows']}",
+        "",
+        f"Number of rows with some compared columns unequal: "
+        f"{summary['rows_with_unequal_values']}",
+        f"Number of rows with all compared columns equal: "
+        f"{summary['intersect_rows'] - summary['rows_with_unequal_values']}",
+        "",
+        "Column Comparison",
+        "-----------------",
+        "",
+        f"Number of columns compared with some values unequal: "
+        f"{len(summary['column_mismatches'])}",
+    ]
+    if summary["column_mismatches"]:
+        lines += ["", "Columns with Unequal Values", "---------------------------", ""]
+        lines += [
+            f"{column}: {mismatch_count} unequal values"
+            for column, mismatch_count in summary["column_mismatches"].items()
+        ]
+    return "\n".join(lines) + "\n"
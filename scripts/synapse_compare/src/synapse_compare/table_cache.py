@@ -0,0 +1,143 @@
+"""On-disk cache of Synapse table query results used in comparisons.
+
+Each query result is stored as an uncompressed Arrow (feather) file keyed by
+the table id, version and etag along with the parameters the table was read
+with. The etag changes whenever the table's rows change, so a cached table is
+only reused while the table is unchanged. Cached tables are read back through
+a memory map, so repeated comparisons of the same table versions (e.g: when
+iterating on join keys) don't query Synapse again. The least recently used
+tables are evicted once the cache grows past its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from pyarrow import feather
+
+logger = logging.getLogger("compare_report_logger")
+
+# Maximum total size of the cached tables before the least
+# recently used tables are evicted
+DEFAULT_TABLE_CACHE_SIZE_MB = 2048
+
+CACHE_FILE_EXT = ".arrow"
+
+
+def cache_key(
+    syn_id: str, version: int, etag: str, query_params: Dict[str, Any]
+) -> str:
+    """Builds the cache key of a table query
+
+    Args:
+        syn_id (str): synapse id of the table
+        version (int): version number of the table
+        etag (str): etag of the table, which changes when its rows change
+        query_params (Dict[str, Any]): parameters the table is read with
+            (e.g: na_values), since they change the resulting dataframe
+
+    Returns:
+        str: the cache key
+    """
+    key_params = json.dumps(
+        {"syn_id": syn_id, "version": version, "etag": etag, **query_params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(key_params.encode("utf-8")).hexdigest()
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}{CACHE_FILE_EXT}")
+
+
+def load_table(cache_dir: str, key: str) -> Optional[pd.DataFrame]:
+    """Loads a cached table, marking it as recently used
+
+    Args:
+        cache_dir (str): directory of the cache
+        key (str): cache key of the table
+
+    Returns:
+        Optional[pd.DataFrame]: the cached table or None if it isn't cached
+    """
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    df = feather.read_table(path, memory_map=True).to_pandas()
+    # access times aren't reliable on every filesystem so the
+    # modification time tracks when the table was last used
+    os.utime(path)
+    logger.info(f"Loaded table from cache {path}")
+    return df
+
+
+def save_table(
+    cache_dir: str,
+    key: str,
+    df: pd.DataFrame,
+    max_size_mb: int = DEFAULT_TABLE_CACHE_SIZE_MB,
+) -> str:
+    """Saves a table to the cache then evicts the least recently
+    used tables if the cache is over its size limit
+
+    Args:
+        cache_dir (str): directory of the cache
+        key (str): cache key of the table
+        df (pd.DataFrame): the table
+        max_size_mb (int, optional): maximum total size of the cache.
+            Defaults to DEFAULT_TABLE_CACHE_SIZE_MB.
+
+    Returns:
+        str: path of the cached table
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, key)
+    # write to a temporary file first so a concurrent reader
+    # never sees a partially written table
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(tmp_fd)
+    try:
+        feather.write_feather(df, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(cache_dir, max_size_mb=max_size_mb, keep=path)
+    return path
+
+
+def evict(
+    cache_dir: str,
+    max_size_mb: int = DEFAULT_TABLE_CACHE_SIZE_MB,
+    keep: Optional[str] = None,
+) -> None:
+    """Removes the least recently used tables until the cache is
+    within its size limit
+
+    Args:
+        cache_dir (str): directory of the cache
+        max_size_mb (int, optional): maximum total size of the cache.
+            Defaults to DEFAULT_TABLE_CACHE_SIZE_MB.
+        keep (str, optional): path of a table that is never evicted
+            (e.g: the table that was just saved). Defaults to None.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_FILE_EXT):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, os.path.join(cache_dir, name)))
+    total_size = sum(size for _, size, _ in entries)
+    max_size = max_size_mb * 1024 * 1024
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total_size -= size
+        logger.info(f"Evicted table from cache {path}")
@@ -0,0 +1,111 @@
+import json
+from unittest import mock
+
+import pytest
+
+import synapse_compare.batch_compare as batch_compare
+
+
+@pytest.fixture
+def csv_manifest(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "syn_id_1,syn_id_2,compare_type,entity_name,join_keys\n"
+        "syn1,syn2,file,maf,Tumor_Sample_Barcode Start_Position\n"
+        "syn3,syn4,table,,\n"
+    )
+    yield str(manifest)
+
+
+def test_read_manifest_reads_csv_with_defaults(csv_manifest):
+    entries = batch_compare.read_manifest(csv_manifest)
+    assert entries == [
+        {
+            "syn_id_1": "syn1",
+            "syn_id_2": "syn2",
+            "compare_type": "file",
+            "entity_name": "maf",
+            "join_keys": ["Tumor_Sample_Barcode", "Start_Position"],
+            "version1": "v1",
+            "version2": "v2",
+            "filter_on_version": False,
+        },
+        {
+            "syn_id_1": "syn3",
+            "syn_id_2": "syn4",
+            "compare_type": "table",
+            "entity_name": "syn3",
+            "join_keys": None,
+            "version1": "v1",
+            "version2": "v2",
+            "filter_on_version": False,
+        },
+    ]
+
+
+def test_read_manifest_reads_yaml(tmp_path):
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text(
+        "- syn_id_1: syn1\n"
+        "  syn_id_2: syn1\n"
+        "  entity_name: clinical\n"
+        "  join_keys: [SAMPLE_ID]\n"
+        "  version1: 15.0\n"
+        "  version2: 16.0\n"
+        "  filter_on_version: true\n"
+    )
+    (entry,) = batch_compare.read_manifest(str(manifest))
+    assert entry["join_keys"] == ["SAMPLE_ID"]
+    assert entry["version1"] == "15.0"
+    assert entry["filter_on_version"] is True
+
+
+@pytest.mark.parametrize(
+    "content, match",
+    [
+        ("syn_id_1,syn_id_2\nsyn1,syn2\nsyn1,syn3\n", "same report names"),
+        ("syn_id_1,syn_id_2,other\nsyn1,syn2,x\n", "Unknown manifest columns"),
+        ("syn_id_1\nsyn1\n", "missing syn_id_1 or syn_id_2"),
+    ],
+    ids=["duplicate_reports", "unknown_column", "missing_synid"],
+)
+def test_read_manifest_raises_on_invalid_manifest(tmp_path, content, match):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(content)
+    with pytest.raises(ValueError, match=match):
+        batch_compare.read_manifest(str(manifest))
+
+
+def test_run_batch_records_results_and_failures(csv_manifest, tmp_path):
+    output_dir = tmp_path / "reports"
+    report = str(output_dir / "maf_v1_vs_v2_comparison_report.txt")
+
+    def _run_compare(**kwargs):
+        if kwargs["syn_id_1"] == "syn3":
+            raise ValueError("bad table")
+        return {
+            "status": "different",
+            "differing_columns": ["t_depth"],
+            "reports": [report],
+        }
+
+    with mock.patch.object(
+        batch_compare.compare, "run_compare", side_effect=_run_compare
+    ) as patch_run:
+        results = batch_compare.run_batch(
+            csv_manifest, str(output_dir), max_workers=1, profile="off"
+        )
+
+    assert patch_run.call_args_list[0].kwargs["profile"] == "off"
+    assert patch_run.call_args_list[0].kwargs["main_download_directory"] == str(
+        output_dir
+    )
+    assert [result["status"] for result in results] == ["different", "error"]
+    assert results[1]["error"] == "ValueError: bad table"
+
+    index = json.loads((output_dir / batch_compare.INDEX_JSON_NAME).read_text())
+    assert index["summary"] == {"identical": 0, "different": 1, "error": 1}
+    assert index["results"][0]["reports"] == ["maf_v1_vs_v2_comparison_report.txt"]
+    index_html = (output_dir / batch_compare.INDEX_HTML_NAME).read_text()
+    assert '<a href="maf_v1_vs_v2_comparison_report.txt">' in index_html
+    assert "ValueError: bad table" in index_html
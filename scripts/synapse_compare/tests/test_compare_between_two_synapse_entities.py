@@ -1,3 +1,5 @@
+import bz2
+import gzip
 from typing import Any, Dict
 from unittest import mock
 
@@ -13,6 +15,15 @@ def mock_syn():
     yield mock.Mock(spec=synapseclient.Synapse)
 
 
+def test_that_get_syn_logs_in_once_and_reuses_the_client(mock_syn):
+    with mock.patch.object(compare, "_syn", None), mock.patch.object(
+        synapseclient, "login", return_value=mock_syn
+    ) as patch_login:
+        assert compare.get_syn() is mock_syn
+        assert compare.get_syn() is mock_syn
+    patch_login.assert_called_once_with(silent=True)
+
+
 @pytest.mark.parametrize(
     "input_value, expected",
     [
@@ -218,6 +229,95 @@ def test_get_synapse_file_or_table_as_dataframe_table_query(mock_syn):
         pd.testing.assert_frame_equal(df, mock_df_final)
 
 
+def test_get_synapse_file_or_table_as_dataframe_table_query_uses_cache(
+    mock_syn, tmp_path
+):
+    mock_entity = mock.Mock(id="syn99999", versionNumber=3, etag="etag")
+    mock_df_final = pd.DataFrame({"col1": [1], "col2": [2]}).convert_dtypes()
+
+    with mock.patch.object(
+        mock_syn, "get", return_value=mock_entity
+    ) as patch_get, mock.patch.object(compare, "query") as mock_query:
+        mock_query.return_value.convert_dtypes.return_value = mock_df_final
+        dfs = [
+            compare.get_synapse_file_or_table_as_dataframe(
+                syn=mock_syn,
+                compare_type="table",
+                syn_id="syn99999",
+                table_cache_dir=str(tmp_path),
+            )
+            for _ in range(2)
+        ]
+
+    mock_query.assert_called_once()
+    patch_get.assert_called_with("syn99999", downloadFile=False)
+    for df in dfs:
+        pd.testing.assert_frame_equal(df, mock_df_final)
+
+
+def test_get_synapse_file_or_table_as_dataframe_arrow_dtypes_keeps_na_semantics(
+    mock_syn, tmp_path
+):
+    path = tmp_path / "data.tsv"
+    path.write_text(
+        "Hugo_Symbol\tCENTER\tt_depth\tnote\n"
+        "TP53\tGOLD\t10\tNA\n"
+        "KRAS\tGOLD\t\tNone\n"
+        "TP53\tSAGE\t30\t\n"
+    )
+    mock_syn.get.return_value = mock.Mock(path=str(path))
+    dfs = {
+        arrow_dtypes: compare.get_synapse_file_or_table_as_dataframe(
+            syn=mock_syn,
+            compare_type="file",
+            syn_id="syn23423",
+            arrow_dtypes=arrow_dtypes,
+        )
+        for arrow_dtypes in [False, True]
+    }
+    pd.testing.assert_frame_equal(dfs[True].isna(), dfs[False].isna())
+    assert isinstance(dfs[True]["Hugo_Symbol"].dtype, pd.CategoricalDtype)
+    assert isinstance(dfs[True]["note"].dtype, pd.ArrowDtype)
+    assert dfs[True]["note"].tolist()[1] == "None"
+
+
+def test_get_synapse_file_or_table_as_dataframe_arrow_dtypes_skips_comments(
+    mock_syn, tmp_path
+):
+    path = tmp_path / "data_mutations_extended.txt"
+    path.write_text(
+        "#version 2.4\n"
+        "Hugo_Symbol\tCENTER\tt_depth\n"
+        "TP53\tGOLD\t10\n"
+        "KRAS\tSAGE\t\n"
+    )
+    mock_syn.get.return_value = mock.Mock(path=str(path))
+    dfs = {
+        arrow_dtypes: compare.get_synapse_file_or_table_as_dataframe(
+            syn=mock_syn,
+            compare_type="file",
+            syn_id="syn23423",
+            csv_kwargs={"comment": "#"},
+            arrow_dtypes=arrow_dtypes,
+        )
+        for arrow_dtypes in [False, True]
+    }
+    assert dfs[True].columns.tolist() == ["Hugo_Symbol", "CENTER", "t_depth"]
+    pd.testing.assert_frame_equal(dfs[True].isna(), dfs[False].isna())
+    assert isinstance(dfs[True]["CENTER"].dtype, pd.CategoricalDtype)
+    assert isinstance(dfs[True]["t_depth"].dtype, pd.ArrowDtype)
+
+
+def test_that_align_categories_gives_both_dataframes_the_same_categories():
+    df1 = compare.to_arrow_dtypes(pd.DataFrame({"CENTER": ["GOLD", "SAGE"], "a": [1, 2]}))
+    df2 = compare.to_arrow_dtypes(pd.DataFrame({"CENTER": ["SAGE", "TEST"], "a": [1, 2]}))
+    df1, df2 = compare.align_categories(df1, df2)
+    assert df1["CENTER"].dtype == df2["CENTER"].dtype
+    assert list(df1["CENTER"].cat.categories) == ["GOLD", "SAGE", "TEST"]
+    assert (df1["CENTER"] == df2["CENTER"]).tolist() == [False, False]
+    assert df1["a"].dtype == "int64"
+
+
 def test_save_reports_saves_local_only(tmp_path):
     syn = mock.Mock()
 
@@ -349,6 +449,25 @@ def test_auto_detect_falls_back_to_tab_when_comma_results_in_one_column(tmp_path
     assert df["b"].tolist() == [2, 4]
 
 
+def test_auto_detect_skips_commented_header(tmp_path):
+    # GENIE MAF files start with a #version header line
+    path = _write(
+        tmp_path, "data_mutations.txt", "#version 2.4\na\tb\n1\t2\n3\t4\n"
+    )
+
+    df = compare.read_csv_with_auto_sep(path, comment="#")
+    assert df.shape == (2, 2)
+    assert list(df.columns) == ["a", "b"]
+
+
+def test_auto_detect_skips_skiprows(tmp_path):
+    path = _write(tmp_path, "data.tsv", "some preamble, here\na\tb\n1\t2\n")
+
+    df = compare.read_csv_with_auto_sep(path, skiprows=1)
+    assert df.shape == (1, 2)
+    assert list(df.columns) == ["a", "b"]
+
+
 def test_raises_value_error_when_neither_comma_nor_tab_produces_table(tmp_path):
     # Single column no matter what separator you choose
     path = _write(tmp_path, "onecol.txt", "only_one_column\n1\n2\n")
@@ -381,25 +500,248 @@ def test_user_sep_parser_error_is_propagated(tmp_path, monkeypatch):
         compare.read_csv_with_auto_sep(path, sep=",")
 
 
-def test_auto_detect_handles_parser_error_then_succeeds_on_tab(tmp_path, monkeypatch):
-    """
-    Simulate comma parse raising ParserError, then tab parse succeeding.
-    This makes sure the 'except ParserError: pass' path is covered.
-    """
-    path = _write(tmp_path, "data.tsv", "a\tb\n1\t2\n")
+@pytest.mark.parametrize(
+    "content, expected_sep",
+    [("a,b\n1,2\n", ","), ("a\tb\n1\t2\n", "\t")],
+    ids=["comma", "tab"],
+)
+def test_auto_detect_parses_file_once(tmp_path, monkeypatch, content, expected_sep):
+    path = _write(tmp_path, "data.txt", content)
 
+    calls: list[Dict[str, Any]] = []
     real_read_csv = pd.read_csv
-    state = {"calls": 0}
 
-    def fake_read_csv(*args, **kwargs):
-        # First attempt (comma) fails; second attempt (tab) delegates to pandas
-        state["calls"] += 1
-        if state["calls"] == 1:
-            raise pd.errors.ParserError("comma parse failed")
+    def spy_read_csv(*args, **kwargs):
+        calls.append(kwargs.copy())
         return real_read_csv(*args, **kwargs)
 
-    monkeypatch.setattr(pd, "read_csv", fake_read_csv)
+    monkeypatch.setattr(pd, "read_csv", spy_read_csv)
 
     df = compare.read_csv_with_auto_sep(path)
     assert df.shape == (1, 2)
+    assert len(calls) == 1
+    assert calls[0]["sep"] == expected_sep
+
+
+def test_auto_detect_ignores_commas_in_tab_separated_rows(tmp_path):
+    path = _write(tmp_path, "data.tsv", "a\tb\n1,5\t2\n3\t4,6\n")
+
+    df = compare.read_csv_with_auto_sep(path, dtype=str)
+    assert list(df.columns) == ["a", "b"]
+    assert df["a"].tolist() == ["1,5", "3"]
+
+
+@pytest.mark.parametrize(
+    "open_func, file_name",
+    [(gzip.open, "data.txt.gz"), (bz2.open, "data.txt.bz2"), (gzip.open, "data.txt")],
+    ids=["gzip", "bz2", "gzip_without_extension"],
+)
+def test_auto_detect_reads_compressed_files(tmp_path, open_func, file_name):
+    path = str(tmp_path / file_name)
+    with open_func(path, "wt") as out_file:
+        out_file.write("a\tb\n1\t2\n3\t4\n")
+
+    df = compare.read_csv_with_auto_sep(path)
     assert list(df.columns) == ["a", "b"]
+    assert df["b"].tolist() == [2, 4]
+
+
+def test_save_reports_skips_detailed_report_when_profiling_is_off(tmp_path):
+    syn = mock.Mock()
+
+    mock_simple_report = mock.Mock()
+    mock_simple_report.report.return_value = "simple report content"
+
+    reports = {
+        "comparison_report": mock_simple_report,
+        "comparison_report_detailed": None,
+    }
+
+    compare.save_reports(
+        syn=syn,
+        reports=reports,
+        report_name_prefix="test",
+        output_dir=str(tmp_path),
+        output_synid="syn123",
+        save_to_synapse=True,
+    )
+
+    assert (tmp_path / "test_comparison_report.txt").exists()
+    assert not (tmp_path / "test_comparison_report_detailed.html").exists()
+    # only the txt report is stored
+    assert syn.store.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "sample_size, expected_rows",
+    [(2, 2), (10, 5)],
+    ids=["sampled", "smaller_than_sample"],
+)
+def test_sample_rows_returns_expected_rows(sample_size, expected_rows):
+    df = pd.DataFrame({"id": range(5)})
+    result = compare.sample_rows(df, sample_size)
+    assert len(result) == expected_rows
+    assert result["id"].is_monotonic_increasing
+    pd.testing.assert_frame_equal(result, compare.sample_rows(df, sample_size))
+
+
+@pytest.fixture
+def profile_dfs():
+    df1 = pd.DataFrame({"id": [1, 2, 3], "a": [1, 2, 3], "b": ["x", "y", "z"]})
+    df2 = pd.DataFrame({"id": [1, 2, 3], "a": [1, 2, 4], "b": ["x", "y", "z"]})
+    yield df1, df2
+
+
+@pytest.mark.parametrize(
+    "profile, profile_columns, expected_columns, expected_minimal",
+    [
+        ("full", None, ["id", "a", "b"], False),
+        ("minimal", None, ["id", "a", "b"], True),
+        ("sampled", None, ["id", "a", "b"], False),
+        ("differing", ["a"], ["id", "a"], False),
+    ],
+    ids=["full", "minimal", "sampled", "differing"],
+)
+def test_generate_comparison_reports_profiles_by_tier(
+    profile_dfs, profile, profile_columns, expected_columns, expected_minimal
+):
+    df1, df2 = profile_dfs
+    with mock.patch("ydata_profiling.ProfileReport") as mock_profile:
+        reports = compare.generate_comparison_reports(
+            df1=df1,
+            df2=df2,
+            df1_name="df1",
+            df2_name="df2",
+            join_keys=["id"],
+            profile=profile,
+            profile_sample_size=2,
+            profile_columns=profile_columns,
+        )
+    assert mock_profile.call_count == 2
+    profiled_df, *_ = mock_profile.call_args_list[0].args
+    assert list(profiled_df.columns) == expected_columns
+    assert len(profiled_df) == (2 if profile == "sampled" else 3)
+    assert mock_profile.call_args_list[0].kwargs["minimal"] == expected_minimal
+    assert (
+        reports["comparison_report_detailed"]
+        == mock_profile.return_value.compare.return_value
+    )
+
+
+def test_generate_comparison_reports_skips_profiling_when_off(profile_dfs):
+    df1, df2 = profile_dfs
+    with mock.patch("ydata_profiling.ProfileReport") as mock_profile:
+        reports = compare.generate_comparison_reports(
+            df1=df1, df2=df2, df1_name="df1", df2_name="df2", profile="off"
+        )
+    mock_profile.assert_not_called()
+    assert reports["comparison_report_detailed"] is None
+    assert reports["comparison_report"].matches() is False
+
+
+def test_generate_comparison_reports_raises_on_invalid_profile(profile_dfs):
+    df1, df2 = profile_dfs
+    with pytest.raises(ValueError, match="Profile not valid"):
+        compare.generate_comparison_reports(
+            df1=df1, df2=df2, df1_name="df1", df2_name="df2", profile="everything"
+        )
+
+
+@pytest.mark.parametrize(
+    "csv_kwargs, only_differing_columns",
+    [
+        ({"comment": "#", "sep": "\t"}, False),
+        ({"comment": "#"}, False),
+        ({"comment": "#", "dtype": str}, False),
+        ({"comment": "#"}, True),
+    ],
+    ids=["comment_and_sep", "comment", "dtype", "only_differing_columns"],
+)
+def test_that_run_compare_finds_differences_in_commented_maf_files(
+    mock_syn, tmp_path, csv_kwargs, only_differing_columns
+):
+    paths = {}
+    for synid, depth in [("syn1", 20), ("syn2", 25)]:
+        paths[synid] = tmp_path / f"{synid}.maf"
+        paths[synid].write_text(
+            f"#version 2.4\nHugo_Symbol\tt_depth\nTP53\t10\nKRAS\t{depth}\n"
+        )
+    mock_syn.get.side_effect = lambda synid, **kwargs: mock.Mock(
+        path=str(paths[synid])
+    )
+    with mock.patch.object(
+        compare,
+        "generate_comparison_reports",
+        wraps=compare.generate_comparison_reports,
+    ) as patch_reports, mock.patch.object(compare, "save_reports", return_value=[]):
+        result = compare.run_compare(
+            syn_id_1="syn1",
+            syn_id_2="syn2",
+            version1="v1",
+            version2="v2",
+            compare_type="file",
+            main_download_directory=str(tmp_path / "reports"),
+            join_keys=["Hugo_Symbol"],
+            csv_kwargs=csv_kwargs,
+            only_differing_columns=only_differing_columns,
+            profile="off",
+            syn=mock_syn,
+        )
+    assert result["status"] == "different"
+    assert result["differing_columns"] == ["t_depth"]
+    # datacompy lower cases the column names in place
+    assert [col.lower() for col in patch_reports.call_args.kwargs["df1"].columns] == [
+        "hugo_symbol",
+        "t_depth",
+    ]
+
+
+def test_that_run_compare_passes_comment_and_skiprows_to_large_file_compare(
+    mock_syn, tmp_path
+):
+    for synid, depth in [("syn1", 20), ("syn2", 25)]:
+        (tmp_path / f"{synid}.maf").write_text(
+            f"#version 2.4\nHugo_Symbol\tt_depth\nKRAS\t{depth}\n"
+        )
+    mock_syn.get.side_effect = lambda synid, **kwargs: mock.Mock(
+        path=str(tmp_path / f"{synid}.maf")
+    )
+    with mock.patch.object(
+        compare.partitioned_compare, "compare_large_files"
+    ) as patch_compare, mock.patch.object(
+        compare.partitioned_compare, "has_differences", return_value=False
+    ):
+        result = compare.run_compare(
+            syn_id_1="syn1",
+            syn_id_2="syn2",
+            version1="v1",
+            version2="v2",
+            compare_type="file",
+            main_download_directory=str(tmp_path / "reports"),
+            csv_kwargs={"comment": "#", "skiprows": [1]},
+            large_file=True,
+            syn=mock_syn,
+        )
+    assert result["status"] == "identical"
+    assert patch_compare.call_args.kwargs["comment"] == "#"
+    assert patch_compare.call_args.kwargs["skiprows"] == [1]
+
+
+def test_that_run_compare_skips_reading_files_with_the_same_bytes(mock_syn, tmp_path):
+    path = tmp_path / "data_clinical_sample.txt"
+    path.write_text("SAMPLE_ID\tAGE\nS1\t10\n")
+    mock_syn.get.return_value = mock.Mock(path=str(path))
+    with mock.patch.object(
+        compare, "get_synapse_file_or_table_as_dataframe"
+    ) as patch_read:
+        result = compare.run_compare(
+            syn_id_1="syn1",
+            syn_id_2="syn2",
+            version1="v1",
+            version2="v2",
+            compare_type="file",
+            main_download_directory=str(tmp_path / "reports"),
+            syn=mock_syn,
+        )
+    assert result == {"status": "identical", "differing_columns": [], "reports": []}
+    patch_read.assert_not_called()
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from synapse_compare import fingerprint
+
+
+def test_that_fingerprint_dataframe_lists_differing_columns():
+    df1 = pd.DataFrame({"ID": [1, 2], "AGE": [10, 20], "SEX": ["Male", "Female"]})
+    df2 = pd.DataFrame({"ID": [2, 1], "AGE": [10, 10], "SEX": ["Female", "Male"]})
+    assert fingerprint.compare_fingerprints(
+        fingerprint.fingerprint_dataframe(df1, join_keys=["ID"]),
+        fingerprint.fingerprint_dataframe(df1.iloc[::-1], join_keys=["ID"]),
+    ) == {"identical": True, "differing_columns": []}
+    assert fingerprint.compare_fingerprints(
+        fingerprint.fingerprint_dataframe(df1, join_keys=["ID"]),
+        fingerprint.fingerprint_dataframe(df2, join_keys=["ID"]),
+    ) == {"identical": False, "differing_columns": ["AGE"]}
+
+def test_that_fingerprint_dataframe_ignores_row_and_column_order():
+    df1 = pd.DataFrame({"ID": [1, 2], "AGE": [10, 20], "SEX": ["Male", "Female"]})
+    df2 = df1.iloc[::-1][["SEX", "ID", "AGE"]]
+    result = fingerprint.compare_fingerprints(
+        fingerprint.fingerprint_dataframe(df1, join_keys=["ID"]),
+        fingerprint.fingerprint_dataframe(df2, join_keys=["ID"]),
+    )
+    assert result == {"identical": True, "differing_columns": []}
+
+
+@pytest.mark.parametrize(
+    "data2, expected_columns",
+    [
+        ({"ID": [1, 2], "AGE": [10, 21], "SEX": ["Male", "Female"]}, ["AGE"]),
+        ({"ID": [1, 2], "AGE": [20, 10], "SEX": ["Male", "Female"]}, ["AGE"]),
+        ({"ID": [1, 2], "AGE": [10, 20]}, ["SEX"]),
+        (
+            {"ID": [1, 2], "AGE": [10, 20], "SEX": ["Male", "Female"], "CENTER": ["A", "B"]},
+            ["CENTER"],
+        ),
+        (
+            {"ID": [1, 2, 2], "AGE": [10, 20, 20], "SEX": ["Male", "Female", "Female"]},
+            ["ID", "AGE", "SEX"],
+        ),
+    ],
+    ids=["changed_value", "swapped_values", "removed_column", "added_column", "duplicated_row"],
+)
+def test_that_fingerprint_dataframe_lists_changed_columns(data2, expected_columns):
+    df1 = pd.DataFrame({"ID": [1, 2], "AGE": [10, 20], "SEX": ["Male", "Female"]})
+    result = fingerprint.compare_fingerprints(
+        fingerprint.fingerprint_dataframe(df1, join_keys=["ID"]),
+        fingerprint.fingerprint_dataframe(pd.DataFrame(data2), join_keys=["ID"]),
+    )
+    assert result == {"identical": False, "differing_columns": expected_columns}
@@ -0,0 +1,208 @@
+import datacompy
+import pandas as pd
+import pytest
+
+from synapse_compare import partitioned_compare
+
+
+@pytest.fixture
+def files_with_differences(tmp_path):
+    file1 = tmp_path / "file1.tsv"
+    file2 = tmp_path / "file2.tsv"
+    file1.write_text(
+        "SAMPLE_ID\tAGE\tSEX\tONCOTREE\n"
+        "S1\t10\tMale\tLUAD\n"
+        "S2\t20\tFemale\tBRCA\n"
+        "S3\tNA\tMale\tCOAD\n"
+        "S4\t40\tFemale\tSKCM\n"
+    )
+    file2.write_text(
+        "SAMPLE_ID\tAGE\tSEX\tCENTER\n"
+        "S1\t10.0\tMale\tA\n"
+        "S2\t21\tMale\tA\n"
+        "S3\tNA\tMale\tB\n"
+        "S5\t50\tFemale\tB\n"
+    )
+    yield str(file1), str(file2)
+
+
+@pytest.mark.parametrize(
+    "bucket_size_mb, max_workers",
+    [(64, 1), (0.00001, 1), (0.00001, 2)],
+    ids=["single_bucket", "many_buckets", "process_pool"],
+)
+def test_that_compare_large_files_gives_expected_summary(
+    files_with_differences, bucket_size_mb, max_workers
+):
+    file1, file2 = files_with_differences
+    summary = partitioned_compare.compare_large_files(
+        file1,
+        file2,
+        join_keys=["SAMPLE_ID"],
+        na_values=["NA"],
+        bucket_size_mb=bucket_size_mb,
+        max_workers=max_workers,
+    )
+    assert summary == {
+        "join_keys": ["sample_id"],
+        "df1_rows": 4,
+        "df2_rows": 4,
+        "df1_unq_columns": ["oncotree"],
+        "df2_unq_columns": ["center"],
+        "df1_unq_rows": 1,
+        "df2_unq_rows": 1,
+        "intersect_rows": 3,
+        "rows_with_unequal_values": 1,
+        "column_mismatches": {"age": 1, "sex": 1},
+    }
+    assert partitioned_compare.has_differences(summary)
+
+
+def test_that_compare_large_files_matches_datacompy(files_with_differences):
+    file1, file2 = files_with_differences
+    summary = partitioned_compare.compare_large_files(
+        file1, file2, join_keys=["SAMPLE_ID"], na_values=["NA"]
+    )
+    compare = datacompy.Compare(
+        pd.read_csv(file1, sep="\t"),
+        pd.read_csv(file2, sep="\t"),
+        join_columns=["SAMPLE_ID"],
+    )
+    assert summary["df1_unq_rows"] == len(compare.df1_unq_rows)
+    assert summary["df2_unq_rows"] == len(compare.df2_unq_rows)
+    assert summary["intersect_rows"] == len(compare.intersect_rows)
+    assert summary["df1_unq_columns"] == sorted(compare.df1_unq_columns())
+    assert summary["df2_unq_columns"] == sorted(compare.df2_unq_columns())
+    assert summary["column_mismatches"] == {
+        column["column"]: column["unequal_cnt"]
+        for column in compare.column_stats
+        if column["unequal_cnt"] > 0
+    }
+
+
+def test_that_compare_large_files_pairs_duplicate_keys_in_order(tmp_path):
+    file1 = tmp_path / "file1.csv"
+    file2 = tmp_path / "file2.csv"
+    file1.write_text("ID,VALUE\n1,a\n1,b\n1,c\n")
+    file2.write_text("ID,VALUE\n1,a\n1,x\n")
+    summary = partitioned_compare.compare_large_files(
+        str(file1), str(file2), join_keys=["ID"]
+    )
+    assert summary["intersect_rows"] == 2
+    assert summary["df1_unq_rows"] == 1
+    assert summary["df2_unq_rows"] == 0
+    assert summary["column_mismatches"] == {"value": 1}
+
+
+def test_that_compare_large_files_has_no_differences_for_identical_files(tmp_path):
+    file1 = tmp_path / "file1.csv"
+    file1.write_text('ID,NOTE\n1,"a, quoted value"\n2,b\n')
+    summary = partitioned_compare.compare_large_files(str(file1), str(file1))
+    assert summary["join_keys"] == ["id", "note"]
+    assert summary["intersect_rows"] == 2
+    assert not partitioned_compare.has_differences(summary)
+
+
+@pytest.mark.parametrize(
+    "sep, comment, skiprows",
+    [(None, "#", None), ("\t", "#", None), (None, None, 1)],
+    ids=["comment", "comment_and_sep", "skiprows"],
+)
+def test_that_compare_large_files_skips_commented_header(
+    tmp_path, sep, comment, skiprows
+):
+    file1 = tmp_path / "file1.maf"
+    file2 = tmp_path / "file2.maf"
+    file1.write_text("#version 2.4\nHugo_Symbol\tt_depth\nTP53\t10\nKRAS\t20\n")
+    file2.write_text("#version 2.4\nHugo_Symbol\tt_depth\nTP53\t10\nKRAS\t25\n")
+    summary = partitioned_compare.compare_large_files(
+        str(file1),
+        str(file2),
+        join_keys=["Hugo_Symbol"],
+        sep=sep,
+        comment=comment,
+        skiprows=skiprows,
+    )
+    assert summary["join_keys"] == ["hugo_symbol"]
+    assert summary["df1_rows"] == 2
+    assert summary["intersect_rows"] == 2
+    assert summary["column_mismatches"] == {"t_depth": 1}
+
+
+def test_that_compare_large_files_compares_empty_and_na_values(tmp_path):
+    file1 = tmp_path / "file1.tsv"
+    file2 = tmp_path / "file2.tsv"
+    file1.write_text("ID\tAGE\tSEX\n1\t\tMale\n2\tNA\tFemale\n3\t30\t\n")
+    file2.write_text("ID\tAGE\tSEX\n1\tNA\tMale\n2\t\tFemale\n3\t\t\n")
+    summary = partitioned_compare.compare_large_files(
+        str(file1),
+        str(file2),
+        join_keys=["ID"],
+        na_values=["", "NA"],
+        bucket_size_mb=0.00001,
+    )
+    assert summary["intersect_rows"] == 3
+    assert summary["rows_with_unequal_values"] == 1
+    assert summary["column_mismatches"] == {"age": 1}
+
+
+def test_that_compare_large_files_raises_on_missing_join_keys(tmp_path):
+    file1 = tmp_path / "file1.csv"
+    file2 = tmp_path / "file2.csv"
+    file1.write_text("ID,VALUE\n1,a\n")
+    file2.write_text("OTHER_ID,VALUE\n1,a\n")
+    with pytest.raises(ValueError, match="not in both files"):
+        partitioned_compare.compare_large_files(
+            str(file1), str(file2), join_keys=["ID"]
+        )
+
+
+@pytest.mark.parametrize(
+    "value1, value2, expected",
+    [
+        ("a", "a", True),
+        ("1", "1.0", True),
+        ("1", "2", False),
+        (partitioned_compare.NA_SENTINEL, partitioned_compare.NA_SENTINEL, True),
+        (partitioned_compare.NA_SENTINEL, "0", False),
+        ("a", "b", False),
+    ],
+    ids=["same_str", "same_num", "diff_num", "both_na", "one_na", "diff_str"],
+)
+def test_that_values_match_gives_expected_result(value1, value2, expected):
+    assert partitioned_compare.values_match(value1, value2) == expected
+
+
+@pytest.mark.parametrize(
+    "content, sniff_size, expected_sep",
+    [
+        ('a,b\n"1\t2",3\n', partitioned_compare.DEFAULT_SNIFF_SIZE, ","),
+        ("a\tb\n1,2\t3\n", partitioned_compare.DEFAULT_SNIFF_SIZE, "\t"),
+        ('a,b\n1,2\n3,"long\nquoted value"\n', 22, ","),
+    ],
+    ids=["quoted_tab", "comma_in_tab_file", "prefix_ends_in_quoted_field"],
+)
+def test_that_detect_sep_gives_expected_sep(tmp_path, content, sniff_size, expected_sep):
+    path = tmp_path / "data.txt"
+    path.write_text(content)
+    assert partitioned_compare.detect_sep(str(path), sniff_size=sniff_size) == expected_sep
+
+
+@pytest.mark.parametrize(
+    "content, comment, skiprows",
+    [
+        ("#version 2.4\na\tb\n1\t2\n", "#", None),
+        ("a\tb # header, with comma\n1\t2\n", "#", None),
+        ("x,y,z\na\tb\n1\t2\n", None, 1),
+        ("x,y,z\na\tb\n1\t2\n", None, [0]),
+        ("x,y,z\na\tb\n1\t2\n", None, lambda line_number: line_number == 0),
+    ],
+    ids=["comment_line", "trailing_comment", "skiprows_int", "skiprows_list", "skiprows_callable"],
+)
+def test_that_detect_sep_ignores_skipped_lines(tmp_path, content, comment, skiprows):
+    path = tmp_path / "data.txt"
+    path.write_text(content)
+    assert (
+        partitioned_compare.detect_sep(str(path), comment=comment, skiprows=skiprows)
+        == "\t"
+    )
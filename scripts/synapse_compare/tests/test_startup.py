@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+# generous budget so the check isn't flaky on slow CI runners; importing
+# datacompy, ydata_profiling or logging in at import time goes well past it
+IMPORT_TIME_BUDGET_SECONDS = 5
+
+IMPORT_SCRIPT = """
+import sys
+import time
+
+start = time.perf_counter()
+import synapse_compare.compare_between_two_synapse_entities
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(" ".join(name for name in ("datacompy", "ydata_profiling") if name in sys.modules))
+"""
+
+
+def test_that_importing_compare_module_is_fast_and_lazy():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, loaded_backends = (result.stdout.splitlines() + [""])[:2]
+    assert loaded_backends == ""
+    assert float(elapsed) < IMPORT_TIME_BUDGET_SECONDS
@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+from synapse_compare import table_cache
+
+
+@pytest.fixture
+def table_df():
+    yield pd.DataFrame(
+        {"id": [1, 2, None], "name": ["a", None, "c"], "flag": [True, False, None]}
+    ).convert_dtypes()
+
+
+def test_that_save_and_load_table_round_trips_dtypes(tmp_path, table_df):
+    table_cache.save_table(str(tmp_path), "key", table_df)
+    result = table_cache.load_table(str(tmp_path), "key")
+    pd.testing.assert_frame_equal(result, table_df)
+
+
+def test_that_load_table_returns_none_when_not_cached(tmp_path):
+    assert table_cache.load_table(str(tmp_path), "missing") is None
+
+
+@pytest.mark.parametrize(
+    "changed_args",
+    [
+        {"version": 2},
+        {"etag": "etag2"},
+        {"query_params": {"na_values": ["NA"]}},
+    ],
+    ids=["version", "etag", "query_params"],
+)
+def test_that_cache_key_changes_with_table_state(changed_args):
+    args = {"syn_id": "syn1", "version": 1, "etag": "etag1", "query_params": {}}
+    assert table_cache.cache_key(**args) != table_cache.cache_key(
+        **{**args, **changed_args}
+    )
+
+
+def test_that_evict_removes_least_recently_used_tables(tmp_path, table_df):
+    cache_dir = str(tmp_path)
+    paths = [
+        table_cache.save_table(cache_dir, key, table_df) for key in ["a", "b", "c"]
+    ]
+    for mtime, path in enumerate(paths):
+        os.utime(path, (mtime, mtime))
+    # using "a" makes "b" the least recently used table
+    table_cache.load_table(cache_dir, "a")
+    table_size = os.path.getsize(paths[0])
+    table_cache.evict(cache_dir, max_size_mb=2 * table_size / (1024 * 1024))
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
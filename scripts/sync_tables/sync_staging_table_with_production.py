@@ -1,11 +1,34 @@
 """
 This script syncs specific tables from the production database to the staging database in Synapse.
 
-Usage: python sync_staging_table_with_prod.py
+With --incremental, each table is compared partition by partition (per CENTER,
+SEQ_ASSAY_ID, etc) using the row count and latest row version of each partition
+in production and staging. Only the partitions that changed since the last sync
+recorded in the state file are downloaded and pushed, so an unchanged
+partition costs nothing beyond one aggregate query per table.
+
+The tables are synced concurrently across a bounded pool of threads. A table
+that fails to sync doesn't stop the others, and a summary of the rows changed
+and time taken per table is logged at the end.
+
+The narrow MAF table (vcf2maf) is copied into a new staging table in batches of
+rows streamed from production. Each batch is retried on failure and recorded
+in a checkpoint, so a failed load resumes from the last stored batch.
+
+Usage: python sync_staging_table_with_prod.py [--incremental] [--state_path sync_state.json]
+    [--max_workers 4] [--mapping_cache_dir mapping_cache] [--tables sample vcf2maf]
+    [--bulk_load_batch_size 50000] [--bulk_load_checkpoint_path maf_bulk_load.json]
 """
 
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+import json
 import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
 
 import pandas as pd
 import synapseclient
@@ -13,8 +36,12 @@ from synapseclient.models import query, Table
 
 from genie import load, process_functions
 
-syn = synapseclient.login()
-syn.table_query_timeout = 50000
+# the script is run from its own directory in the docker image, which has the
+# modules of scripts/shared copied in, and imported from the repository root by the tests
+try:
+    from database_mapping import DatabaseMapping
+except ImportError:
+    from scripts.shared.database_mapping import DatabaseMapping
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,88 +62,760 @@ tables_to_copy = {
 
 db_to_synid_mapping = {"production": "syn10967259", "staging": "syn12094210"}
 
-def download_table(table_key: str) -> pd.DataFrame:
+# both mapping tables are queried once and shared by all of the sync steps
+database_mapping = DatabaseMapping(db_to_synid_mapping)
+
+# Default number of tables synced at the same time
+DEFAULT_MAX_WORKERS = 4
+
+# Default number of rows streamed into the new narrow MAF table per batch
+DEFAULT_BULK_LOAD_BATCH_SIZE = 50000
+
+# Default number of attempts at storing a batch of rows before giving up
+DEFAULT_BULK_LOAD_MAX_RETRIES = 5
+
+DEFAULT_BULK_LOAD_CHECKPOINT_PATH = "maf_bulk_load.json"
+
+# name of the single partition of tables without a partition key
+WHOLE_TABLE_PARTITION = "__all__"
+
+# name of the partition of rows whose partition key is missing
+NULL_PARTITION = "__null__"
+
+
+class SyncResult(NamedTuple):
+    """The outcome of syncing a single table.
+
+    status is one of:
+        synced: the staging table was updated with the production rows
+        skipped: no partitions of the table changed since the last sync
+        failed: the sync raised an error, which is kept in error
+    """
+
+    table_key: str
+    status: str
+    rows_changed: int
+    elapsed_seconds: float
+    error: Optional[str] = None
+
+
+def get_table_synid(table_key: str, database: str) -> str:
+    """
+    Gets the synapse id of a table from the memoized database mapping table.
+    Args:
+        table_key: The table name key of the table.
+        database: The database the table is in, production or staging.
+    Returns:
+        The synapse id of the table.
+    """
+    return database_mapping.get_synid(table_key, database)
+
+
+def partition_filter(partition_key: str, partitions: List[str]) -> str:
+    """
+    Builds the WHERE clause that selects the rows of the given partitions.
+    Args:
+        partition_key: The attribute the table sections are separated by.
+        partitions: The partitions to select.
+    Returns:
+        The WHERE clause.
+    """
+    conditions = []
+    values = [
+        "'{}'".format(partition.replace("'", "''"))
+        for partition in partitions
+        if partition != NULL_PARTITION
+    ]
+    if values:
+        conditions.append(f"{partition_key} IN ({', '.join(values)})")
+    if NULL_PARTITION in partitions:
+        conditions.append(f"{partition_key} IS NULL")
+    return f"WHERE {' OR '.join(conditions)}"
+
+
+def get_partition_signatures(
+    table_syn_id: str, partition_key: Optional[str] = None
+) -> Dict[str, List[int]]:
+    """
+    Gets the row count and latest row version of each partition of a table with
+    one aggregate query. Row versions only increase within a table, so any
+    append, update or deletion in a partition changes its signature.
+    Args:
+        table_syn_id: The synapse id of the table.
+        partition_key: The attribute to separate the table sections by. Optional.
+            The whole table is one partition if there is no partition key.
+    Returns:
+        A mapping of each partition to its [row count, latest row version].
+    """
+    aggregates = "COUNT(*) AS row_count, MAX(ROW_VERSION) AS max_row_version"
+    if partition_key:
+        signatures = query(
+            f"SELECT {partition_key}, {aggregates} FROM {table_syn_id} "
+            f"GROUP BY {partition_key}",
+            include_row_id_and_row_version=False,
+        )
+    else:
+        signatures = query(
+            f"SELECT {aggregates} FROM {table_syn_id}",
+            include_row_id_and_row_version=False,
+        )
+        signatures.insert(0, "partition", WHOLE_TABLE_PARTITION)
+    result = {}
+    for partition, row_count, max_row_version in signatures.itertuples(index=False):
+        if int(row_count) == 0:
+            continue
+        partition = NULL_PARTITION if pd.isna(partition) else str(partition)
+        result[partition] = [int(row_count), int(max_row_version)]
+    return result
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """
+    Writes json to a temporary file first so an interrupted write
+    never leaves a partially written file behind.
+    Args:
+        path: The path to the json file.
+        data: The data to write.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as json_file:
+        json.dump(data, json_file, indent=2)
+    os.replace(temp_path, path)
+
+
+class SyncState:
+    """A local record of the partition signatures of each production and
+    staging table as of their last sync. A partition only has to be synced
+    again once its signature in either database moves away from the recorded one.
+    """
+
+    def __init__(self, state_path: str) -> None:
+        """
+        Args:
+            state_path (str): The path to the json state file.
+        """
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._state = {}
+        if os.path.exists(state_path):
+            with open(state_path, "r") as state_file:
+                self._state = json.load(state_file)
+
+    def get(self, table_key: str) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Gets the recorded signatures of a table.
+        Args:
+            table_key: The table name key of the table.
+        Returns:
+            The production and staging signatures of the table, empty if it was never synced.
+        """
+        return self._state.get(table_key, {"production": {}, "staging": {}})
+
+    def update(
+        self,
+        table_key: str,
+        production: Dict[str, List[int]],
+        staging: Dict[str, List[int]],
+    ) -> None:
+        """
+        Records the signatures of a synced table and writes the state to disk.
+        Args:
+            table_key: The table name key of the table.
+            production: The partition signatures of the production table.
+            staging: The partition signatures of the staging table after the sync.
+        """
+        with self._lock:
+            self._state[table_key] = {"production": production, "staging": staging}
+            _write_json(self.state_path, self._state)
+
+
+def find_changed_partitions(
+    production: Dict[str, List[int]],
+    staging: Dict[str, List[int]],
+    recorded: Dict[str, Dict[str, List[int]]],
+) -> List[str]:
+    """
+    Finds the partitions whose signature changed in either database since the last sync.
+    Args:
+        production: The current partition signatures of the production table.
+        staging: The current partition signatures of the staging table.
+        recorded: The production and staging signatures recorded at the last sync.
+    Returns:
+        The changed partitions, sorted.
+    """
+    return sorted(
+        partition
+        for partition in set(production) | set(staging)
+        if production.get(partition) != recorded["production"].get(partition)
+        or staging.get(partition) != recorded["staging"].get(partition)
+    )
+
+
+def count_changed_rows(
+    old: pd.DataFrame, new: pd.DataFrame, primary_key: List[str]
+) -> int:
+    """
+    Counts the rows appended, updated or deleted when replacing the old rows
+    with the new rows, matching the rows on their primary key.
+    Args:
+        old: The rows being replaced.
+        new: The rows replacing them.
+        primary_key: The columns that identify a row.
+    Returns:
+        The number of rows that changed.
+    """
+    columns = [column for column in new.columns if column in old.columns]
+    old = old[columns].astype(str).drop_duplicates(primary_key).set_index(primary_key)
+    new = new[columns].astype(str).drop_duplicates(primary_key).set_index(primary_key)
+    common = old.index.intersection(new.index)
+    updated = (old.loc[common] != new.loc[common, old.columns]).any(axis=1).sum()
+    return int(len(old) + len(new) - 2 * len(common) + updated)
+
+
+def download_table(table_key: str, where: str = "") -> pd.DataFrame:
     """
     Downloads the production table from Synapse.
     Args:
         table_key: The table name key of the table to download.
+        where: A WHERE clause to only download some of the rows. Optional.
     Returns:
         data: A pandas DataFrame containing the data from the production table.
     """
     # download production tables
-    db_table = query(
-        f"SELECT * FROM {db_to_synid_mapping['production']}"
-    ).convert_dtypes()
-    syn_id = db_table[db_table["Database"] == table_key].Id.values[0]
-    data = query(f"SELECT * FROM {syn_id}").convert_dtypes()
+    syn_id = get_table_synid(table_key, "production")
+    data = query(f"SELECT * FROM {syn_id} {where}".strip()).convert_dtypes()
     return data
 
 
 def replace_table(
+    syn: synapseclient.Synapse,
     data_to_replace_with: pd.DataFrame,
     table_key: str,
-    partition_key : str = None
-    ) -> None:
+    partition_key : str = None,
+    where: str = "",
+    ) -> int:
     """
     Replaces the staging table with the production table. The primary keys for the tables
     are pulled from the synapse table's primary key attribute + the partition key (if it exists).
 
     Args:
+        syn (synapseclient.Synapse): synapse client connection
         data_to_replace_with (pd.DataFrame): The data to replace the staging table with.
         table_key (str): The key of the table to replace.
         partition_key (str): The attribute to separate the table sections by. Optional.
+        where (str): A WHERE clause to only replace the rows of some partitions.
+            data_to_replace_with must hold the production rows of the same partitions. Optional.
+
+    Returns:
+        int: The number of rows appended, updated or deleted.
     """
-    table_to_replace = query(
-        f"SELECT * FROM {db_to_synid_mapping['staging']}"
-    ).convert_dtypes()
-    table_to_replace_syn_id = table_to_replace[
-        table_to_replace["Database"] == table_key
-    ].Id.values[0]
+    table_to_replace_syn_id = get_table_synid(table_key, "staging")
     data_to_replace = query(
-        f"SELECT * FROM {table_to_replace_syn_id}"
+        f"SELECT * FROM {table_to_replace_syn_id} {where}".strip()
     ).convert_dtypes()
 
-    # create new table for maf tables
-    if table_key == "vcf2maf":
-        today = date.today()
-        table_name = f"Narrow MAF Database - {today}"
-        new_tables = process_functions.create_new_fileformat_table(
-            syn,
-            file_format="vcf2maf",
-            newdb_name=table_name,
-            projectid="syn22033066",
-            archive_projectid="syn22033066",
+    databaseEnt = syn.get(table_to_replace_syn_id)
+    primary_key = (
+        databaseEnt.primaryKey
+        if table_key not in ["validationStatus", "errorTracker"]
+        else ["id"]
+    )
+    # must add partition key into primary keys
+    if partition_key:
+        primary_key += [partition_key]
+
+    load._update_table(
+        syn,
+        database=data_to_replace,
+        new_dataset=data_to_replace_with,
+        database_synid=table_to_replace_syn_id,
+        primary_key_cols=primary_key,
+        to_delete=True,
+    )
+    return count_changed_rows(data_to_replace, data_to_replace_with, primary_key)
+
+
+def create_narrow_maf_table(syn: synapseclient.Synapse) -> str:
+    """
+    Creates a new, empty narrow MAF table in the staging project.
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+    Returns:
+        str: The synapse id of the new table.
+    """
+    today = date.today()
+    table_name = f"Narrow MAF Database - {today}"
+    new_tables = process_functions.create_new_fileformat_table(
+        syn,
+        file_format="vcf2maf",
+        newdb_name=table_name,
+        projectid="syn22033066",
+        archive_projectid="syn22033066",
+    )
+    syn.setPermissions(new_tables["newdb_ent"].id, 3326313, [])
+    return new_tables["newdb_ent"].id
+
+
+def count_rows(table_syn_id: str) -> int:
+    """
+    Counts the rows of a table.
+    Args:
+        table_syn_id (str): The synapse id of the table.
+    Returns:
+        int: The number of rows in the table.
+    """
+    return int(
+        query(
+            f"SELECT COUNT(*) AS row_count FROM {table_syn_id}",
+            include_row_id_and_row_version=False,
+        )["row_count"].iloc[0]
+    )
+
+
+def store_rows_with_retry(
+    table_syn_id: str,
+    rows: pd.DataFrame,
+    rows_before: int,
+    max_retries: int = DEFAULT_BULK_LOAD_MAX_RETRIES,
+) -> None:
+    """
+    Appends rows to a table, retrying with exponential backoff. Each append is
+    a single table transaction, but a request can fail after its transaction
+    committed, so the table is counted after every failed attempt and the rows
+    are only stored again if the table doesn't already have them.
+    Args:
+        table_syn_id (str): The synapse id of the table.
+        rows (pd.DataFrame): The rows to append.
+        rows_before (int): The number of rows in the table before the append.
+        max_retries (int): The number of attempts before the error is raised.
+            Defaults to DEFAULT_BULK_LOAD_MAX_RETRIES.
+    """
+    for attempt in range(1, max_retries + 1):
+        try:
+            Table(id=table_syn_id).store_rows(rows)
+            return
+        except Exception as err:
+            if count_rows(table_syn_id) == rows_before + len(rows):
+                logger.warning(
+                    f"Storing rows in {table_syn_id} failed ({err}), "
+                    "but the rows were committed"
+                )
+                return
+            if attempt == max_retries:
+                raise
+            wait_seconds = 2**attempt
+            logger.warning(
+                f"Storing rows in {table_syn_id} failed ({err}), "
+                f"retrying in {wait_seconds}s (attempt {attempt}/{max_retries})"
+            )
+            time.sleep(wait_seconds)
+
+
+def bulk_load_table(
+    source_syn_id: str,
+    destination_syn_id: str,
+    checkpoint_path: str,
+    batch_size: int = DEFAULT_BULK_LOAD_BATCH_SIZE,
+    max_retries: int = DEFAULT_BULK_LOAD_MAX_RETRIES,
+) -> int:
+    """
+    Streams the rows of the source table into the destination table in batches
+    ordered by ROW_ID, so only one batch is held in memory at a time. The last
+    ROW_ID stored is recorded in the checkpoint after every batch, and an
+    unfinished load with the same checkpoint resumes after it. The checkpoint
+    is marked complete once every row is loaded so a later load starts over.
+    Before resuming, the rows of the destination table are counted so that a
+    batch committed after the last checkpoint was written isn't stored again.
+    Args:
+        source_syn_id (str): The synapse id of the table to copy the rows from.
+        destination_syn_id (str): The synapse id of the table to append the rows to.
+        checkpoint_path (str): The path to the json checkpoint of the load.
+        batch_size (int): The number of rows per batch. Defaults to DEFAULT_BULK_LOAD_BATCH_SIZE.
+        max_retries (int): The number of attempts at storing each batch.
+            Defaults to DEFAULT_BULK_LOAD_MAX_RETRIES.
+    Returns:
+        int: The number of rows in the destination table loaded from the source.
+    """
+    checkpoint = {
+        "source": source_syn_id,
+        "destination": destination_syn_id,
+        "last_row_id": -1,
+        "rows_loaded": 0,
+    }
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r") as checkpoint_file:
+            saved = json.load(checkpoint_file)
+        if not saved.get("complete") and (saved["source"], saved["destination"]) == (
+            source_syn_id,
+            destination_syn_id,
+        ):
+            checkpoint = saved
+            _reconcile_checkpoint(source_syn_id, destination_syn_id, checkpoint)
+            _write_json(checkpoint_path, checkpoint)
+            logger.info(
+                f"Resuming load into {destination_syn_id} "
+                f"after row {checkpoint['last_row_id']}"
+            )
+    total_rows = count_rows(source_syn_id)
+    while True:
+        batch = query(
+            f"SELECT * FROM {source_syn_id} WHERE ROW_ID > {checkpoint['last_row_id']} "
+            f"ORDER BY ROW_ID LIMIT {batch_size}"
+        ).convert_dtypes()
+        if batch.empty:
+            checkpoint["complete"] = True
+            _write_json(checkpoint_path, checkpoint)
+            break
+        store_rows_with_retry(
+            destination_syn_id,
+            batch.drop(columns=["ROW_ID", "ROW_VERSION"]),
+            rows_before=checkpoint["rows_loaded"],
+            max_retries=max_retries,
         )
-        syn.setPermissions(new_tables["newdb_ent"].id, 3326313, [])
-        table_to_replace_syn_id = new_tables["newdb_ent"].id
-        Table(id=table_to_replace_syn_id).store_rows(data_to_replace_with)
-    else:
-        databaseEnt = syn.get(table_to_replace_syn_id)
-        primary_key = (
-            databaseEnt.primaryKey
-            if table_key not in ["validationStatus", "errorTracker"]
-            else ["id"]
+        checkpoint["last_row_id"] = int(batch["ROW_ID"].max())
+        checkpoint["rows_loaded"] += len(batch)
+        _write_json(checkpoint_path, checkpoint)
+        logger.info(
+            f"Loaded {checkpoint['rows_loaded']}/{total_rows} rows "
+            f"({checkpoint['rows_loaded'] / max(total_rows, 1):.0%}) into {destination_syn_id}"
+        )
+    return checkpoint["rows_loaded"]
+
+
+def _reconcile_checkpoint(
+    source_syn_id: str, destination_syn_id: str, checkpoint: Dict[str, Any]
+) -> None:
+    """
+    Advances the checkpoint of a load past the rows the destination table
+    already has. The batch being stored when a load was interrupted may have
+    been committed before the checkpoint was written, and storing it again
+    would duplicate its rows.
+    Args:
+        source_syn_id (str): The synapse id of the table the rows are copied from.
+        destination_syn_id (str): The synapse id of the table the rows are appended to.
+        checkpoint (Dict[str, Any]): The checkpoint of the load, updated in place.
+    """
+    destination_rows = count_rows(destination_syn_id)
+    committed_rows = destination_rows - checkpoint["rows_loaded"]
+    if committed_rows < 0:
+        raise ValueError(
+            f"{destination_syn_id} has {destination_rows} rows, but the checkpoint "
+            f"recorded {checkpoint['rows_loaded']} rows loaded into it"
+        )
+    if committed_rows == 0:
+        return
+    committed = query(
+        f"SELECT * FROM {source_syn_id} WHERE ROW_ID > {checkpoint['last_row_id']} "
+        f"ORDER BY ROW_ID LIMIT {committed_rows}"
+    )
+    if len(committed) != committed_rows:
+        raise ValueError(
+            f"{destination_syn_id} has {committed_rows} more rows than the checkpoint "
+            f"recorded, but {source_syn_id} has only {len(committed)} rows left to load"
+        )
+    checkpoint["last_row_id"] = int(committed["ROW_ID"].max())
+    checkpoint["rows_loaded"] += committed_rows
+    logger.info(
+        f"{committed_rows} rows were already committed to {destination_syn_id}, "
+        f"resuming after row {checkpoint['last_row_id']}"
+    )
+
+
+def load_narrow_maf_table(
+    syn: synapseclient.Synapse,
+    checkpoint_path: str = DEFAULT_BULK_LOAD_CHECKPOINT_PATH,
+    batch_size: int = DEFAULT_BULK_LOAD_BATCH_SIZE,
+) -> int:
+    """
+    Copies the production narrow MAF table into a new staging table. A load
+    interrupted part way through resumes into the table it had already created,
+    while a new table is created once the previous load finished.
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        checkpoint_path (str): The path to the json checkpoint of the load.
+            Defaults to DEFAULT_BULK_LOAD_CHECKPOINT_PATH.
+        batch_size (int): The number of rows per batch. Defaults to DEFAULT_BULK_LOAD_BATCH_SIZE.
+    Returns:
+        int: The number of rows loaded into the new table.
+    """
+    source_syn_id = get_table_synid("vcf2maf", "production")
+    destination_syn_id = None
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r") as checkpoint_file:
+            saved = json.load(checkpoint_file)
+        if not saved.get("complete") and saved["source"] == source_syn_id:
+            destination_syn_id = saved["destination"]
+    if destination_syn_id is None:
+        destination_syn_id = create_narrow_maf_table(syn)
+        # record the new table right away so a failed load doesn't create another one
+        _write_json(
+            checkpoint_path,
+            {
+                "source": source_syn_id,
+                "destination": destination_syn_id,
+                "last_row_id": -1,
+                "rows_loaded": 0,
+            },
+        )
+    return bulk_load_table(
+        source_syn_id,
+        destination_syn_id,
+        checkpoint_path=checkpoint_path,
+        batch_size=batch_size,
+    )
+
+
+def sync_table_incrementally(
+    syn: synapseclient.Synapse,
+    table_key: str,
+    partition_key: Optional[str],
+    sync_state: SyncState,
+) -> Dict[str, Any]:
+    """
+    Syncs only the partitions of a table that changed since the last sync.
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        table_key (str): The key of the table to sync.
+        partition_key (str): The attribute to separate the table sections by. Optional.
+        sync_state (SyncState): The state of the previous syncs, updated once the table is synced.
+    Returns:
+        The partitions that were synced and the number of rows that changed.
+    """
+    production_syn_id = get_table_synid(table_key, "production")
+    staging_syn_id = get_table_synid(table_key, "staging")
+    production = get_partition_signatures(production_syn_id, partition_key)
+    staging = get_partition_signatures(staging_syn_id, partition_key)
+    changed = find_changed_partitions(
+        production, staging, recorded=sync_state.get(table_key)
+    )
+    if not changed:
+        logger.info(f"No partitions of {table_key} changed, skipping")
+        return {"partitions": changed, "rows_changed": 0}
+
+    logger.info(f"Syncing {len(changed)} changed partitions of {table_key}: {changed}")
+    where = (
+        ""
+        if changed == [WHOLE_TABLE_PARTITION]
+        else partition_filter(partition_key, changed)
+    )
+    rows_changed = replace_table(
+        syn,
+        data_to_replace_with=download_table(table_key=table_key, where=where),
+        table_key=table_key,
+        partition_key=partition_key,
+        where=where,
+    )
+    sync_state.update(
+        table_key,
+        production=production,
+        staging=get_partition_signatures(staging_syn_id, partition_key),
+    )
+    return {"partitions": changed, "rows_changed": rows_changed}
+
+
+def sync_table(
+    syn: synapseclient.Synapse,
+    table_key: str,
+    partition_key: Optional[str],
+    sync_state: Optional[SyncState] = None,
+    bulk_load_checkpoint_path: str = DEFAULT_BULK_LOAD_CHECKPOINT_PATH,
+    bulk_load_batch_size: int = DEFAULT_BULK_LOAD_BATCH_SIZE,
+) -> SyncResult:
+    """
+    Syncs a table from production to staging. Errors are caught and returned
+    in the result so one failing table doesn't stop the others.
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        table_key (str): The key of the table to sync.
+        partition_key (str): The attribute to separate the table sections by. Optional.
+        sync_state (SyncState): The state of the previous syncs. The whole table
+            is synced if None. Optional.
+        bulk_load_checkpoint_path (str): The path to the json checkpoint of the narrow
+            MAF table load. Defaults to DEFAULT_BULK_LOAD_CHECKPOINT_PATH.
+        bulk_load_batch_size (int): The number of rows per batch of the narrow MAF
+            table load. Defaults to DEFAULT_BULK_LOAD_BATCH_SIZE.
+    Returns:
+        SyncResult: The outcome of the sync.
+    """
+    logger.info(f"Syncing {table_key}")
+    start = time.perf_counter()
+    try:
+        # the narrow MAF table is copied into a new table instead of being diffed
+        if table_key == "vcf2maf":
+            rows_changed = load_narrow_maf_table(
+                syn,
+                checkpoint_path=bulk_load_checkpoint_path,
+                batch_size=bulk_load_batch_size,
+            )
+            status = "synced"
+        elif sync_state is not None:
+            synced = sync_table_incrementally(
+                syn,
+                table_key=table_key,
+                partition_key=partition_key,
+                sync_state=sync_state,
+            )
+            status = "synced" if synced["partitions"] else "skipped"
+            rows_changed = synced["rows_changed"]
+        else:
+            rows_changed = replace_table(
+                syn,
+                data_to_replace_with=download_table(table_key=table_key),
+                table_key=table_key,
+                partition_key=partition_key,
+            )
+            status = "synced"
+    except Exception as err:
+        logger.exception(f"Failed to sync {table_key}")
+        return SyncResult(
+            table_key=table_key,
+            status="failed",
+            rows_changed=0,
+            elapsed_seconds=round(time.perf_counter() - start, 2),
+            error=f"{type(err).__name__}: {err}",
         )
-        # must add partition key into primary keys
-        if partition_key:
-            primary_key += [partition_key]
-
-        load._update_table(
-            syn,
-            database=data_to_replace,
-            new_dataset=data_to_replace_with,
-            database_synid=table_to_replace_syn_id,
-            primary_key_cols=primary_key,
-            to_delete=True,
+    logger.info(f"Successfully synced {table_key} from production to staging")
+    return SyncResult(
+        table_key=table_key,
+        status=status,
+        rows_changed=rows_changed,
+        elapsed_seconds=round(time.perf_counter() - start, 2),
+    )
+
+
+def sync_tables(
+    syn: synapseclient.Synapse,
+    tables: Dict[str, Optional[str]],
+    sync_state: Optional[SyncState] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    **sync_kwargs: Any,
+) -> List[SyncResult]:
+    """
+    Syncs the tables concurrently in a bounded thread pool. Each table
+    sync is dominated by network I/O and independent of the others.
+    Args:
+        syn (synapseclient.Synapse): synapse client connection
+        tables (Dict[str, Optional[str]]): mapping of the key of each table to sync to its partition key
+        sync_state (SyncState): The state of the previous syncs. Tables are synced in full if None. Optional.
+        max_workers (int): The maximum number of tables synced at the same time.
+            Defaults to DEFAULT_MAX_WORKERS.
+        **sync_kwargs: keyword arguments of `sync_table` shared by all of the
+            tables (e.g: bulk_load_batch_size)
+    Returns:
+        List[SyncResult]: The outcome of each table sync, in the same order as the tables.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                sync_table, syn, table_key, partition_key, sync_state, **sync_kwargs
+            )
+            for table_key, partition_key in tables.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def report_sync_summary(results: List[SyncResult]) -> Dict[str, int]:
+    """
+    Logs which tables synced, how many rows changed and how long each took.
+    Args:
+        results (List[SyncResult]): The outcome of each table sync.
+    Returns:
+        Dict[str, int]: The number of tables with each status.
+    """
+    counts = {"synced": 0, "skipped": 0, "failed": 0}
+    for result in results:
+        counts[result.status] += 1
+        logger.info(
+            f"{result.table_key}: {result.status}, {result.rows_changed} rows changed "
+            f"in {result.elapsed_seconds}s"
+            + (f" ({result.error})" if result.error else "")
         )
+    logger.info(
+        f"Sync summary: {counts['synced']} synced, {counts['skipped']} skipped, "
+        f"{counts['failed']} failed"
+    )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sync tables from the production database to the staging database"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Only sync the partitions of each table that changed since the last "
+            "sync recorded in --state_path"
+        ),
+    )
+    parser.add_argument(
+        "--state_path",
+        type=str,
+        default="sync_state.json",
+        help="Local json file recording the partitions of each table at the last sync",
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="The maximum number of tables synced at the same time",
+    )
+    parser.add_argument(
+        "--mapping_cache_dir",
+        type=str,
+        default=None,
+        help=(
+            "Local directory to cache the database mapping tables in between runs. "
+            "They are only queried again once their etag changes"
+        ),
+    )
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        default=list(tables_to_copy),
+        choices=list(tables_to_copy) + ["vcf2maf"],
+        help=(
+            "The tables to sync. Defaults to every table in tables_to_copy. "
+            "vcf2maf copies the narrow MAF table into a new staging table"
+        ),
+    )
+    parser.add_argument(
+        "--bulk_load_batch_size",
+        type=int,
+        default=DEFAULT_BULK_LOAD_BATCH_SIZE,
+        help="The number of rows streamed into the new narrow MAF table per batch",
+    )
+    parser.add_argument(
+        "--bulk_load_checkpoint_path",
+        type=str,
+        default=DEFAULT_BULK_LOAD_CHECKPOINT_PATH,
+        help=(
+            "Local json file recording the last batch stored in the new narrow MAF table. "
+            "Rerunning a failed load with the same file resumes from that batch"
+        ),
+    )
+    args = parser.parse_args()
 
+    syn = synapseclient.login()
+    syn.table_query_timeout = 50000
+    if args.mapping_cache_dir is not None:
+        database_mapping.use_disk_cache(syn, args.mapping_cache_dir)
+    sync_state = SyncState(args.state_path) if args.incremental else None
 
-for table in tables_to_copy:
-    logger.info(table)
-    data_replace = download_table(table_key=table)
-    replace_table(
-        data_to_replace_with=data_replace,
-        table_key=table,
-        partition_key=tables_to_copy[table]
+    results = sync_tables(
+        syn,
+        tables={table: tables_to_copy.get(table) for table in args.tables},
+        sync_state=sync_state,
+        max_workers=args.max_workers,
+        bulk_load_checkpoint_path=args.bulk_load_checkpoint_path,
+        bulk_load_batch_size=args.bulk_load_batch_size,
     )
-    logger.info(f"Successfully synced {table} from production to staging")
+    counts = report_sync_summary(results)
+    if counts["failed"]:
+        failed = [result.table_key for result in results if result.status == "failed"]
+        raise RuntimeError(f"Failed to sync tables: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import json
+import os
+from unittest import mock
+
+import pandas as pd
+import pytest
+import synapseclient
+
+from scripts.data_guide import release_stats
+
+
+@pytest.fixture
+def syn() -> synapseclient.Synapse:
+    syn = mock.create_autospec(synapseclient.Synapse)
+    with mock.patch.object(syn, "get"), mock.patch.object(
+        syn, "getChildren"
+    ), mock.patch.object(syn, "tableQuery"):
+        yield syn
+
+
+@pytest.fixture
+def assayinfodf() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "SEQ_ASSAY_ID": ["B-1", "A-1", "A-2"],
+            "SEQ_PIPELINE_ID": ["B-1", "A-1", "A-1"],
+            "CENTER": ["B", "A", "A"],
+            "library_selection": ["hybrid_selection", "PCR", "PCR"],
+            "library_strategy": ["Targeted Sequencing"] * 3,
+            "platform": ["Illumina", "Illumina", "Illumina"],
+            "specimen_tumor_cellularity": [">10%", None, None],
+            "coverage": ["coding_exons;introns", "hotspot_regions", "hotspot_regions"],
+            "alteration_types": ["snv;small_indels", "snv", "snv"],
+            "preservation_technique": ["FFPE", None, None],
+            "calling_strategy": ["tumor_only", "tumor_normal", "tumor_normal"],
+            "number_of_genes": ["50", "unknown", "10"],
+            "target_capture_kit": ["kit1", "kit2", "kit2"],
+        }
+    )
+
+
+def test_that_compute_assay_stats_counts_each_pipeline_once(assayinfodf):
+    stats = release_stats.compute_assay_stats(assayinfodf)
+    assert stats["processed_centers"] == ["B", "A"]
+    assert sorted(stats["pipelines_per_center"]) == [["A", 1], ["B", 1]]
+    assert stats["pipeline_counts"]["library_selection"] == [
+        ["hybrid_selection", 1],
+        ["PCR", 1],
+    ]
+    assert stats["pipeline_counts"]["specimen_tumor_cellularity"] == [[">10%", 1]]
+
+
+def test_that_compute_assay_stats_tables_round_trip_through_json(assayinfodf):
+    stats = json.loads(json.dumps(release_stats.compute_assay_stats(assayinfodf)))
+    coverage = release_stats.table_from_json(stats["coverage_per_panel"])
+    pd.testing.assert_frame_equal(
+        coverage,
+        pd.DataFrame(
+            {
+                "hotspot_regions": ["", "X"],
+                "coding_exons": ["X", ""],
+                "introns": ["X", ""],
+                "promoters": ["", ""],
+            },
+            index=["B-1", "A-1"],
+        ),
+    )
+    gene_number_info = release_stats.table_from_json(stats["gene_number_info"])
+    assert gene_number_info["Sequencing Assay"].tolist() == ["A-1", "A-2", "B-1"]
+    number_of_genes = gene_number_info["Number of genes"].astype("Int64")
+    assert number_of_genes.fillna(0).tolist() == [0, 10, 50]
+
+
+def _database_mapping() -> release_stats.DatabaseMapping:
+    return release_stats.DatabaseMapping({"project": "syn2"})
+
+
+def test_that_get_oncotree_link_entity_looks_up_the_database_mapping(syn):
+    mapping = mock.create_autospec(release_stats.DatabaseMapping, instance=True)
+    mapping.get_synid.return_value = "syn9"
+    oncotree_link_ent = release_stats.get_oncotree_link_entity(syn, mapping, "project")
+    mapping.get_synid.assert_called_once_with("oncotreeLink", "project")
+    syn.get.assert_called_once_with("syn9", downloadFile=False)
+    syn.tableQuery.assert_not_called()
+    assert oncotree_link_ent == syn.get.return_value
+
+
+def test_that_extract_release_stats_reuses_bundle_of_unchanged_release(
+    syn, tmp_path
+):
+    stats_path = os.path.join(tmp_path, "release_stats.json")
+    key = {
+        "release_folder_synid": "syn1",
+        "release_folder_etag": "etag1",
+        "database_synid_mappingid": "syn2",
+        "assay_information_etag": "etag2",
+        "center_table_etag": "etag4",
+        "oncotree_link_etag": "etag5",
+    }
+    with open(stats_path, "w") as stats_file:
+        json.dump({"key": key, "stats": {"oncotree_link": "link"}}, stats_file)
+    syn.getChildren.return_value = [{"name": "assay_information.txt", "id": "syn3"}]
+    etags = {
+        "syn1": "etag1",
+        "syn3": "etag2",
+        release_stats.CENTER_TABLE_SYNID: "etag4",
+    }
+    syn.get.side_effect = lambda synid, **kwargs: mock.MagicMock(
+        id=synid, etag=etags[synid]
+    )
+
+    with mock.patch.object(
+        release_stats,
+        "get_oncotree_link_entity",
+        return_value=mock.MagicMock(etag="etag5"),
+    ), mock.patch.object(release_stats, "get_centers") as patch_get_centers:
+        stats = release_stats.extract_release_stats(
+            syn, "syn1", _database_mapping(), "project", stats_path
+        )
+    assert stats == {"oncotree_link": "link"}
+    patch_get_centers.assert_not_called()
+    syn.tableQuery.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "changed_etags",
+    [{"center_table_etag": "etag6"}, {"oncotree_link_etag": "etag6"}],
+    ids=["center_table", "oncotree_link"],
+)
+def test_that_extract_release_stats_recomputes_bundle_of_changed_references(
+    syn, tmp_path, assayinfodf, changed_etags
+):
+    stats_path = os.path.join(tmp_path, "release_stats.json")
+    assay_path = os.path.join(tmp_path, "assay_information.txt")
+    assayinfodf.to_csv(assay_path, sep="\t", index=False)
+    etags = {
+        "release_folder_etag": "etag1",
+        "assay_information_etag": "etag2",
+        "center_table_etag": "etag4",
+        "oncotree_link_etag": "etag5",
+    }
+    key = {"release_folder_synid": "syn1", "database_synid_mappingid": "syn2", **etags}
+    with open(stats_path, "w") as stats_file:
+        json.dump({"key": key, "stats": {"oncotree_link": "old_link"}}, stats_file)
+    etags.update(changed_etags)
+    synid_etags = {
+        "syn1": etags["release_folder_etag"],
+        "syn3": etags["assay_information_etag"],
+        release_stats.CENTER_TABLE_SYNID: etags["center_table_etag"],
+    }
+    syn.getChildren.return_value = [{"name": "assay_information.txt", "id": "syn3"}]
+    syn.get.side_effect = lambda synid, **kwargs: mock.MagicMock(
+        id=synid, etag=synid_etags[synid], versionNumber=1, path=assay_path
+    )
+    oncotree_link_ent = mock.MagicMock(etag=etags["oncotree_link_etag"])
+    oncotree_link_ent.__getitem__.return_value = "new_link"
+
+    with mock.patch.object(
+        release_stats, "get_centers", return_value=pd.DataFrame({"Center": ["A"]})
+    ), mock.patch.object(
+        release_stats, "get_oncotree_link_entity", return_value=oncotree_link_ent
+    ):
+        stats = release_stats.extract_release_stats(
+            syn, "syn1", _database_mapping(), "project", stats_path
+        )
+
+    assert stats["oncotree_link"] == "new_link"
+    bundle = release_stats.load_release_stats(stats_path)
+    assert bundle["key"] == {**key, **changed_etags}
+
+
+def test_that_extract_release_stats_recomputes_bundle_of_changed_release(
+    syn, tmp_path, assayinfodf
+):
+    stats_path = os.path.join(tmp_path, "release_stats.json")
+    assay_path = os.path.join(tmp_path, "assay_information.txt")
+    assayinfodf.to_csv(assay_path, sep="\t", index=False)
+    syn.getChildren.return_value = [{"name": "assay_information.txt", "id": "syn3"}]
+    syn.get.return_value = mock.MagicMock(
+        id="syn3", etag="etag3", versionNumber=1, path=assay_path
+    )
+    oncotree_link_ent = mock.MagicMock(etag="etag5")
+    oncotree_link_ent.__getitem__.return_value = "link"
+
+    with mock.patch.object(
+        release_stats, "get_centers", return_value=pd.DataFrame({"Center": ["A"]})
+    ), mock.patch.object(
+        release_stats, "get_oncotree_link_entity", return_value=oncotree_link_ent
+    ):
+        stats = release_stats.extract_release_stats(
+            syn, "syn1", _database_mapping(), "project", stats_path
+        )
+
+    assert stats["oncotree_link"] == "link"
+    assert stats["processed_centers"] == ["B", "A"]
+    bundle = release_stats.load_release_stats(stats_path)
+    assert bundle["key"]["assay_information_etag"] == "etag3"
+    assert bundle["stats"] == stats
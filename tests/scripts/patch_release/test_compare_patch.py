@@ -0,0 +1,154 @@
+from unittest import mock
+
+import pytest
+import synapseclient
+
+from scripts.patch_release import compare_patch
+
+
+@pytest.fixture
+def syn():
+    return mock.create_autospec(synapseclient.Synapse)
+
+
+def test_that_get_file_dict_gets_metadata_of_all_files(syn):
+    walked = [
+        (("release", "synR"), [("case_lists", "synC")], [("data_CNA.txt", "syn1")]),
+        (("case_lists", "synC"), [], [("cases_all.txt", "syn2")]),
+    ]
+
+    def get_entity(synid, downloadFile):
+        return synapseclient.File(
+            name=synid,
+            parentId="synR",
+            id=synid,
+            versionNumber=1,
+            dataFileHandleId=f"fh_{synid}",
+            md5=f"{synid}_md5",
+            fileSize=10,
+            synapseStore=False,
+        )
+
+    syn.get.side_effect = get_entity
+    with mock.patch.object(compare_patch.synu, "walk", return_value=walked):
+        file_dict = compare_patch._get_file_dict(syn, "synR", max_workers=2)
+    assert file_dict == {
+        "data_CNA.txt": {"id": "syn1", "md5": "syn1_md5", "size": 10},
+        "cases_all.txt": {"id": "syn2", "md5": "syn2_md5", "size": 10},
+    }
+    syn.restGET.assert_not_called()
+
+
+def test_that_compare_file_dicts_reports_added_removed_and_changed():
+    original = {
+        "data_CNA.txt": {"md5": "a"},
+        "data_sv.txt": {"md5": "b"},
+        "data_gene_panel_SAGE-1.txt": {"md5": "c"},
+    }
+    new = {
+        "data_CNA.txt": {"md5": "a"},
+        "data_sv.txt": {"md5": "changed"},
+        "data_gene_panel_SAGE-2.txt": {"md5": "d"},
+    }
+    assert compare_patch.compare_file_dicts(original, new) == {
+        "original_file_count": 3,
+        "new_file_count": 3,
+        "added": ["data_gene_panel_SAGE-2.txt"],
+        "removed": ["data_gene_panel_SAGE-1.txt"],
+        "changed": ["data_sv.txt"],
+    }
+
+
+def _write(tmp_path, name: str, content: str) -> str:
+    """Write content to a file in the given tmp_path and return the file path as a string."""
+    p = tmp_path / name
+    p.write_text(content)
+    return str(p)
+
+
+@pytest.mark.parametrize("bucket_size_mb", [1, 0.000001], ids=["one_bucket", "many_buckets"])
+def test_that_diff_release_file_reports_row_differences(tmp_path, bucket_size_mb):
+    original_path = _write(
+        tmp_path,
+        "original.txt",
+        "#version 2.4\n"
+        "Tumor_Sample_Barcode\tStart_Position\tt_depth\n"
+        "GENIE-A-1\t100\t10\n"
+        "GENIE-A-2\t200\t20\n"
+        "GENIE-A-3\t300\t30\n",
+    )
+    new_path = _write(
+        tmp_path,
+        "new.txt",
+        "#version 2.4\n"
+        "Tumor_Sample_Barcode\tStart_Position\tt_depth\tn_depth\n"
+        "GENIE-A-1\t100\t10\t5\n"
+        "GENIE-A-2\t200\t25\t5\n"
+        "GENIE-A-4\t400\t40\t5\n",
+    )
+    diff = compare_patch.diff_release_file(
+        original_path,
+        new_path,
+        key_columns=["Tumor_Sample_Barcode", "Start_Position"],
+        bucket_size_mb=bucket_size_mb,
+    )
+    assert diff["added_columns"] == ["n_depth"]
+    assert diff["removed_columns"] == []
+    assert diff["original_rows"] == 3
+    assert diff["new_rows"] == 3
+    assert diff["rows_only_in_original"] == 1
+    assert diff["rows_only_in_new"] == 1
+    assert diff["changed_rows"] == 1
+    changed = [row for row in diff["sample_rows"] if row["type"] == "changed"]
+    assert changed == [
+        {
+            "type": "changed",
+            "key": ["GENIE-A-2", "200"],
+            "changed_columns": ["t_depth"],
+            "original": ["GENIE-A-2", "200", "20"],
+            "new": ["GENIE-A-2", "200", "25"],
+        }
+    ]
+
+
+def test_that_diff_release_file_bounds_sample_rows(tmp_path):
+    original_path = _write(
+        tmp_path, "original.txt", "SAMPLE_ID\n" + "".join(f"S{i}\n" for i in range(10))
+    )
+    new_path = _write(tmp_path, "new.txt", "SAMPLE_ID\n")
+    diff = compare_patch.diff_release_file(
+        original_path, new_path, key_columns=["SAMPLE_ID"], max_sample_rows=3
+    )
+    assert diff["rows_only_in_original"] == 10
+    assert len(diff["sample_rows"]) == 3
+
+
+def test_that_diff_release_file_keys_on_all_columns_if_key_missing(tmp_path):
+    original_path = _write(tmp_path, "original.txt", "ID\tchrom\n1\t2\n")
+    new_path = _write(tmp_path, "new.txt", "ID\tchrom\n1\t3\n")
+    diff = compare_patch.diff_release_file(
+        original_path, new_path, key_columns=["ID", "loc.start"]
+    )
+    assert diff["key"] == ["ID", "chrom"]
+    assert diff["rows_only_in_original"] == 1
+    assert diff["rows_only_in_new"] == 1
+    assert diff["changed_rows"] == 0
+
+
+def test_that_diff_changed_files_skips_non_tabular_files(syn):
+    with mock.patch.object(compare_patch, "diff_release_file") as patch_diff:
+        row_diffs = compare_patch.diff_changed_files(
+            syn,
+            {"meta_study.txt": {"id": "syn1"}, "data_CNA.txt": {"id": "syn2"}},
+            {"meta_study.txt": {"id": "syn3"}, "data_CNA.txt": {"id": "syn4"}},
+            changed=["meta_study.txt", "data_CNA.txt"],
+        )
+    assert row_diffs["meta_study.txt"] is None
+    assert row_diffs["data_CNA.txt"] == patch_diff.return_value
+    patch_diff.assert_called_once_with(
+        syn.get.return_value.path,
+        syn.get.return_value.path,
+        key_columns=["Hugo_Symbol"],
+        bucket_size_mb=compare_patch.DEFAULT_BUCKET_SIZE_MB,
+        max_sample_rows=compare_patch.DEFAULT_MAX_SAMPLE_ROWS,
+    )
@@ -0,0 +1,588 @@
+import os
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+import synapseclient
+
+from scripts.patch_release import patch
+
+
+def _write(tmp_path, name: str, content: str) -> str:
+    """Write content to a file in the given tmp_path and return the file path as a string."""
+    p = tmp_path / name
+    p.write_text(content)
+    return str(p)
+
+
+def test_that_filter_tsv_keeps_comment_headers_and_matching_rows(tmp_path):
+    path = _write(
+        tmp_path,
+        "data_mutations_extended.txt",
+        "#version 2.4\n"
+        "Hugo_Symbol\tTumor_Sample_Barcode\tt_depth\n"
+        "TP53\tGENIE-A-1\t10\n"
+        "KRAS\tGENIE-A-2\tNA\n"
+        "EGFR\tGENIE-A-3\t\n",
+    )
+    new_path = str(tmp_path / "new.txt")
+    result = patch._filter_tsv(
+        filepath=path,
+        new_path=new_path,
+        keep_values={"GENIE-A-2", "GENIE-A-3"},
+        column="Tumor_Sample_Barcode",
+    )
+    assert result == new_path
+    with open(new_path) as new_file:
+        assert new_file.read() == (
+            "#version 2.4\n"
+            "Hugo_Symbol\tTumor_Sample_Barcode\tt_depth\n"
+            "KRAS\tGENIE-A-2\tNA\n"
+            "EGFR\tGENIE-A-3\t\n"
+        )
+
+
+def test_that_filter_tsv_filters_on_last_column(tmp_path):
+    path = _write(
+        tmp_path,
+        "genomic_information.txt",
+        "Chromosome\tSEQ_ASSAY_ID\n1\tSAGE-1\n2\tSAGE-2\n",
+    )
+    new_path = str(tmp_path / "new.txt")
+    patch._filter_tsv(
+        filepath=path,
+        new_path=new_path,
+        keep_values={"SAGE-2"},
+        column="SEQ_ASSAY_ID",
+    )
+    with open(new_path) as new_file:
+        assert new_file.read() == "Chromosome\tSEQ_ASSAY_ID\n2\tSAGE-2\n"
+
+
+def test_that_filter_tsv_raises_error_if_column_missing(tmp_path):
+    path = _write(tmp_path, "data_sv.txt", "Sample_Id\tSite1_Hugo_Symbol\n")
+    with pytest.raises(ValueError, match="ID not found in the header"):
+        patch._filter_tsv(
+            filepath=path,
+            new_path=str(tmp_path / "new.txt"),
+            keep_values={"GENIE-A-1"},
+            column="ID",
+        )
+
+
+def test_that_get_tsv_header_skips_comment_lines(tmp_path):
+    path = _write(tmp_path, "data.txt", "#comment\nHugo_Symbol\tGENIE-A-1\n1\t2\n")
+    assert patch._get_tsv_header(path) == ["Hugo_Symbol", "GENIE-A-1"]
+
+
+def test_that_filter_tsv_columns_keeps_values_verbatim(tmp_path):
+    path = _write(
+        tmp_path,
+        "data_CNA.txt",
+        "Hugo_Symbol\tGENIE-A-1\tGENIE-A-2\tGENIE-A-3\n"
+        "TP53\t0.0\tNA\t-2\n"
+        "KRAS\t1.5\t\t2\n",
+    )
+    new_path = str(tmp_path / "new.txt")
+    result = patch._filter_tsv_columns(
+        filepath=path, new_path=new_path, keep_idx=[0, 2, 3]
+    )
+    assert result == new_path
+    with open(new_path) as new_file:
+        assert new_file.read() == (
+            "Hugo_Symbol\tGENIE-A-2\tGENIE-A-3\n" "TP53\tNA\t-2\n" "KRAS\t\t2\n"
+        )
+
+
+def test_that_filter_tsv_columns_handles_single_column(tmp_path):
+    path = _write(tmp_path, "data_CNA.txt", "Hugo_Symbol\tGENIE-A-1\nTP53\t0\n")
+    new_path = str(tmp_path / "new.txt")
+    patch._filter_tsv_columns(filepath=path, new_path=new_path, keep_idx=[0])
+    with open(new_path) as new_file:
+        assert new_file.read() == "Hugo_Symbol\nTP53\n"
+
+
+def test_that_filter_tsv_columns_skips_blank_lines(tmp_path):
+    path = _write(
+        tmp_path,
+        "data_CNA.txt",
+        "Hugo_Symbol\tGENIE-A-1\tGENIE-A-2\n"
+        "TP53\t0\t1\n"
+        "\n"
+        "KRAS\t2\t-1\n"
+        "\n",
+    )
+    new_path = str(tmp_path / "new.txt")
+    patch._filter_tsv_columns(filepath=path, new_path=new_path, keep_idx=[0, 2])
+    with open(new_path) as new_file:
+        assert new_file.read() == "Hugo_Symbol\tGENIE-A-2\nTP53\t1\nKRAS\t-1\n"
+
+
+def test_that_patch_cna_file_reuses_file_if_no_columns_removed(tmp_path):
+    path = _write(
+        tmp_path, "data_CNA.txt", "Hugo_Symbol\tGENIE-A-1\tGENIE-A-2\nTP53\t0\t1\n"
+    )
+    syn = mock.create_autospec(synapseclient.Synapse)
+    cna_ent = mock.Mock(path=path)
+    syn.get.return_value = cna_ent
+    with mock.patch.object(
+        patch, "store_unchanged_file"
+    ) as patch_store_unchanged, mock.patch.object(
+        patch, "store_patched_file"
+    ) as patch_store_patched:
+        result = patch.patch_cna_file(
+            syn=syn,
+            cna_synid="synZZZZ",
+            tempdir=str(tmp_path),
+            new_release_synid="synYYYY",
+            keep_samples={"GENIE-A-1", "GENIE-A-2"},
+        )
+    patch_store_unchanged.assert_called_once_with(
+        syn,
+        str(tmp_path / "data_CNA.txt"),
+        cna_ent,
+        "synYYYY",
+        owner_id=None,
+        checkpoint=None,
+        step=None,
+    )
+    patch_store_patched.assert_not_called()
+    assert result == patch_store_unchanged.return_value
+
+
+def test_that_patch_cna_file_stores_file_if_columns_removed(tmp_path):
+    path = _write(
+        tmp_path, "data_CNA.txt", "Hugo_Symbol\tGENIE-A-1\tGENIE-A-2\nTP53\t0\t1\n"
+    )
+    tempdir = tmp_path / "out"
+    tempdir.mkdir()
+    syn = mock.create_autospec(synapseclient.Synapse)
+    cna_ent = mock.Mock(path=path)
+    syn.get.return_value = cna_ent
+    with mock.patch.object(patch, "store_patched_file") as patch_store_patched:
+        patch.patch_cna_file(
+            syn=syn,
+            cna_synid="synZZZZ",
+            tempdir=str(tempdir),
+            new_release_synid="synYYYY",
+            keep_samples={"GENIE-A-2"},
+        )
+    new_path = str(tempdir / "data_CNA.txt")
+    patch_store_patched.assert_called_once_with(
+        syn, new_path, cna_ent, "synYYYY", owner_id=None, checkpoint=None, step=None
+    )
+    with open(new_path) as new_file:
+        assert new_file.read() == "Hugo_Symbol\tGENIE-A-2\nTP53\t1\n"
+
+
+@pytest.mark.parametrize(
+    "source_md5, expected_status",
+    [
+        ("e1faffb3e614e6c2fba74296962386b7", "linked"),
+        ("d41d8cd98f00b204e9800998ecf8427e", "rewritten"),
+    ],
+    ids=["same_md5", "different_md5"],
+)
+def test_that_store_patched_file_only_uploads_changed_files(
+    tmp_path, source_md5, expected_status
+):
+    # md5 of "AAA"
+    path = _write(tmp_path, "meta_study.txt", "AAA")
+    syn = mock.create_autospec(synapseclient.Synapse)
+    source_ent = mock.Mock(md5=source_md5)
+    unchanged_result = patch.PatchResult(
+        path=path, status="linked", entity=mock.Mock()
+    )
+    with mock.patch.object(
+        patch, "store_unchanged_file", return_value=unchanged_result
+    ) as patch_store_unchanged, mock.patch.object(
+        patch, "store_file"
+    ) as patch_store_file:
+        result = patch.store_patched_file(syn, path, source_ent, "synYYYY")
+    assert result.status == expected_status
+    if expected_status == "linked":
+        patch_store_unchanged.assert_called_once_with(
+            syn, path, source_ent, "synYYYY", owner_id=None
+        )
+        patch_store_file.assert_not_called()
+    else:
+        patch_store_unchanged.assert_not_called()
+        patch_store_file.assert_called_once_with(syn, path, "synYYYY")
+
+
+def test_that_store_patched_file_uploads_file_without_source(tmp_path):
+    path = _write(tmp_path, "cases_all.txt", "AAA")
+    syn = mock.create_autospec(synapseclient.Synapse)
+    with mock.patch.object(patch, "store_file") as patch_store_file:
+        result = patch.store_patched_file(syn, path, None, "synYYYY")
+    assert result.status == "rewritten"
+    patch_store_file.assert_called_once_with(syn, path, "synYYYY")
+
+
+@pytest.mark.parametrize(
+    "created_by, expected_status, expected_file_handle_id",
+    [("1111", "linked", "fh1"), ("2222", "copied", "fh2")],
+    ids=["own_file_handle", "other_users_file_handle"],
+)
+def test_that_store_unchanged_file_reuses_or_copies_file_handle(
+    created_by, expected_status, expected_file_handle_id
+):
+    syn = mock.create_autospec(synapseclient.Synapse)
+    syn.store.side_effect = lambda entity: entity
+    source_ent = mock.Mock(id="syn1", versionNumber=2)
+    file_handle = {
+        "id": "fh1",
+        "createdBy": created_by,
+        "contentType": "text/plain",
+        "fileName": "data_gene_panel_SAGE-1.txt",
+    }
+    with mock.patch.object(
+        patch, "get_data_file_handle", return_value=file_handle
+    ), mock.patch.object(
+        patch.synu,
+        "copyFileHandles",
+        return_value=[{"newFileHandle": {"id": "fh2"}}],
+    ) as patch_copy_file_handles:
+        result = patch.store_unchanged_file(
+            syn,
+            "temp/data_gene_panel_SAGE-1.txt",
+            source_ent,
+            "synYYYY",
+            owner_id="1111",
+        )
+    syn.getUserProfile.assert_not_called()
+    assert result.status == expected_status
+    assert result.entity.dataFileHandleId == expected_file_handle_id
+    assert result.entity.name == "data_gene_panel_SAGE-1.txt"
+    assert result.entity.parentId == "synYYYY"
+    assert patch_copy_file_handles.called == (expected_status == "copied")
+
+
+def test_that_get_data_file_handle_skips_preview_file_handle():
+    syn = mock.create_autospec(synapseclient.Synapse)
+    syn.restGET.return_value = {
+        "list": [
+            {"id": "fh2", "concreteType": "PreviewFileHandle"},
+            {"id": "fh1", "concreteType": "S3FileHandle"},
+        ]
+    }
+    entity = mock.Mock(id="syn1", versionNumber=2, dataFileHandleId="fh1")
+    file_handle = patch.get_data_file_handle(syn, entity)
+    syn.restGET.assert_called_once_with("/entity/syn1/version/2/filehandles")
+    assert file_handle["id"] == "fh1"
+
+
+def test_that_store_unchanged_file_raises_error_on_copy_failure():
+    syn = mock.create_autospec(synapseclient.Synapse)
+    syn.getUserProfile.return_value = mock.Mock(ownerId="1111")
+    file_handle = {
+        "id": "fh1",
+        "createdBy": "2222",
+        "contentType": "text/plain",
+        "fileName": "data_gene_panel_SAGE-1.txt",
+    }
+    with mock.patch.object(
+        patch, "get_data_file_handle", return_value=file_handle
+    ), mock.patch.object(
+        patch.synu,
+        "copyFileHandles",
+        return_value=[{"failureCode": "UNAUTHORIZED", "originalFileHandleId": "fh1"}],
+    ), pytest.raises(
+        ValueError, match="UNAUTHORIZED dataFileHandleId: fh1"
+    ):
+        patch.store_unchanged_file(
+            syn, "data_gene_panel_SAGE-1.txt", mock.Mock(), "synYYYY"
+        )
+
+
+def test_that_report_patch_stats_counts_each_status():
+    results = [
+        patch.PatchResult(path="a", status="linked", entity=None),
+        patch.PatchResult(path="b", status="rewritten", entity=None),
+        patch.PatchResult(path="c", status="rewritten", entity=None),
+    ]
+    assert patch.report_patch_stats(results) == {
+        "linked": 1,
+        "copied": 0,
+        "rewritten": 2,
+    }
+
+
+def test_that_run_concurrently_returns_results_in_task_order():
+    tasks = [lambda value=value: value * 2 for value in range(20)]
+    assert patch._run_concurrently(tasks, max_workers=4) == [
+        value * 2 for value in range(20)
+    ]
+
+
+def test_that_download_entities_maps_synids_to_entities():
+    syn = mock.create_autospec(synapseclient.Synapse)
+    syn.get.side_effect = lambda synid, followLink: f"{synid}_entity"
+    result = patch.download_entities(syn, ["syn1", "syn2"], max_workers=2)
+    assert result == {"syn1": "syn1_entity", "syn2": "syn2_entity"}
+
+
+def test_that_patch_gene_panel_and_meta_files_patches_expected_files():
+    syn = mock.create_autospec(synapseclient.Synapse)
+    file_mapping = {
+        "data_gene_panel_SAGE-1.txt": "syn1",
+        "data_gene_panel_SAGE-2.txt": "syn2",
+        "meta_study.txt": "syn3",
+        "genie_private_meta_cna_hg19_seg.txt": "syn4",
+        "data_CNA.txt": "syn5",
+    }
+    with mock.patch.object(
+        patch, "_patch_gene_panel_file"
+    ) as patch_gene_panel, mock.patch.object(
+        patch, "_patch_meta_file"
+    ) as patch_meta:
+        patch.patch_gene_panel_and_meta_files(
+            syn=syn,
+            file_mapping=file_mapping,
+            tempdir="temp",
+            new_release_synid="synYYYY",
+            keep_seq_assay_id={"SAGE-1"},
+            old_release="15.4-consortium",
+            new_release="15.6-consortium",
+        )
+    patch_gene_panel.assert_called_once_with(
+        syn=syn,
+        synid="syn1",
+        tempdir="temp",
+        new_release_synid="synYYYY",
+        owner_id=None,
+        checkpoint=None,
+        step=None,
+    )
+    assert sorted(call.kwargs["synid"] for call in patch_meta.call_args_list) == [
+        "syn3",
+        "syn4",
+    ]
+
+
+def test_that_patch_gene_panel_and_meta_files_copies_kept_gene_panels():
+    file_mapping = {
+        "data_gene_panel_SAGE-1.txt": "syn1",
+        "data_gene_panel_SAGE-2.txt": "syn2",
+        "meta_clinical_sample.txt": "syn3",
+    }
+    with mock.patch.object(
+        patch, "_patch_gene_panel_file", side_effect=lambda synid, **kwargs: synid
+    ) as patch_gene_panel, mock.patch.object(
+        patch, "_patch_meta_file", side_effect=lambda synid, **kwargs: synid
+    ):
+        results = patch.patch_gene_panel_and_meta_files(
+            syn=mock.Mock(),
+            file_mapping=file_mapping,
+            tempdir="tmp",
+            new_release_synid="syn4",
+            keep_seq_assay_id=frozenset(["SAGE-1"]),
+            old_release="17.0-public",
+            new_release="17.1-public",
+        )
+    # SAGE-2 has no samples left in the release, so its gene panel is dropped
+    assert patch_gene_panel.call_count == 1
+    assert sorted(results) == ["syn1", "syn3"]
+
+
+@pytest.fixture
+def sampledf():
+    return pd.DataFrame(
+        {
+            "SAMPLE_ID": ["GENIE-A-1-1", "GENIE-A-1-2", "GENIE-B-2-1", "GENIE-C-3-1"],
+            "PATIENT_ID": ["GENIE-A-1", "GENIE-A-1", "GENIE-B-2", "GENIE-C-3"],
+            "SEQ_ASSAY_ID": ["A-1", "A-2", "B-1", "C-1"],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "retracted_samples, remove_centers, remove_seq_assay_ids, expected_samples, expected_patients, expected_seq_assay_ids",
+    [
+        (
+            ["GENIE-A-1-1"],
+            None,
+            None,
+            {"GENIE-A-1-2", "GENIE-B-2-1", "GENIE-C-3-1"},
+            {"GENIE-A-1", "GENIE-B-2", "GENIE-C-3"},
+            {"A-2", "B-1", "C-1"},
+        ),
+        (
+            [],
+            ["B"],
+            None,
+            {"GENIE-A-1-1", "GENIE-A-1-2", "GENIE-C-3-1"},
+            {"GENIE-A-1", "GENIE-C-3"},
+            {"A-1", "A-2", "C-1"},
+        ),
+        (
+            ["GENIE-C-3-1"],
+            None,
+            ["A-1", "A-2"],
+            {"GENIE-B-2-1"},
+            {"GENIE-B-2"},
+            {"B-1"},
+        ),
+    ],
+    ids=["retracted_samples", "remove_centers", "remove_seq_assay_ids"],
+)
+def test_that_retraction_index_from_sample_df_keeps_expected_values(
+    sampledf,
+    retracted_samples,
+    remove_centers,
+    remove_seq_assay_ids,
+    expected_samples,
+    expected_patients,
+    expected_seq_assay_ids,
+):
+    retraction_index = patch.RetractionIndex.from_sample_df(
+        sampledf,
+        retracted_samples=retracted_samples,
+        remove_centers=remove_centers,
+        remove_seq_assay_ids=remove_seq_assay_ids,
+    )
+    assert retraction_index.keep_samples == expected_samples
+    assert retraction_index.keep_patients == expected_patients
+    assert retraction_index.keep_seq_assay_ids == expected_seq_assay_ids
+
+
+def test_that_retraction_index_bulk_membership_returns_mask(sampledf):
+    retraction_index = patch.RetractionIndex.from_sample_df(
+        sampledf, retracted_samples=["GENIE-A-1-1"]
+    )
+    assert retraction_index.is_kept_sample(
+        np.array(["GENIE-A-1-1", "GENIE-B-2-1", "GENIE-Z-1-1"])
+    ).tolist() == [False, True, False]
+    assert retraction_index.is_kept_patient(
+        pd.Series(["GENIE-A-1", "GENIE-Z-1"])
+    ).tolist() == [True, False]
+    assert retraction_index.is_kept_seq_assay_id(["A-1", "A-2"]).tolist() == [
+        False,
+        True,
+    ]
+
+
+def test_that_retraction_index_fingerprint_depends_on_kept_values():
+    retraction_index = patch.RetractionIndex(["S1", "S2"], ["P1"], ["A-1"])
+    same_index = patch.RetractionIndex(["S2", "S1"], ["P1"], ["A-1"])
+    other_index = patch.RetractionIndex(["S1"], ["P1"], ["A-1"])
+    assert retraction_index.fingerprint() == same_index.fingerprint()
+    assert retraction_index.fingerprint() != other_index.fingerprint()
+
+
+def _patch_result(path: str, synid: str = "syn1") -> patch.PatchResult:
+    return patch.PatchResult(path=path, status="rewritten", entity=mock.Mock(id=synid))
+
+
+def test_that_run_checkpointed_step_skips_completed_step(tmp_path):
+    output_path = _write(tmp_path, "data_sv.txt", "Sample_Id\nGENIE-A-1\n")
+    manifest_path = str(tmp_path / "checkpoint.json")
+    syn = mock.create_autospec(synapseclient.Synapse)
+    task = mock.Mock(return_value=_patch_result(output_path))
+    checkpoint = patch.PatchCheckpoint(syn, manifest_path, run_inputs={"run": "1"})
+    results = patch.run_checkpointed_step(
+        checkpoint, step="data_sv.txt", inputs={"id": "syn1"}, task=task
+    )
+    assert [result.path for result in results] == [output_path]
+
+    # A new run with the same checkpoint does not rerun the task
+    rerun_task = mock.Mock()
+    rerun_checkpoint = patch.PatchCheckpoint(
+        syn, manifest_path, run_inputs={"run": "1"}
+    )
+    results = patch.run_checkpointed_step(
+        rerun_checkpoint, step="data_sv.txt", inputs={"id": "syn1"}, task=rerun_task
+    )
+    rerun_task.assert_not_called()
+    syn.get.assert_called_once_with("syn1", downloadFile=False)
+    assert results == [
+        patch.PatchResult(
+            path=output_path, status="rewritten", entity=syn.get.return_value
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "run_inputs, step_inputs, modify_output",
+    [
+        ({"run": "2"}, {"id": "syn1"}, False),
+        ({"run": "1"}, {"id": "syn2"}, False),
+        ({"run": "1"}, {"id": "syn1"}, True),
+    ],
+    ids=["run_inputs_changed", "step_inputs_changed", "output_changed"],
+)
+def test_that_run_checkpointed_step_reruns_stale_step(
+    tmp_path, run_inputs, step_inputs, modify_output
+):
+    output_path = _write(tmp_path, "data_sv.txt", "Sample_Id\nGENIE-A-1\n")
+    manifest_path = str(tmp_path / "checkpoint.json")
+    syn = mock.create_autospec(synapseclient.Synapse)
+    checkpoint = patch.PatchCheckpoint(syn, manifest_path, run_inputs={"run": "1"})
+    checkpoint.complete("data_sv.txt", {"id": "syn1"}, [_patch_result(output_path)])
+    if modify_output:
+        _write(tmp_path, "data_sv.txt", "Sample_Id\n")
+
+    rerun_task = mock.Mock(return_value=_patch_result(output_path, "syn3"))
+    rerun_checkpoint = patch.PatchCheckpoint(syn, manifest_path, run_inputs=run_inputs)
+    patch.run_checkpointed_step(
+        rerun_checkpoint, step="data_sv.txt", inputs=step_inputs, task=rerun_task
+    )
+    rerun_task.assert_called_once_with()
+
+
+def test_that_run_checkpointed_step_runs_task_without_checkpoint():
+    task = mock.Mock(return_value=[_patch_result("a"), _patch_result("b")])
+    results = patch.run_checkpointed_step(
+        None, step="case_lists", inputs={}, task=task
+    )
+    task.assert_called_once_with()
+    assert [result.path for result in results] == ["a", "b"]
+
+
+@pytest.mark.parametrize(
+    "modify_stored_file, expected_stored",
+    [(False, ["cases_B.txt"]), (True, ["cases_A.txt", "cases_B.txt"])],
+    ids=["stored_file_unchanged", "stored_file_changed"],
+)
+def test_that_store_patched_file_skips_files_stored_by_previous_run(
+    tmp_path, modify_stored_file, expected_stored
+):
+    path_a = _write(tmp_path, "cases_A.txt", "AAA")
+    path_b = _write(tmp_path, "cases_B.txt", "BBB")
+    manifest_path = str(tmp_path / "checkpoint.json")
+    syn = mock.create_autospec(synapseclient.Synapse)
+    checkpoint = patch.PatchCheckpoint(syn, manifest_path, run_inputs={"run": "1"})
+    checkpoint.start("case_lists", {"id": "syn1"})
+    # The previous run failed after storing the first file of the step
+    with mock.patch.object(patch, "store_file", return_value=mock.Mock(id="syn10")):
+        patch.store_patched_file(
+            syn, path_a, None, "synYYYY", checkpoint=checkpoint, step="case_lists"
+        )
+    if modify_stored_file:
+        _write(tmp_path, "cases_A.txt", "CCC")
+
+    rerun_checkpoint = patch.PatchCheckpoint(
+        syn, manifest_path, run_inputs={"run": "1"}
+    )
+    rerun_checkpoint.start("case_lists", {"id": "syn1"})
+    with mock.patch.object(
+        patch, "store_file", return_value=mock.Mock(id="syn11")
+    ) as patch_store_file:
+        results = [
+            patch.store_patched_file(
+                syn,
+                path,
+                None,
+                "synYYYY",
+                checkpoint=rerun_checkpoint,
+                step="case_lists",
+            )
+            for path in [path_a, path_b]
+        ]
+    assert [
+        os.path.basename(call.args[1]) for call in patch_store_file.call_args_list
+    ] == expected_stored
+    if not modify_stored_file:
+        syn.get.assert_called_once_with("syn10", downloadFile=False)
+        assert results[0].entity == syn.get.return_value
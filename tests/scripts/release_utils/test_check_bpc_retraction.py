@@ -0,0 +1,71 @@
+import os
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+import synapseclient
+
+from scripts.release_utils import check_bpc_retraction
+
+
+@pytest.fixture
+def syn() -> synapseclient.Synapse:
+    syn = mock.create_autospec(synapseclient.Synapse)
+    with mock.patch.object(syn, "get"), mock.patch.object(syn, "tableQuery"):
+        yield syn
+
+
+def test_that_get_sample_ids_reuses_cached_sample_ids_of_unchanged_table(syn):
+    syn.get.return_value = mock.MagicMock(etag="etag1")
+    cached = np.array(["S1", "S2"])
+    etag, sample_ids = check_bpc_retraction.get_sample_ids(
+        syn, "select SAMPLE_ID from syn1", "syn1", "etag1", cached
+    )
+    assert etag == "etag1"
+    assert sample_ids is cached
+    syn.tableQuery.assert_not_called()
+
+
+def test_that_get_sample_ids_queries_changed_table(syn):
+    syn.get.return_value = mock.MagicMock(etag="etag2")
+    syn.tableQuery.return_value.asDataFrame.return_value = pd.DataFrame(
+        {"SAMPLE_ID": ["S2", "S1", "S2", None]}
+    )
+    etag, sample_ids = check_bpc_retraction.get_sample_ids(
+        syn, "select SAMPLE_ID from syn1", "syn1", "etag1", np.array(["S1"])
+    )
+    assert etag == "etag2"
+    np.testing.assert_array_equal(sample_ids, ["S1", "S2"])
+    syn.tableQuery.assert_called_once_with(
+        "select SAMPLE_ID from syn1", includeRowIdAndRowVersion=False
+    )
+
+
+def test_that_find_retractions_only_returns_new_retractions_as_new():
+    retracted, new_retracted = check_bpc_retraction.find_retractions(
+        bpc_sample_ids=np.array(["S1", "S2", "S3", "S4"]),
+        genie_sample_ids=np.array(["S1", "S4", "S5"]),
+        reported_sample_ids=np.array(["S2"]),
+    )
+    np.testing.assert_array_equal(retracted, ["S2", "S3"])
+    np.testing.assert_array_equal(new_retracted, ["S3"])
+
+
+def test_that_state_round_trips(tmp_path):
+    state_path = os.path.join(tmp_path, "state.npz")
+    assert check_bpc_retraction.load_state(state_path)["bpc_etag"] == ""
+    state = {
+        "bpc_etag": "etag1",
+        "bpc_sample_ids": np.array(["S1", "S2"]),
+        "genie_etag": "etag2",
+        "genie_sample_ids": np.array(["S1"]),
+        "reported_sample_ids": np.array(["S2"]),
+    }
+    check_bpc_retraction.save_state(state_path, state)
+    loaded = check_bpc_retraction.load_state(state_path)
+    assert loaded["bpc_etag"] == "etag1"
+    assert loaded["genie_etag"] == "etag2"
+    np.testing.assert_array_equal(loaded["bpc_sample_ids"], ["S1", "S2"])
+    np.testing.assert_array_equal(loaded["reported_sample_ids"], ["S2"])
+    assert os.listdir(tmp_path) == ["state.npz"]
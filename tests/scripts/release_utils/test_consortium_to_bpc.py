@@ -43,10 +43,16 @@ def test_that_find_release_raises_error_if_empty_release_table(syn):
         patch_table_query.return_value = table_mock
 
         with mock.patch.object(
-            table_mock, "asDataFrame", return_value=pd.DataFrame()
+            table_mock,
+            "asDataFrame",
+            return_value=pd.DataFrame({"release": [], "parentId": []}),
         ), pytest.raises(ValueError, match="Please specify correct release value"):
             to_bpc.find_release(
-                syn, release="TEST", release_table_synid="synZZZZ", test=False
+                syn,
+                release="TEST",
+                release_table_synid="syn1234",
+                test=False,
+                resolver=to_bpc.ReleaseResolver(syn),
             )
 
 
@@ -56,13 +62,22 @@ def test_that_find_release_does_expected_calls_if_test_false(syn):
         patch_table_query.return_value = table_mock
 
         with mock.patch.object(
-            table_mock, "asDataFrame", return_value=pd.DataFrame({"col1": ["synYYYY"]})
+            table_mock,
+            "asDataFrame",
+            return_value=pd.DataFrame(
+                {"release": ["TEST", "OTHER"], "parentId": ["synYYYY", "synXXXX"]}
+            ),
         ):
             release_synid = to_bpc.find_release(
-                syn, release="TEST", release_table_synid="synZZZZ", test=False
+                syn,
+                release="TEST",
+                release_table_synid="syn1234",
+                test=False,
+                resolver=to_bpc.ReleaseResolver(syn),
             )
             patch_table_query.assert_called_once_with(
-                "select distinct(parentId) from synZZZZ where release = 'TEST'"
+                "SELECT DISTINCT release, parentId FROM syn1234",
+                includeRowIdAndRowVersion=False,
             )
             assert release_synid == "synYYYY"
 
@@ -74,3 +89,240 @@ def test_that_find_release_does_expected_calls_if_test_true(syn):
         )
         patch_table_query.assert_not_called()
         assert release_synid == "synZZZZ"
+
+
+def _copy_source(synid, created_by="1", destination_id="synDEST"):
+    entity = synapseclient.File(
+        name=f"{synid}.txt", parentId="synSRC", id=synid, versionNumber=1
+    )
+    file_handle = {
+        "id": f"fh_{synid}",
+        "createdBy": created_by,
+        "contentType": "text/plain",
+        "fileName": f"{synid}.txt",
+    }
+    return to_bpc.CopySource(
+        entity=entity, file_handle=file_handle, destination_id=destination_id
+    )
+
+
+def _file_entity(synid, parent_id="synSRC"):
+    return synapseclient.File(
+        name=f"{synid}.txt",
+        parentId=parent_id,
+        id=synid,
+        versionNumber=1,
+        dataFileHandleId=f"fh_{synid}",
+    )
+
+
+def _file_handles(uri):
+    """Answers the file handle requests of a file made with _file_entity"""
+    synid = uri.split("/")[2]
+    return {"list": [{"id": f"preview_{synid}"}, {"id": f"fh_{synid}"}]}
+
+
+def test_that_gather_copy_sources_skips_files_without_download_permission(syn):
+    with mock.patch.object(
+        syn, "get", side_effect=lambda synid, **kwargs: _file_entity(synid)
+    ), mock.patch.object(
+        syn,
+        "restGET",
+        side_effect=lambda uri: _file_handles(uri)
+        if uri.endswith("/filehandles")
+        else {"canDownload": uri == "/entity/syn1/permissions"},
+    ) as patch_rest_get, mock.patch.object(
+        syn, "logger", create=True
+    ):
+        sources = to_bpc.gather_copy_sources(
+            syn, [("syn1", "synDEST"), ("syn2", "synDEST")]
+        )
+    # the files are gathered concurrently
+    assert sorted(call.args[0] for call in patch_rest_get.call_args_list) == [
+        "/entity/syn1/permissions",
+        "/entity/syn1/version/1/filehandles",
+        "/entity/syn2/permissions",
+    ]
+    assert len(sources) == 1
+    assert sources[0].entity.id == "syn1"
+    assert sources[0].file_handle["id"] == "fh_syn1"
+    assert sources[0].destination_id == "synDEST"
+
+
+def test_that_get_destination_files_gets_file_handles_of_each_folder(syn):
+    with mock.patch.object(
+        syn,
+        "getChildren",
+        side_effect=lambda folder_id, **kwargs: [
+            {"id": f"{folder_id}_file", "name": "data_clinical.txt"}
+        ],
+    ), mock.patch.object(
+        syn, "get", side_effect=lambda synid, **kwargs: _file_entity(synid)
+    ) as patch_get, mock.patch.object(
+        syn, "restGET", side_effect=_file_handles
+    ) as patch_rest_get:
+        destination_files = to_bpc.get_destination_files(syn, ["synA", None])
+    patch_get.assert_called_once_with("synA_file", downloadFile=False)
+    patch_rest_get.assert_called_once_with("/entity/synA_file/version/1/filehandles")
+    assert list(destination_files) == ["synA", None]
+    assert destination_files[None] == {}
+    existing = destination_files["synA"]["data_clinical.txt"]
+    assert existing["id"] == "synA_file"
+    assert existing["file_handle"]["id"] == "fh_synA_file"
+
+
+def test_that_copy_file_handles_reuses_own_file_handles_and_batches_copies(syn):
+    sources = [_copy_source("syn1", created_by="owner")] + [
+        _copy_source(f"syn{i}") for i in range(2, 5)
+    ]
+    with mock.patch.object(
+        syn, "getUserProfile", return_value=mock.MagicMock(ownerId="owner")
+    ), mock.patch.object(to_bpc, "FILE_HANDLE_COPY_BATCH_SIZE", 2), mock.patch.object(
+        to_bpc.synu.copy_functions,
+        "copyFileHandles",
+        side_effect=lambda syn, file_handles, *args: [
+            {"newFileHandle": {"id": f"new_{fh['id']}"}} for fh in file_handles
+        ],
+    ) as patch_copy:
+        file_handle_ids = to_bpc.copy_file_handles(syn, sources)
+    assert file_handle_ids == ["fh_syn1", "new_fh_syn2", "new_fh_syn3", "new_fh_syn4"]
+    assert patch_copy.call_count == 2
+
+
+def test_that_copy_file_handles_raises_error_on_failed_copy(syn):
+    with mock.patch.object(
+        syn, "getUserProfile", return_value=mock.MagicMock(ownerId="owner")
+    ), mock.patch.object(
+        to_bpc.synu.copy_functions,
+        "copyFileHandles",
+        return_value=[
+            {"failureCode": "UNAUTHORIZED", "originalFileHandleId": "fh_syn1"}
+        ],
+    ), pytest.raises(
+        ValueError, match="UNAUTHORIZED dataFileHandleId: fh_syn1"
+    ):
+        to_bpc.copy_file_handles(syn, [_copy_source("syn1")])
+
+
+def _plan_operation(action, source, existing_id=None):
+    return to_bpc.SyncOperation(
+        action=action,
+        name=source.entity.name,
+        folder_id=source.destination_id,
+        source=source,
+        existing_id=existing_id,
+    )
+
+
+def test_that_plan_sync_compares_files_by_name_and_content():
+    sources = [
+        _copy_source("syn1"),
+        _copy_source("syn2"),
+        _copy_source("syn3"),
+        _copy_source("syn4"),
+    ]
+    sources[2].file_handle["contentMd5"] = "abc"
+    destination_files = {
+        "synDEST": {
+            # same file handle
+            "syn1.txt": {"id": "synA", "file_handle": {"id": "fh_syn1"}},
+            # changed content
+            "syn2.txt": {
+                "id": "synB",
+                "file_handle": {"id": "fh_other", "contentMd5": "def"},
+            },
+            # same content in a copied file handle
+            "syn3.txt": {
+                "id": "synC",
+                "file_handle": {"id": "fh_copy", "contentMd5": "abc"},
+            },
+        }
+    }
+    plan = to_bpc.plan_sync(sources, destination_files, release_names={})
+    assert plan == [
+        _plan_operation(to_bpc.SyncAction.UNCHANGED, sources[0], "synA"),
+        _plan_operation(to_bpc.SyncAction.UPDATE, sources[1], "synB"),
+        _plan_operation(to_bpc.SyncAction.UNCHANGED, sources[2], "synC"),
+        _plan_operation(to_bpc.SyncAction.CREATE, sources[3]),
+    ]
+
+
+def test_that_plan_sync_only_deletes_stale_files_in_pruned_folders():
+    sources = [_copy_source("syn1"), _copy_source("syn2", destination_id="synDEST2")]
+    destination_files = {
+        "synDEST": {"stale.txt": {"id": "synA", "file_handle": {"id": "fh_a"}}},
+        "synDEST2": {
+            "syn2.txt": {"id": "synB", "file_handle": {"id": "fh_syn2"}},
+            "stale.txt": {"id": "synC", "file_handle": {"id": "fh_c"}},
+        },
+    }
+    plan = to_bpc.plan_sync(
+        sources, destination_files, release_names={"synDEST2": {"syn2.txt"}}
+    )
+    deletes = [op for op in plan if op.action == to_bpc.SyncAction.DELETE]
+    assert deletes == [
+        to_bpc.SyncOperation(
+            action=to_bpc.SyncAction.DELETE,
+            name="stale.txt",
+            folder_id="synDEST2",
+            source=None,
+            existing_id="synC",
+        )
+    ]
+
+
+def test_that_plan_sync_keeps_released_files_that_were_not_copied():
+    # syn3.txt is still released but was skipped for lacking download permission
+    sources = [_copy_source("syn2", destination_id="synDEST2")]
+    destination_files = {
+        "synDEST2": {
+            "syn2.txt": {"id": "synB", "file_handle": {"id": "fh_syn2"}},
+            "syn3.txt": {"id": "synC", "file_handle": {"id": "fh_syn3"}},
+        },
+    }
+    plan = to_bpc.plan_sync(
+        sources,
+        destination_files,
+        release_names={"synDEST2": {"syn2.txt", "syn3.txt"}},
+    )
+    assert plan == [_plan_operation(to_bpc.SyncAction.UNCHANGED, sources[0], "synB")]
+
+
+def test_that_apply_sync_plan_only_copies_and_deletes_planned_files(syn):
+    sources = [
+        _copy_source("syn1"),
+        _copy_source("syn2", destination_id="synDEST2"),
+        _copy_source("syn3"),
+    ]
+    plan = [
+        _plan_operation(to_bpc.SyncAction.CREATE, sources[0]),
+        _plan_operation(to_bpc.SyncAction.UPDATE, sources[1], "synB"),
+        _plan_operation(to_bpc.SyncAction.UNCHANGED, sources[2], "synC"),
+        to_bpc.SyncOperation(
+            action=to_bpc.SyncAction.DELETE,
+            name="stale.txt",
+            folder_id="synDEST",
+            source=None,
+            existing_id="synD",
+        ),
+    ]
+    with mock.patch.object(
+        to_bpc, "copy_file_handles", return_value=["new_fh_syn1", "new_fh_syn2"]
+    ) as patch_copy, mock.patch.object(
+        syn,
+        "store",
+        side_effect=lambda ent, activity: mock.MagicMock(
+            id=ent.dataFileHandleId.replace("new_fh_syn", "synCOPY")
+        ),
+    ) as patch_store, mock.patch.object(
+        syn, "delete"
+    ) as patch_delete, mock.patch.object(
+        syn, "logger", create=True
+    ):
+        mapping = to_bpc.apply_sync_plan(syn, plan, max_workers=1)
+    assert mapping == {"syn1": "synCOPY1", "syn2": "synCOPY2"}
+    patch_copy.assert_called_once_with(syn, sources[:2], max_workers=1)
+    stored = [call.args[0] for call in patch_store.call_args_list]
+    assert [ent.parentId for ent in stored] == ["synDEST", "synDEST2"]
+    assert [ent.name for ent in stored] == ["syn1.txt", "syn2.txt"]
+    patch_delete.assert_called_once_with("synD")
@@ -0,0 +1,60 @@
+from unittest import mock
+
+import pandas as pd
+import pytest
+import synapseclient
+
+from scripts.shared import database_mapping
+
+
+@pytest.fixture
+def syn() -> synapseclient.Synapse:
+    return mock.create_autospec(synapseclient.Synapse)
+
+
+@pytest.fixture
+def mapping_df() -> pd.DataFrame:
+    return pd.DataFrame({"Database": ["sample", "bed"], "Id": ["syn1", "syn2"]})
+
+
+def test_that_get_synid_queries_each_mapping_table_once(mapping_df):
+    mapping = database_mapping.DatabaseMapping(
+        {"production": "synProd", "staging": "synStaging"}
+    )
+    with mock.patch.object(database_mapping, "query") as patch_query:
+        patch_query.return_value.convert_dtypes.return_value = mapping_df
+        assert mapping.get_synid("sample", "production") == "syn1"
+        assert mapping.get_synid("bed", "production") == "syn2"
+        assert mapping.get_synid("bed", "staging") == "syn2"
+    assert [call.args[0] for call in patch_query.call_args_list] == [
+        "SELECT * FROM synProd",
+        "SELECT * FROM synStaging",
+    ]
+
+
+def test_that_get_synid_raises_for_unknown_table(mapping_df):
+    mapping = database_mapping.DatabaseMapping({"production": "synProd"})
+    with mock.patch.object(database_mapping, "query") as patch_query:
+        patch_query.return_value.convert_dtypes.return_value = mapping_df
+        with pytest.raises(KeyError, match="maf is not in the production"):
+            mapping.get_synid("maf", "production")
+
+
+@pytest.mark.parametrize(
+    "second_etag, expected_queries",
+    [("etag1", 1), ("etag2", 2)],
+    ids=["unchanged_etag", "changed_etag"],
+)
+def test_that_disk_cache_is_validated_by_etag(
+    syn, tmp_path, mapping_df, second_etag, expected_queries
+):
+    syn.get.side_effect = [mock.Mock(etag="etag1"), mock.Mock(etag=second_etag)]
+    with mock.patch.object(database_mapping, "query") as patch_query:
+        patch_query.return_value.convert_dtypes.return_value = mapping_df
+        # each run gets its own memoized mapping
+        for _ in range(2):
+            mapping = database_mapping.DatabaseMapping(
+                {"production": "synProd"}, syn=syn, cache_dir=str(tmp_path)
+            )
+            assert mapping.get_synid("bed", "production") == "syn2"
+    assert patch_query.call_count == expected_queries
@@ -0,0 +1,102 @@
+from unittest import mock
+
+import pandas as pd
+import pytest
+import synapseclient
+
+from scripts.shared import database_mapping, release_resolver
+
+
+@pytest.fixture
+def syn() -> synapseclient.Synapse:
+    syn = mock.create_autospec(synapseclient.Synapse)
+    with mock.patch.object(syn, "tableQuery"):
+        yield syn
+
+
+def _query_result(df: pd.DataFrame) -> mock.MagicMock:
+    result = mock.MagicMock()
+    result.asDataFrame.return_value = df
+    return result
+
+
+@pytest.fixture
+def release_table_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "release": ["17.1-consortium", "17.2-consortium"],
+            "parentId": ["syn1", "syn2"],
+        }
+    )
+
+
+def test_that_from_release_table_queries_all_releases_once(syn, release_table_df):
+    syn.tableQuery.return_value = _query_result(release_table_df)
+    resolver = release_resolver.ReleaseResolver(syn)
+
+    assert resolver.from_release_table("syn1234", "17.1-consortium") == "syn1"
+    assert resolver.from_release_table("syn1234", "17.2-consortium") == "syn2"
+    syn.tableQuery.assert_called_once_with(
+        "SELECT DISTINCT release, parentId FROM syn1234",
+        includeRowIdAndRowVersion=False,
+    )
+
+
+def test_that_from_release_table_queries_again_for_a_missing_release(
+    syn, release_table_df
+):
+    syn.tableQuery.return_value = _query_result(release_table_df)
+    resolver = release_resolver.ReleaseResolver(syn)
+    resolver.from_release_table("syn1234", "17.1-consortium")
+
+    with pytest.raises(ValueError, match="Must choose correct release"):
+        resolver.from_release_table("syn1234", "18.1-consortium")
+    assert syn.tableQuery.call_count == 2
+
+
+def test_that_from_database_mapping_resolves_test_releases(syn):
+    syn.tableQuery.return_value = _query_result(
+        pd.DataFrame({"name": ["TESTING", "17.1-public"], "id": ["syn6", "syn7"]})
+    )
+    mapping = database_mapping.DatabaseMapping({"production": "syn1234"})
+    resolver = release_resolver.ReleaseResolver(syn)
+
+    with mock.patch.object(database_mapping, "query") as patch_query:
+        patch_query.return_value.convert_dtypes.return_value = pd.DataFrame(
+            {"Database": ["releaseFolder"], "Id": ["syn5"]}
+        )
+        assert (
+            resolver.from_database_mapping(mapping, "production", "TEST.consortium")
+            == "syn6"
+        )
+        assert (
+            resolver.from_database_mapping(mapping, "production", "17.1-public")
+            == "syn7"
+        )
+    patch_query.assert_called_once_with("SELECT * FROM syn1234")
+    syn.tableQuery.assert_called_once_with(
+        "SELECT name, id FROM syn5 "
+        "WHERE name NOT LIKE 'Release%' AND name <> 'case_lists'",
+        includeRowIdAndRowVersion=False,
+    )
+
+
+def test_that_release_resolvers_do_not_share_memoized_releases(
+    syn, release_table_df
+):
+    syn.tableQuery.return_value = _query_result(release_table_df)
+    release_resolver.ReleaseResolver(syn).from_release_table(
+        "syn1234", "17.1-consortium"
+    )
+    release_resolver.ReleaseResolver(syn).from_release_table(
+        "syn1234", "17.1-consortium"
+    )
+    assert syn.tableQuery.call_count == 2
+
+
+def test_that_invalid_synapse_ids_are_not_queried(syn):
+    resolver = release_resolver.ReleaseResolver(syn)
+    with pytest.raises(ValueError, match="is not a valid synapse id"):
+        resolver.from_release_table("syn1' OR 'a'='a", "17.1-consortium")
+    syn.tableQuery.assert_not_called()
+
@@ -0,0 +1,336 @@
+import json
+from unittest import mock
+
+import pandas as pd
+import pytest
+import synapseclient
+
+from scripts.sync_tables import sync_staging_table_with_production as sync
+
+
+@pytest.fixture
+def syn() -> synapseclient.Synapse:
+    return mock.create_autospec(synapseclient.Synapse)
+
+
+@pytest.mark.parametrize(
+    "partitions, expected",
+    [
+        (["GOLD", "SAGE"], "WHERE CENTER IN ('GOLD', 'SAGE')"),
+        (["O'NEIL"], "WHERE CENTER IN ('O''NEIL')"),
+        (["GOLD", sync.NULL_PARTITION], "WHERE CENTER IN ('GOLD') OR CENTER IS NULL"),
+    ],
+    ids=["values", "quoted_value", "null_partition"],
+)
+def test_that_partition_filter_gives_expected_clause(partitions, expected):
+    assert sync.partition_filter("CENTER", partitions) == expected
+
+
+def test_that_get_partition_signatures_groups_by_partition_key():
+    signatures = pd.DataFrame(
+        {"CENTER": ["GOLD", None], "row_count": [2, 1], "max_row_version": [5, 3]}
+    )
+    with mock.patch.object(sync, "query", return_value=signatures) as patch_query:
+        result = sync.get_partition_signatures("syn1", "CENTER")
+    assert "GROUP BY CENTER" in patch_query.call_args[0][0]
+    assert result == {"GOLD": [2, 5], sync.NULL_PARTITION: [1, 3]}
+
+
+def test_that_get_partition_signatures_uses_one_partition_without_key():
+    signatures = pd.DataFrame({"row_count": [4], "max_row_version": [7]})
+    with mock.patch.object(sync, "query", return_value=signatures):
+        result = sync.get_partition_signatures("syn1")
+    assert result == {sync.WHOLE_TABLE_PARTITION: [4, 7]}
+
+
+@pytest.mark.parametrize(
+    "production, staging, expected",
+    [
+        ({"GOLD": [2, 5], "SAGE": [1, 3]}, {"GOLD": [2, 9], "SAGE": [1, 4]}, []),
+        ({"GOLD": [2, 6], "SAGE": [1, 3]}, {"GOLD": [2, 9], "SAGE": [1, 4]}, ["GOLD"]),
+        ({"GOLD": [2, 5], "SAGE": [1, 3]}, {"GOLD": [2, 9], "SAGE": [0, 10]}, ["SAGE"]),
+        ({"GOLD": [2, 5]}, {"GOLD": [2, 9], "SAGE": [1, 4]}, ["SAGE"]),
+        (
+            {"GOLD": [2, 5], "SAGE": [1, 3], "TEST": [1, 8]},
+            {"GOLD": [2, 9], "SAGE": [1, 4]},
+            ["TEST"],
+        ),
+    ],
+    ids=[
+        "unchanged",
+        "production_changed",
+        "staging_changed",
+        "removed_from_production",
+        "new_in_production",
+    ],
+)
+def test_that_find_changed_partitions_gives_expected_partitions(
+    production, staging, expected
+):
+    recorded = {
+        "production": {"GOLD": [2, 5], "SAGE": [1, 3]},
+        "staging": {"GOLD": [2, 9], "SAGE": [1, 4]},
+    }
+    assert sync.find_changed_partitions(production, staging, recorded) == expected
+
+
+def test_that_sync_state_is_persisted(tmp_path):
+    state_path = str(tmp_path / "sync_state.json")
+    sync_state = sync.SyncState(state_path)
+    assert sync_state.get("sample") == {"production": {}, "staging": {}}
+    sync_state.update("sample", production={"GOLD": [2, 5]}, staging={"GOLD": [2, 9]})
+    assert sync.SyncState(state_path).get("sample") == {
+        "production": {"GOLD": [2, 5]},
+        "staging": {"GOLD": [2, 9]},
+    }
+
+
+def test_that_sync_table_incrementally_only_syncs_changed_partitions(syn, tmp_path):
+    sync_state = sync.SyncState(str(tmp_path / "sync_state.json"))
+    sync_state.update(
+        "sample",
+        production={"GOLD": [2, 5], "SAGE": [1, 3]},
+        staging={"GOLD": [2, 9], "SAGE": [1, 4]},
+    )
+    production = {"GOLD": [2, 5], "SAGE": [2, 6]}
+    staging_after = {"GOLD": [2, 9], "SAGE": [2, 11]}
+    with mock.patch.object(
+        sync, "get_table_synid", side_effect=["syn_prod", "syn_staging"]
+    ), mock.patch.object(
+        sync,
+        "get_partition_signatures",
+        side_effect=[production, {"GOLD": [2, 9], "SAGE": [1, 4]}, staging_after],
+    ), mock.patch.object(
+        sync, "download_table"
+    ) as patch_download, mock.patch.object(
+        sync, "replace_table"
+    ) as patch_replace:
+        result = sync.sync_table_incrementally(
+            syn, table_key="sample", partition_key="CENTER", sync_state=sync_state
+        )
+    assert result == {"partitions": ["SAGE"], "rows_changed": patch_replace.return_value}
+    patch_download.assert_called_once_with(
+        table_key="sample", where="WHERE CENTER IN ('SAGE')"
+    )
+    assert patch_replace.call_args.kwargs["where"] == "WHERE CENTER IN ('SAGE')"
+    assert sync_state.get("sample") == {
+        "production": production,
+        "staging": staging_after,
+    }
+
+
+def test_that_sync_table_incrementally_skips_unchanged_table(syn, tmp_path):
+    sync_state = sync.SyncState(str(tmp_path / "sync_state.json"))
+    sync_state.update("errorTracker", production={"__all__": [4, 7]}, staging={"__all__": [4, 9]})
+    with mock.patch.object(
+        sync, "get_table_synid", side_effect=["syn_prod", "syn_staging"]
+    ), mock.patch.object(
+        sync,
+        "get_partition_signatures",
+        side_effect=[{"__all__": [4, 7]}, {"__all__": [4, 9]}],
+    ), mock.patch.object(sync, "download_table") as patch_download:
+        result = sync.sync_table_incrementally(
+            syn, table_key="errorTracker", partition_key=None, sync_state=sync_state
+        )
+    assert result == {"partitions": [], "rows_changed": 0}
+    patch_download.assert_not_called()
+
+
+def test_that_count_changed_rows_counts_appended_updated_and_deleted_rows():
+    old = pd.DataFrame(
+        {"SAMPLE_ID": ["S1", "S2", "S3"], "CENTER": ["A", "A", "B"], "AGE": [1, 2, 3]}
+    )
+    new = pd.DataFrame(
+        {"SAMPLE_ID": ["S1", "S2", "S4"], "CENTER": ["A", "A", "B"], "AGE": [1, 5, 4]}
+    )
+    # S2 updated, S3 deleted and S4 appended
+    assert sync.count_changed_rows(old, new, ["SAMPLE_ID", "CENTER"]) == 3
+
+
+def test_that_sync_tables_isolates_failing_tables(syn):
+    def fake_replace_table(syn, data_to_replace_with, table_key, partition_key):
+        if table_key == "seg":
+            raise ValueError("boom")
+        return 2
+
+    with mock.patch.object(sync, "download_table"), mock.patch.object(
+        sync, "replace_table", side_effect=fake_replace_table
+    ):
+        results = sync.sync_tables(
+            syn, tables={"bed": "SEQ_ASSAY_ID", "seg": "CENTER"}, max_workers=2
+        )
+    assert [(result.table_key, result.status, result.rows_changed) for result in results] == [
+        ("bed", "synced", 2),
+        ("seg", "failed", 0),
+    ]
+    assert results[1].error == "ValueError: boom"
+    assert sync.report_sync_summary(results) == {"synced": 1, "skipped": 0, "failed": 1}
+
+
+@pytest.fixture
+def source_rows() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ROW_ID": [1, 2, 5, 8, 9],
+            "ROW_VERSION": [1, 1, 1, 1, 1],
+            "Hugo_Symbol": ["TP53", "KRAS", "EGFR", "BRAF", "PIK3CA"],
+        }
+    )
+
+
+def _fake_query(source_rows: pd.DataFrame, destination_rows: int = 0):
+    """Answers the count and ROW_ID paged queries of bulk_load_table"""
+
+    def fake_query(sql, **kwargs):
+        if "COUNT(*)" in sql:
+            row_count = len(source_rows) if "syn_prod" in sql else destination_rows
+            return pd.DataFrame({"row_count": [row_count]})
+        last_row_id = int(sql.split("ROW_ID > ")[1].split()[0])
+        limit = int(sql.split("LIMIT ")[1])
+        return source_rows[source_rows["ROW_ID"] > last_row_id].head(limit)
+
+    return fake_query
+
+
+def test_that_bulk_load_table_streams_rows_in_batches(source_rows, tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    with mock.patch.object(
+        sync, "query", side_effect=_fake_query(source_rows)
+    ), mock.patch.object(sync, "store_rows_with_retry") as patch_store:
+        result = sync.bulk_load_table(
+            "syn_prod", "syn_new", checkpoint_path=checkpoint_path, batch_size=2
+        )
+    assert result == 5
+    stored = [call.args[1] for call in patch_store.call_args_list]
+    assert [len(rows) for rows in stored] == [2, 2, 1]
+    assert list(stored[0].columns) == ["Hugo_Symbol"]
+    checkpoint = json.loads(open(checkpoint_path).read())
+    assert checkpoint["last_row_id"] == 9
+    assert checkpoint["complete"] is True
+
+
+def test_that_bulk_load_table_resumes_from_checkpoint(source_rows, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    checkpoint_path.write_text(
+        json.dumps(
+            {"source": "syn_prod", "destination": "syn_new", "last_row_id": 5, "rows_loaded": 3}
+        )
+    )
+    with mock.patch.object(
+        sync, "query", side_effect=_fake_query(source_rows, destination_rows=3)
+    ), mock.patch.object(sync, "store_rows_with_retry") as patch_store:
+        result = sync.bulk_load_table(
+            "syn_prod", "syn_new", checkpoint_path=str(checkpoint_path), batch_size=2
+        )
+    assert result == 5
+    patch_store.assert_called_once()
+    assert patch_store.call_args.args[1]["Hugo_Symbol"].tolist() == ["BRAF", "PIK3CA"]
+    assert patch_store.call_args.kwargs["rows_before"] == 3
+
+
+def test_that_bulk_load_table_skips_batch_committed_after_checkpoint(
+    source_rows, tmp_path
+):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    # the batch after row 2 was committed before the checkpoint was written
+    checkpoint_path.write_text(
+        json.dumps(
+            {"source": "syn_prod", "destination": "syn_new", "last_row_id": 2, "rows_loaded": 2}
+        )
+    )
+    with mock.patch.object(
+        sync, "query", side_effect=_fake_query(source_rows, destination_rows=4)
+    ), mock.patch.object(sync, "store_rows_with_retry") as patch_store:
+        result = sync.bulk_load_table(
+            "syn_prod", "syn_new", checkpoint_path=str(checkpoint_path), batch_size=2
+        )
+    assert result == 5
+    patch_store.assert_called_once()
+    assert patch_store.call_args.args[1]["Hugo_Symbol"].tolist() == ["PIK3CA"]
+    assert patch_store.call_args.kwargs["rows_before"] == 4
+
+
+def test_that_bulk_load_table_raises_error_if_destination_lost_rows(
+    source_rows, tmp_path
+):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    checkpoint_path.write_text(
+        json.dumps(
+            {"source": "syn_prod", "destination": "syn_new", "last_row_id": 5, "rows_loaded": 3}
+        )
+    )
+    with mock.patch.object(
+        sync, "query", side_effect=_fake_query(source_rows, destination_rows=1)
+    ), mock.patch.object(sync, "store_rows_with_retry") as patch_store:
+        with pytest.raises(ValueError, match="syn_new has 1 rows"):
+            sync.bulk_load_table(
+                "syn_prod", "syn_new", checkpoint_path=str(checkpoint_path), batch_size=2
+            )
+    patch_store.assert_not_called()
+
+
+def test_that_store_rows_with_retry_retries_then_raises():
+    rows = pd.DataFrame({"a": [1]})
+    with mock.patch.object(sync, "Table") as patch_table, mock.patch.object(
+        sync.time, "sleep"
+    ) as patch_sleep, mock.patch.object(sync, "count_rows", return_value=10):
+        patch_table.return_value.store_rows.side_effect = [ValueError("boom"), None]
+        sync.store_rows_with_retry("syn1", rows, rows_before=10, max_retries=3)
+        assert patch_table.return_value.store_rows.call_count == 2
+        patch_sleep.assert_called_once_with(2)
+
+        patch_table.return_value.store_rows.side_effect = ValueError("boom")
+        with pytest.raises(ValueError, match="boom"):
+            sync.store_rows_with_retry("syn1", rows, rows_before=10, max_retries=2)
+
+
+def test_that_store_rows_with_retry_does_not_retry_committed_rows():
+    rows = pd.DataFrame({"a": [1, 2]})
+    with mock.patch.object(sync, "Table") as patch_table, mock.patch.object(
+        sync.time, "sleep"
+    ) as patch_sleep, mock.patch.object(
+        sync, "count_rows", return_value=12
+    ) as patch_count:
+        patch_table.return_value.store_rows.side_effect = ValueError("timeout")
+        sync.store_rows_with_retry("syn1", rows, rows_before=10, max_retries=3)
+    patch_table.return_value.store_rows.assert_called_once_with(rows)
+    patch_count.assert_called_once_with("syn1")
+    patch_sleep.assert_not_called()
+
+
+def test_that_load_narrow_maf_table_reuses_table_from_checkpoint(syn, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    checkpoint_path.write_text(
+        json.dumps(
+            {"source": "syn_prod", "destination": "syn_new", "last_row_id": 5, "rows_loaded": 3}
+        )
+    )
+    with mock.patch.object(
+        sync, "get_table_synid", return_value="syn_prod"
+    ), mock.patch.object(sync, "create_narrow_maf_table") as patch_create, mock.patch.object(
+        sync, "bulk_load_table", return_value=5
+    ) as patch_load:
+        assert sync.load_narrow_maf_table(syn, checkpoint_path=str(checkpoint_path)) == 5
+    patch_create.assert_not_called()
+    assert patch_load.call_args.args == ("syn_prod", "syn_new")
+
+
+def test_that_load_narrow_maf_table_reloads_into_new_table_after_finished_load(
+    syn, source_rows, tmp_path
+):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    with mock.patch.object(
+        sync, "get_table_synid", return_value="syn_prod"
+    ), mock.patch.object(
+        sync, "create_narrow_maf_table", side_effect=["syn_first", "syn_second"]
+    ) as patch_create, mock.patch.object(
+        sync, "query", side_effect=_fake_query(source_rows)
+    ), mock.patch.object(
+        sync, "store_rows_with_retry"
+    ) as patch_store:
+        assert sync.load_narrow_maf_table(syn, checkpoint_path=checkpoint_path, batch_size=2) == 5
+        assert sync.load_narrow_maf_table(syn, checkpoint_path=checkpoint_path, batch_size=2) == 5
+    assert patch_create.call_count == 2
+    destinations = [call.args[0] for call in patch_store.call_args_list]
+    assert destinations == ["syn_first"] * 3 + ["syn_second"] * 3
+    assert json.loads(open(checkpoint_path).read())["destination"] == "syn_second"